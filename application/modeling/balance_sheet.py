@@ -1,7 +1,95 @@
-import numpy as np
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import helper, statements
+
+BALANCE_SHEET = statements.parse_layout(
+    """
+    ASSETS
+    NON CURRENT ASSETS
+    Property Plant And Equipment
+    Intangible Assets
+    Investment In Subsidiaries
+    Investment In Associates
+    Investment Properties
+    Equity Investments
+    Long Term Money Market Investments
+    Loans To Related Entities
+    Non Current Assets = sum(Property Plant And Equipment .. Loans To Related Entities)
+    CURRENT ASSETS
+    Inventories
+    Intergroup Receivables
+    Loan Book
+    Trade Receivables
+    Other Receivables
+    Cash On Hand
+    Short Term Money Market Investments
+    Current Assets = sum(Inventories .. Short Term Money Market Investments)
+    TOTAL ASSETS = Non Current Assets + Current Assets
+    EQUITY AND LIABILITIES
+    CAPITAL AND RESERVES
+    Issued Share Capital
+    Share Premium
+    Other Components Of Equity
+    Treasury Shares
+    Retained Earnings
+    Capital And Reserves = sum(Issued Share Capital .. Retained Earnings)
+    NON CURRENT LIABILITIES
+    Loans
+    Intercompany Loans
+    Deferred Taxation
+    Non Current Liabilities = sum(Loans .. Deferred Taxation)
+    CURRENT LIABILITIES
+    Trade Payables
+    Other Payables
+    Borrowings
+    Provision For Taxation
+    Provisions
+    Current Liabilities = sum(Trade Payables .. Provisions)
+    TOTAL EQUITY AND LIABILITIES = Current Liabilities
+        + Non Current Liabilities
+        + Capital And Reserves
+    CHECK
+    """,
+    name="STATEMENT_OF_FINANCIAL_POSITION",
+    balances=True,
+)
+
+
+# Balance sheet lines that are their opening balance plus the cumulative movements in
+# other_parameters, as line: (other_parameters row, opening_balances column)
+BALANCES_FROM_PARAMETERS = {
+    "Issued Share Capital": ("SHARE_CAPITAL", "ISSUED_SHARE_CAPITAL"),
+    "Intercompany Loans": ("INTERCOMPANY_LOANS", "INTERCOMPANY_LOANS"),
+    "Share Premium": ("SHARE_PREMIUM", "SHARE_PREMIUM"),
+    "Other Components Of Equity": (
+        "OTHER_COMPONENTS_OF_EQUITY",
+        "OTHER_COMPONENTS_OF_EQUITY",
+    ),
+    "Treasury Shares": ("TREASURY_SHARES", "TREASURY_SHARES"),
+    "Intangible Assets": ("INTANGIBLE_ASSETS", "INTANGIBLE_ASSETS"),
+    "Investment In Subsidiaries": (
+        "INVESTMENT_IN_SUBSIDIARIES",
+        "INVESTMENT_IN_SUBSIDIARIES",
+    ),
+    "Investment In Associates": (
+        "INVESTMENT_IN_ASSOCIATES",
+        "INVESTMENT_IN_ASSOCIATES",
+    ),
+    "Investment Properties": ("INVESTMENT_PROPERTIES", "INVESTMENT_PROPERTIES"),
+    "Equity Investments": ("EQUITY_INVESTMENTS", "EQUITY_INVESTMENTS"),
+    "Long Term Money Market Investments": (
+        "LONG_TERM_MONEY_MARKET_INVESTMENTS",
+        "LONG_TERM_MONEY_MARKET_INVESTMENTS",
+    ),
+    "Short Term Money Market Investments": (
+        "SHORT_TERM_MONEY_MARKET_INVESTMENTS",
+        "SHORT_TERM_MONEY_MARKET_INVESTMENTS",
+    ),
+    "Loans To Related Entities": (
+        "LOANS_TO_RELATED_ENTITIES",
+        "LOANS_TO_RELATED_ENTITIES",
+    ),
+}
 
 
 def generate_inventories_schedule(
@@ -94,66 +182,19 @@ def generate_receivables_schedule(
 
 
 def generate_balance_sheet_template(start_date: str, months_to_forecast: int):
-    balance_sheet_index = pd.DataFrame(
-        {
-            "STATEMENT_OF_FINANCIAL_POSITION": [
-                "ASSETS",
-                "NON CURRENT ASSETS",
-                "Property Plant And Equipment",
-                "Intangible Assets",
-                "Investment In Subsidiaries",
-                "Investment In Associates",
-                "Investment Properties",
-                "Equity Investments",
-                "Long Term Money Market Investments",
-                "Loans To Related Entities",
-                "Non Current Assets",
-                "CURRENT ASSETS",
-                "Inventories",
-                "Intergroup Receivables",
-                "Loan Book",
-                "Trade Receivables",
-                "Other Receivables",
-                "Cash On Hand",
-                "Short Term Money Market Investments",
-                "Current Assets",
-                "TOTAL ASSETS",
-                "EQUITY AND LIABILITIES",
-                "CAPITAL AND RESERVES",
-                "Issued Share Capital",
-                "Share Premium",
-                "Other Components Of Equity",
-                "Treasury Shares",
-                "Retained Earnings",
-                "Capital And Reserves",
-                "NON CURRENT LIABILITIES",
-                "Loans",
-                "Intercompany Loans",
-                "Deferred Taxation",
-                "Non Current Liabilities",
-                "CURRENT LIABILITIES",
-                "Trade Payables",
-                "Other Payables",
-                "Borrowings",
-                "Provision For Taxation",
-                "Provisions",
-                "Current Liabilities",
-                "TOTAL EQUITY AND LIABILITIES",
-                "CHECK",
-            ]
-        }
-    )
+    return BALANCE_SHEET.builder(start_date, months_to_forecast)
 
-    balance_sheet_index["STATEMENT_OF_FINANCIAL_POSITION"] = balance_sheet_index[
-        "STATEMENT_OF_FINANCIAL_POSITION"
-    ].str.strip()
 
-    balance_sheet_template = pd.DataFrame(
-        columns=helper.generate_columns(start_date, months_to_forecast),
-        index=balance_sheet_index["STATEMENT_OF_FINANCIAL_POSITION"],
-    )
-
-    return balance_sheet_template
+def insert_balances_from_parameters(
+    balance_sheet: statements.StatementBuilder,
+    other_parameters: pd.DataFrame,
+    opening_balances: pd.DataFrame,
+):
+    parameters, openings = zip(*BALANCES_FROM_PARAMETERS.values())
+    balances = other_parameters.loc[list(parameters)].astype(float).cumsum(axis=1)
+    balances += opening_balances[list(openings)].iloc[0].to_numpy(dtype=float)[:, None]
+    balances.index = list(BALANCES_FROM_PARAMETERS)
+    return balance_sheet.update(balances)
 
 
 # def calculate_other_assets(
@@ -194,38 +235,12 @@ def generate_balance_sheet_template(start_date: str, months_to_forecast: int):
 #     return balance_sheet_df
 
 
-def sum_financial_statements_totals(financial_statement: pd.DataFrame):
-    total_rows = financial_statement.index[
-        financial_statement.index.str.lower().duplicated()
-    ]
-
-    for total_row in total_rows:
-        financial_statement.loc[total_row] = financial_statement.iloc[
-            financial_statement.index.get_loc(total_row.upper())
-            + 1 : financial_statement.index.get_loc(total_row)
-        ].sum()
-
-    return financial_statement
-
-
-def calculate_final_balances(balance_sheet_df: pd.DataFrame):
-    balance_sheet_df.loc["TOTAL ASSETS"] = (
-        balance_sheet_df.loc["Non Current Assets"]
-        + balance_sheet_df.loc["Current Assets"]
+def calculate_final_balances(balance_sheet: statements.StatementBuilder):
+    balance_sheet.calculate_subtotals()
+    balance_sheet["CHECK"] = (
+        balance_sheet["TOTAL ASSETS"] == balance_sheet["TOTAL EQUITY AND LIABILITIES"]
     )
-
-    balance_sheet_df.loc["TOTAL EQUITY AND LIABILITIES"] = (
-        balance_sheet_df.loc["Current Liabilities"]
-        + balance_sheet_df.loc["Non Current Liabilities"]
-        + balance_sheet_df.loc["Capital And Reserves"]
-    )
-
-    balance_sheet_df.loc["CHECK"] = (
-        balance_sheet_df.loc["TOTAL ASSETS"]
-        == balance_sheet_df.loc["TOTAL EQUITY AND LIABILITIES"]
-    )
-
-    return balance_sheet_df
+    return balance_sheet
 
 
 def calculate_short_term_loans_schedules(
@@ -295,16 +310,3 @@ def calculate_long_term_loans_schedules(
         long_term_loans_schedule
     )
     return long_term_loans_schedule
-
-
-def calculate_balance_sheet_yearly(balance_sheet_df: pd.DataFrame):
-    balance_sheet_yearly_df = balance_sheet_df.loc[
-        :, [i for i in balance_sheet_df.columns if i.startswith("Dec")]
-    ]
-    balance_sheet_yearly_df.columns = balance_sheet_yearly_df.columns.str.split(
-        "-"
-    ).str.get(1)
-
-    balance_sheet_yearly_df.columns = balance_sheet_yearly_df.columns.astype(str)
-    balance_sheet_yearly_df
-    return balance_sheet_yearly_df
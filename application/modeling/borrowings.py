@@ -1,146 +1,174 @@
+from typing import Iterable
+
 import numpy as np
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import constants, helper, schedules
 
 
-def reindex_output(df: pd.DataFrame):
-    columns = pd.DatetimeIndex(df.columns)
-    index = pd.date_range(columns.min(), columns.max(), freq="M").strftime("%b-%Y")
-    return df.T.reindex(index=index).T
+def get_schedule_columns(
+    first_months: np.ndarray, steps: np.ndarray, number_of_payments: np.ndarray
+) -> tuple[np.ndarray, pd.Index]:
+    """Orders the months covered by the schedules the way concatenating one Series per loan does:
+    each month appears where the first loan paying in it introduces it.
+    Returns the months (as monthly period ordinals) and their "%b-%Y" labels."""
+    covered = number_of_payments > 0
+    if not covered.any():
+        return np.array([], dtype=int), pd.Index([], dtype=object)
 
+    lowest = first_months[covered].min()
+    highest = (first_months + steps * (number_of_payments - 1))[covered].max()
+    first_loan = np.full(highest - lowest + 1, len(first_months))
 
-def calculate_outstanding_on_straight_line_borrowings(
-    effective_dates: pd.Series,
-    tenures: pd.Series,
-    amounts: pd.Series,
-    loan_identifiers: pd.Series,
-):
-    array_of_series = []
-    for i, _ in effective_dates.items():
-        effective_date = effective_dates[i]
-        tenure = tenures[i]
-        amount = amounts[i]
-        loan_identifier = loan_identifiers[i]
-
-        array_of_series.append(
-            pd.Series(
-                data=amount,
-                index=pd.period_range(
-                    start=effective_date,
-                    periods=tenure,
-                    freq="M",
-                ),
-                name=loan_identifier,
-            )
-        )
+    schedules, first_loans = np.unique(
+        np.column_stack([first_months, steps, number_of_payments])[covered],
+        axis=0,
+        return_index=True,
+    )
+    for (first_month, step, periods), loan in zip(
+        schedules, np.flatnonzero(covered)[first_loans]
+    ):
+        months = first_month - lowest + step * np.arange(periods)
+        first_loan[months] = np.minimum(first_loan[months], loan)
 
-    df = pd.concat(array_of_series, axis=1).T.fillna(0)
-    df.columns = df.columns.strftime("%b-%Y")
-    return df
+    months = np.flatnonzero(first_loan < len(first_months))
+    months = months[np.lexsort((months, first_loan[months]))] + lowest
 
+    labels = pd.period_range(
+        start=pd.Period(ordinal=int(lowest), freq="M"),
+        periods=highest - lowest + 1,
+        freq="M",
+    ).strftime("%b-%Y")
+    return months, pd.Index(labels[months - lowest])
 
-def calculate_straight_line_payments(
+
+def get_reducing_balance_loan_terms(
+    interest_rates: pd.Series,
     effective_dates: pd.Series,
-    tenures: pd.Series,
     frequencies: pd.Series,
+    tenures: pd.Series,
     amounts: pd.Series,
-    loan_identifiers: pd.Series,
-):
-    amounts_results = []
-    freq_key = {1: "12M", 2: "6M", 3: "4M", 4: "3M", 6: "2M", 12: "M"}
+    is_interest_rate_annual: bool = True,
+) -> dict:
+    """Per-loan repayment terms of reducing balance loans, with payment dates as monthly period ordinals"""
+    effective_dates = helper.convert_to_datetime(effective_dates)
 
-    years = tenures // 12
+    years = tenures / 12
     number_of_payments = years * frequencies
 
-    for i, _ in effective_dates.items():
-        effective_date = effective_dates[i]
-        tenure = tenures[i]
-        frequency = frequencies[i]
-        amount = amounts[i]
-        loan_identifier = loan_identifiers[i]
-        periods = number_of_payments[i]
-
-        if frequency == 0:
-            index = pd.date_range(
-                start=(effective_date + pd.DateOffset(months=tenure)),
-                periods=1,
-                freq="D",
-            ).strftime("%b-%Y")
-
-        else:
-            index = pd.date_range(
-                effective_date + pd.DateOffset(months=12 // frequency),
-                periods=periods,
-                freq=freq_key[frequency],
-            ).strftime("%b-%Y")
-
-        amounts_results.append(pd.Series(amount, index=index, name=loan_identifier))
-
-    return pd.concat(amounts_results, axis=1).T.fillna(0)
+    if is_interest_rate_annual:
+        effective_interest_rates = np.power(1 + interest_rates, 1 / frequencies) - 1
+        print("interests divided")
+    else:
+        effective_interest_rates = interest_rates
+        print("interest rates not divided")
 
+    annuity_factor = (
+        1 - (1 + effective_interest_rates) ** (-number_of_payments)
+    ) / effective_interest_rates
 
-def calculate_interest(
-    frequencies: pd.Series, annual_interest: pd.Series, tenures: pd.Series
-):
-    interest = pd.Series([], dtype=float)
+    repayments = amounts / annuity_factor
 
-    for i, v in frequencies.items():
-        if frequencies[i] == 0:
-            interest[i] = annual_interest[i] * tenures[i] / 12
-        else:
-            interest[i] = annual_interest[i] / frequencies[i]
+    # Payments are due at month ends, the first one 12 // frequency months after the effective date
+    steps = (12 // frequencies).to_numpy(dtype=int)
+    first_months = (
+        (effective_dates.dt.year - 1970) * 12 + effective_dates.dt.month - 1
+    ).to_numpy(dtype=int) + steps
 
-    return interest
+    return {
+        "first_months": first_months,
+        "steps": steps,
+        "periods": number_of_payments.to_numpy(dtype=float).astype(int),
+        "rates": effective_interest_rates.to_numpy(dtype=float),
+        "repayment_amounts": repayments.to_numpy(dtype=float),
+        "repayments": repayments,
+    }
 
 
-def calculate_straight_line_loans_schedules(
+def calculate_reducing_balance_loans_schedules(
     interest_rates: pd.Series,
     effective_dates: pd.Series,
     frequencies: pd.Series,
     loan_identifiers: pd.Series,
     tenures: pd.Series,
     amounts: pd.Series,
-):
-    effective_dates = helper.convert_to_datetime(effective_dates)
-
-    annual_interest = amounts * interest_rates
-
-    interest = calculate_interest(
-        frequencies=frequencies, annual_interest=annual_interest, tenures=tenures
-    )
-
-    interest_payments = calculate_straight_line_payments(
+    is_interest_rate_annual: bool = True,
+    chunk_size: int = constants.SCHEDULE_CHUNK_SIZE,
+) -> dict[str, pd.DataFrame]:
+    """Schedules every loan into one preallocated (loans x months) array per output.
+    Payment dates are kept as integer month offsets and only turned into labels once, at the end."""
+    terms = get_reducing_balance_loan_terms(
+        interest_rates=interest_rates,
         effective_dates=effective_dates,
-        tenures=tenures,
         frequencies=frequencies,
-        amounts=interest,
-        loan_identifiers=loan_identifiers,
-    )
-
-    capital_repayments = calculate_straight_line_payments(
-        effective_dates=effective_dates,
         tenures=tenures,
-        frequencies=frequencies * 0,
         amounts=amounts,
-        loan_identifiers=loan_identifiers,
+        is_interest_rate_annual=is_interest_rate_annual,
     )
-
-    outstanding_balance = calculate_outstanding_on_straight_line_borrowings(
-        effective_dates=effective_dates,
-        tenures=tenures,
-        amounts=amounts,
-        loan_identifiers=loan_identifiers,
+    first_months = terms["first_months"]
+    steps = terms["steps"]
+    periods = terms["periods"]
+    rates = terms["rates"]
+    repayment_amounts = terms["repayment_amounts"]
+
+    months, columns = get_schedule_columns(
+        first_months=first_months, steps=steps, number_of_payments=periods
     )
+    lowest = months.min() if len(months) else 0
+    column_positions = np.zeros(months.max() - lowest + 1 if len(months) else 0, int)
+    column_positions[months - lowest] = np.arange(len(months))
+
+    outstanding_balances = np.zeros((len(periods), len(months)))
+    interest_payments = np.zeros((len(periods), len(months)))
+    capital_repayments = np.zeros((len(periods), len(months)))
+
+    for chunk_start in range(0, len(periods), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        chunk_periods = np.maximum(periods[chunk], 0)
+
+        loans = np.repeat(np.arange(len(periods))[chunk], chunk_periods)
+        payments = np.arange(len(loans)) - np.repeat(
+            np.cumsum(chunk_periods) - chunk_periods, chunk_periods
+        )
+        positions = column_positions[
+            first_months[loans] + steps[loans] * payments - lowest
+        ]
+
+        rate = rates[loans]
+        repayment = repayment_amounts[loans]
+
+        outstanding = (
+            (1 - np.power(1 + rate, -(periods[loans] - payments))) / rate * repayment
+        )
+        interest = outstanding * rate
+
+        outstanding_balances[loans, positions] = outstanding
+        interest_payments[loans, positions] = interest
+        capital_repayments[loans, positions] = repayment - interest
+
+    # Rates the annuity formula cannot price come out as NaN and are reported as zero, in place
+    for schedule in (outstanding_balances, interest_payments, capital_repayments):
+        np.copyto(schedule, 0, where=np.isnan(schedule))
+
+    index = pd.Index(loan_identifiers.to_numpy())
+    repayments = terms["repayments"]
+    repayments.index = loan_identifiers
 
     return {
-        "interest_payments": interest_payments,
-        "capital_repayments": capital_repayments,
-        "outstanding_balance_at_start": outstanding_balance,
+        "outstanding_balance_at_start": pd.DataFrame(
+            outstanding_balances, index=index, columns=columns, copy=False
+        ),
+        "capital_repayments": pd.DataFrame(
+            capital_repayments, index=index, columns=columns, copy=False
+        ),
+        "interest_payments": pd.DataFrame(
+            interest_payments, index=index, columns=columns, copy=False
+        ),
+        "repayments": repayments,
     }
 
 
-def calculate_reducing_balance_loans_schedules(
+def calculate_reducing_balance_loans_banded_schedules(
     interest_rates: pd.Series,
     effective_dates: pd.Series,
     frequencies: pd.Series,
@@ -148,138 +176,385 @@ def calculate_reducing_balance_loans_schedules(
     tenures: pd.Series,
     amounts: pd.Series,
     is_interest_rate_annual: bool = True,
-) -> dict[str, pd.DataFrame]:
-    outstanding_balances_results = []
-    interest_payments_results = []
-    capital_repayments_results = []
+    chunk_size: int = constants.SCHEDULE_CHUNK_SIZE,
+) -> dict:
+    """Same schedules as calculate_reducing_balance_loans_schedules, built straight into banded form:
+    each loan only gets the months from its first to its last payment, never a full row of the month axis."""
+    terms = get_reducing_balance_loan_terms(
+        interest_rates=interest_rates,
+        effective_dates=effective_dates,
+        frequencies=frequencies,
+        tenures=tenures,
+        amounts=amounts,
+        is_interest_rate_annual=is_interest_rate_annual,
+    )
+    first_months = terms["first_months"]
+    steps = terms["steps"]
+    periods = terms["periods"]
+    rates = terms["rates"]
+    repayment_amounts = terms["repayment_amounts"]
+
+    months, columns = get_schedule_columns(
+        first_months=first_months, steps=steps, number_of_payments=periods
+    )
+    lowest = months.min() if len(months) else 0
+    number_of_months = months.max() - lowest + 1 if len(months) else 0
+
+    covered = periods > 0
+    starts = np.where(covered, first_months - lowest, 0)
+    lengths = np.where(covered, steps * (periods - 1) + 1, 0)
+    offsets = np.cumsum(lengths) - lengths
+
+    outstanding_balances = np.zeros(lengths.sum())
+    interest_payments = np.zeros(lengths.sum())
+    capital_repayments = np.zeros(lengths.sum())
+
+    for chunk_start in range(0, len(periods), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        chunk_lengths = lengths[chunk]
+        if not chunk_lengths.sum():
+            continue
+
+        loans = np.repeat(np.arange(len(periods))[chunk], chunk_lengths)
+        band = slice(offsets[chunk][0], offsets[chunk][-1] + chunk_lengths[-1])
+        payments, months_since_payment = np.divmod(
+            np.arange(band.start, band.stop) - offsets[loans], steps[loans]
+        )
+        paid = months_since_payment == 0
 
-    effective_dates = helper.convert_to_datetime(effective_dates)
+        rate = rates[loans]
+        repayment = repayment_amounts[loans]
 
-    freq_key = {1: "12M", 2: "6M", 3: "4M", 4: "3M", 6: "2M", 12: "M"}
+        outstanding = (
+            (1 - np.power(1 + rate, -(periods[loans] - payments))) / rate * repayment
+        )
+        interest = outstanding * rate
 
-    years = tenures / 12
-    number_of_payments = years * frequencies
+        outstanding_balances[band] = np.where(paid, outstanding, 0)
+        interest_payments[band] = np.where(paid, interest, 0)
+        capital_repayments[band] = np.where(paid, repayment - interest, 0)
 
-    if is_interest_rate_annual:
-        effective_interest_rates = np.power(1 + interest_rates, 1 / frequencies) - 1
-        print("interests divided")
-    else:
-        effective_interest_rates = interest_rates
-        print("interest rates not divided")
+    for values in (outstanding_balances, interest_payments, capital_repayments):
+        np.copyto(values, 0, where=np.isnan(values))
 
-    annuity_factor = (
-        1 - (1 + effective_interest_rates) ** (-number_of_payments)
-    ) / effective_interest_rates
+    repayments = terms["repayments"]
+    repayments.index = loan_identifiers
 
-    repayments = amounts / annuity_factor
+    def banded(values: np.ndarray) -> schedules.BandedSchedule:
+        return schedules.BandedSchedule(
+            loans=pd.Index(loan_identifiers.to_numpy()),
+            first_month=lowest,
+            number_of_months=number_of_months,
+            starts=starts,
+            lengths=lengths,
+            values=values,
+            columns=columns,
+        )
 
-    for i, _ in interest_rates.items():
-        effective_date = effective_dates[i]
-        frequency = frequencies[i]
-        periods = number_of_payments[i]
-        effective_interest_rate = effective_interest_rates[i]
-        repayment = repayments[i]
-        loan_identifier = loan_identifiers[i]
-
-        index = pd.date_range(
-            effective_date + pd.DateOffset(months=12 // frequency),
-            periods=periods,
-            freq=freq_key[frequency],
-        ).strftime("%b-%Y")
+    return {
+        "outstanding_balance_at_start": banded(outstanding_balances),
+        "capital_repayments": banded(capital_repayments),
+        "interest_payments": banded(interest_payments),
+        "repayments": repayments,
+    }
 
-        annuity_factors = (
-            1
-            - np.power(
-                1 + effective_interest_rate,
-                -np.arange(periods, 0, -1),
-            )
-        ) / effective_interest_rate
 
-        outstanding_balances = annuity_factors * repayment
+def calculate_reducing_balance_loans_totals(
+    loan_batches: Iterable[dict],
+    is_interest_rate_annual: bool = True,
+) -> dict[str, pd.DataFrame]:
+    """Monthly totals of the reducing balance schedules, one (group x month) frame per schedule.
+    Each item of `loan_batches` holds the arguments of get_reducing_balance_loan_terms for a batch of loans
+    and optionally "groups", one key per loan (a product for example); without it loans are totalled as "total".
+    Only the payments of one batch are held at a time, so memory does not grow with the number of loans."""
+    schedules_names = [
+        "outstanding_balance_at_start",
+        "capital_repayments",
+        "interest_payments",
+    ]
+    totals = {name: pd.DataFrame() for name in schedules_names}
+
+    for batch in loan_batches:
+        batch = dict(batch)
+        groups = batch.pop("groups", None)
+
+        terms = get_reducing_balance_loan_terms(
+            **batch, is_interest_rate_annual=is_interest_rate_annual
+        )
+        periods = np.maximum(terms["periods"], 0)
+        if not periods.sum():
+            continue
 
-        outstanding_balances_results.append(
-            pd.Series(
-                outstanding_balances,
-                index=index,
-                name=loan_identifier,
+        if groups is None:
+            codes, keys = np.zeros(len(periods), dtype=int), pd.Index(["total"])
+        else:
+            codes, keys = pd.factorize(
+                np.asarray(groups, dtype=object), use_na_sentinel=False
             )
+
+        loans = np.repeat(np.arange(len(periods)), periods)
+        payments = np.arange(len(loans)) - np.repeat(
+            np.cumsum(periods) - periods, periods
         )
+        months = terms["first_months"][loans] + terms["steps"][loans] * payments
+        lowest = months.min()
+        number_of_months = months.max() - lowest + 1
+        cells = codes[loans] * number_of_months + months - lowest
 
-        interest_payments = outstanding_balances * effective_interest_rate
+        rate = terms["rates"][loans]
+        repayment = terms["repayment_amounts"][loans]
 
-        interest_payments_results.append(
-            pd.Series(
-                interest_payments,
-                index=index,
-                name=loan_identifier,
-            )
+        outstanding = (
+            (1 - np.power(1 + rate, -(periods[loans] - payments))) / rate * repayment
         )
-
-        capital_repayments_results.append(
-            pd.Series(
-                repayment - interest_payments,
-                index=index,
-                name=loan_identifier,
+        interest = outstanding * rate
+
+        # Months nobody pays in are left out, the way they are absent from the per-loan schedules
+        paid = np.flatnonzero(np.bincount(months - lowest))
+        for name, values in (
+            ("outstanding_balance_at_start", outstanding),
+            ("capital_repayments", repayment - interest),
+            ("interest_payments", interest),
+        ):
+            # Rates the annuity formula cannot price are reported as zero, as in the per-loan schedules
+            batch_totals = np.bincount(
+                cells,
+                weights=np.where(np.isnan(values), 0, values),
+                minlength=len(keys) * number_of_months,
+            ).reshape(len(keys), number_of_months)[:, paid]
+
+            totals[name] = totals[name].add(
+                pd.DataFrame(batch_totals, index=keys, columns=paid + lowest),
+                fill_value=0,
             )
+
+    for name, df in totals.items():
+        if df.empty:
+            continue
+
+        df = df.fillna(0).sort_index(axis=1)
+        df.columns = pd.Index(
+            [
+                pd.Period(ordinal=month, freq="M").strftime("%b-%Y")
+                for month in df.columns
+            ]
         )
+        totals[name] = df
+    return totals
+
+
+BORROWING_SCHEDULES = [
+    "interest_payments",
+    "capital_repayments",
+    "outstanding_balance_at_start",
+]
+
+
+def get_month_ordinals(dates: pd.Series) -> np.ndarray:
+    return ((dates.dt.year - 1970) * 12 + dates.dt.month - 1).to_numpy(dtype=int)
+
+
+def repeat_payments(
+    first_months: np.ndarray, steps: np.ndarray, periods: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Facility, payment number and month ordinal of every payment of facilities that pay
+    `periods` times, every `steps` months from `first_months`"""
+    periods = np.maximum(periods, 0)
+    facilities = np.repeat(np.arange(len(periods)), periods)
+    payments = np.arange(len(facilities)) - np.repeat(
+        np.cumsum(periods) - periods, periods
+    )
+    return facilities, payments, first_months[facilities] + steps[facilities] * payments
 
-    repayments.index = loan_identifiers
+
+def get_straight_line_payments(borrowings: pd.DataFrame) -> dict[str, tuple]:
+    """Straight line facilities pay interest every 12 // frequency months for whole years of
+    their tenure, or once at maturity when the frequency is 0. The nominal amount is repaid at
+    maturity and is outstanding from the effective month for tenure months."""
+    effective_months = get_month_ordinals(
+        helper.convert_to_datetime(borrowings["effective_date"])
+    )
+    tenures = borrowings["tenure"].to_numpy(dtype=int)
+    frequencies = borrowings["frequency"].to_numpy(dtype=int)
+    amounts = borrowings["nominal_amount"].to_numpy(dtype=float)
+    annual_interest = amounts * borrowings["interest_rate"].to_numpy(dtype=float)
+
+    bullet = frequencies == 0
+    steps = np.where(bullet, tenures, 12 // np.where(bullet, 1, frequencies))
+    interest = np.where(
+        bullet,
+        annual_interest * tenures / 12,
+        annual_interest / np.where(bullet, 1, frequencies),
+    )
+    facilities, _, months = repeat_payments(
+        first_months=effective_months + steps,
+        steps=steps,
+        periods=np.where(bullet, 1, tenures // 12 * frequencies),
+    )
+    interest_payments = (facilities, months, interest[facilities])
+
+    capital_repayments = (
+        np.arange(len(amounts)),
+        effective_months + tenures,
+        amounts,
+    )
+
+    facilities, _, months = repeat_payments(
+        first_months=effective_months,
+        steps=np.ones(len(amounts), dtype=int),
+        periods=tenures,
+    )
+    outstanding_balances = (facilities, months, amounts[facilities])
 
     return {
-        "outstanding_balance_at_start": pd.concat(
-            outstanding_balances_results, axis=1
-        ).T.fillna(0),
-        "capital_repayments": pd.concat(capital_repayments_results, axis=1).T.fillna(0),
-        "interest_payments": pd.concat(interest_payments_results, axis=1).T.fillna(0),
-        "repayments": repayments,
+        "interest_payments": interest_payments,
+        "capital_repayments": capital_repayments,
+        "outstanding_balance_at_start": outstanding_balances,
     }
 
 
-def calculate_borrowings_schedules(borrowings: pd.DataFrame):
-    straight_line = borrowings.loc[borrowings["method"] == "straight_line"]
-    reducing_balance = borrowings.loc[borrowings["method"] == "reducing_balance"]
-
-    straight_line_loans_schedules = calculate_straight_line_loans_schedules(
-        effective_dates=straight_line["effective_date"],
-        tenures=straight_line["tenure"],
-        frequencies=straight_line["frequency"],
-        amounts=straight_line["nominal_amount"],
-        loan_identifiers=straight_line["institution"],
-        interest_rates=straight_line["interest_rate"],
+def get_reducing_balance_payments(borrowings: pd.DataFrame) -> dict[str, tuple]:
+    terms = get_reducing_balance_loan_terms(
+        interest_rates=borrowings["interest_rate"],
+        effective_dates=borrowings["effective_date"],
+        frequencies=borrowings["frequency"],
+        tenures=borrowings["tenure"],
+        amounts=borrowings["nominal_amount"],
+    )
+    periods = terms["periods"]
+    facilities, payments, months = repeat_payments(
+        first_months=terms["first_months"], steps=terms["steps"], periods=periods
     )
 
-    reducing_balance_loans_schedules = calculate_reducing_balance_loans_schedules(
-        interest_rates=reducing_balance["interest_rate"],
-        effective_dates=reducing_balance["effective_date"],
-        frequencies=reducing_balance["frequency"],
-        loan_identifiers=reducing_balance["institution"],
-        tenures=reducing_balance["tenure"],
-        amounts=reducing_balance["nominal_amount"],
+    rate = terms["rates"][facilities]
+    repayment = terms["repayment_amounts"][facilities]
+    outstanding = (
+        (1 - np.power(1 + rate, -(periods[facilities] - payments))) / rate * repayment
     )
+    interest = outstanding * rate
 
     return {
-        "interest_payments": reindex_output(
-            pd.concat(
-                [
-                    straight_line_loans_schedules["interest_payments"],
-                    reducing_balance_loans_schedules["interest_payments"],
-                ]
-            ).fillna(0)
-        ),
-        "capital_repayments": reindex_output(
-            pd.concat(
-                [
-                    straight_line_loans_schedules["capital_repayments"],
-                    reducing_balance_loans_schedules["capital_repayments"],
-                ]
-            ).fillna(0)
-        ),
-        "outstanding_balance_at_start": reindex_output(
-            pd.concat(
-                [
-                    straight_line_loans_schedules["outstanding_balance_at_start"],
-                    reducing_balance_loans_schedules["outstanding_balance_at_start"],
-                ]
-            ).fillna(0)
-        ),
+        "interest_payments": (facilities, months, interest),
+        "capital_repayments": (facilities, months, repayment - interest),
+        "outstanding_balance_at_start": (facilities, months, outstanding),
+    }
+
+
+def get_borrowing_payments(borrowings: pd.DataFrame) -> dict[str, tuple]:
+    """Every amount scheduled for a book of borrowings, as (facility, month ordinal, amount)
+    arrays per schedule. Straight line facilities come first, then reducing balance ones,
+    each in the order of the book. Also returns the institution of every facility."""
+    methods = borrowings["method"].to_numpy()
+    books = [
+        (borrowings.loc[methods == "straight_line"], get_straight_line_payments),
+        (borrowings.loc[methods == "reducing_balance"], get_reducing_balance_payments),
+    ]
+
+    payments = {name: ([], [], []) for name in BORROWING_SCHEDULES}
+    first_facility = 0
+    for book, get_payments in books:
+        if book.empty:
+            continue
+        for name, values in get_payments(book).items():
+            facilities, months, amounts = values
+            payments[name][0].append(facilities + first_facility)
+            payments[name][1].append(months)
+            payments[name][2].append(amounts)
+        first_facility += len(book)
+
+    institutions = pd.Index(
+        np.concatenate([book["institution"].to_numpy() for book, _ in books])
+    )
+    return {
+        **{
+            name: tuple(
+                np.concatenate(values) if values else np.array([], dtype=dtype)
+                for values, dtype in zip(arrays, [int, int, float])
+            )
+            for name, arrays in payments.items()
+        },
+        "institutions": institutions,
     }
+
+
+def calculate_borrowing_books_schedules(
+    books: dict[str, pd.DataFrame]
+) -> dict[str, dict[str, pd.DataFrame]]:
+    """Schedules several books of borrowings, long and short term for example, on one month axis.
+
+    Every book is parsed once into payment arrays and each schedule is filled into a single
+    (facilities, months) array for all books. "books" holds the schedules of every book, one
+    row per facility and one column per month from the book's first to its last scheduled
+    month. "all" holds every facility of every book with a "total" row, over the months of
+    all books. Amounts the annuity formula cannot price are reported as zero.
+    """
+    payments = {book: get_borrowing_payments(df) for book, df in books.items()}
+    institutions = [
+        book_payments["institutions"] for book_payments in payments.values()
+    ]
+    first_facilities = np.cumsum([0] + [len(index) for index in institutions])
+    index = pd.Index(np.concatenate(institutions)) if institutions else pd.Index([])
+
+    results = {"books": {book: {} for book in books}, "all": {}}
+    for name in BORROWING_SCHEDULES:
+        facilities = np.concatenate(
+            [
+                book_payments[name][0] + first_facility
+                for book_payments, first_facility in zip(
+                    payments.values(), first_facilities
+                )
+            ]
+            + [np.array([], dtype=int)]
+        )
+        months = np.concatenate(
+            [book_payments[name][1] for book_payments in payments.values()]
+            + [np.array([], dtype=int)]
+        )
+        amounts = np.concatenate(
+            [book_payments[name][2] for book_payments in payments.values()]
+            + [np.array([], dtype=float)]
+        )
+
+        lowest = months.min() if len(months) else 0
+        number_of_months = months.max() - lowest + 1 if len(months) else 0
+        values = np.zeros((len(index), number_of_months))
+        values[facilities, months - lowest] = np.where(np.isnan(amounts), 0, amounts)
+
+        columns = pd.period_range(
+            start=pd.Period(ordinal=int(lowest), freq="M"),
+            periods=number_of_months,
+            freq="M",
+        ).strftime("%b-%Y")
+
+        for book, first_facility, last_facility in zip(
+            books, first_facilities[:-1], first_facilities[1:]
+        ):
+            book_months = months[
+                (facilities >= first_facility) & (facilities < last_facility)
+            ]
+            if not len(book_months):
+                results["books"][book][name] = pd.DataFrame(
+                    index=index[first_facility:last_facility], dtype=float
+                )
+                continue
+
+            book_columns = slice(
+                book_months.min() - lowest, book_months.max() - lowest + 1
+            )
+            results["books"][book][name] = pd.DataFrame(
+                values[first_facility:last_facility, book_columns],
+                index=index[first_facility:last_facility],
+                columns=columns[book_columns],
+            )
+
+        all_books = pd.DataFrame(values, index=index, columns=columns)
+        all_books.loc["total"] = values.sum(axis=0)
+        results["all"][name] = all_books
+
+    return results
+
+
+def calculate_borrowings_schedules(borrowings: pd.DataFrame):
+    return calculate_borrowing_books_schedules({"borrowings": borrowings})["books"][
+        "borrowings"
+    ]
@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import List
+
+import pandas as pd
+
+from application.modeling import constants, storage
+
+
+class DataFrameCache:
+    """Size-bounded LRU cache of DataFrames keyed by object path.
+    Every entry remembers the ETag it was read at, so a lookup with a different ETag is a miss."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, etag: str) -> pd.DataFrame | None:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(path)
+            self.hits += 1
+            df = entry[1]
+
+        # Callers mutate what they read, so never hand out the cached frame itself
+        return df.copy()
+
+    def put(self, path: str, etag: str, df: pd.DataFrame):
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            self.invalidate(path)
+            return
+
+        df = df.copy()
+        with self.lock:
+            self._remove(path)
+            self.entries[path] = (etag, df, nbytes)
+            self.total_bytes += nbytes
+
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, evicted_bytes) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        with self.lock:
+            self._remove(path)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, path: str):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+
+DATAFRAME_CACHE = DataFrameCache(max_bytes=constants.DATAFRAME_CACHE_MAX_BYTES)
+
+
+def read_cached(
+    project_store: storage.ProjectStore,
+    file_stage: constants.FileStage,
+    file_name: Enum,
+    columns: List[str] | None = None,
+    filters: storage.Filters | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """Reads a file through DATAFRAME_CACHE, revalidating the cached copy with a HEAD of the object.
+    Part of a file is taken from a cached copy of the whole file when there is one, and is
+    otherwise read from the store on its own and not cached."""
+    if not project_store.is_cacheable(file_stage=file_stage, file_name=file_name):
+        return project_store.read(
+            file_stage=file_stage,
+            file_name=file_name,
+            columns=columns,
+            filters=filters,
+            limit=limit,
+        )
+
+    path = project_store.path(file_stage=file_stage, file_name=file_name)
+    etag = project_store.etag(file_stage=file_stage, file_name=file_name)
+
+    df = DATAFRAME_CACHE.get(path=path, etag=etag)
+    if df is not None:
+        return storage.project_frame(df, columns=columns, filters=filters, limit=limit)
+
+    if storage.is_projected(columns, filters, limit):
+        return project_store.read(
+            file_stage=file_stage,
+            file_name=file_name,
+            columns=columns,
+            filters=filters,
+            limit=limit,
+        )
+
+    df = project_store.read(file_stage=file_stage, file_name=file_name)
+    DATAFRAME_CACHE.put(path=path, etag=etag, df=df)
+    return df
@@ -1,7 +1,7 @@
 from enum import Enum
 
 import boto3
-from decouple import config
+from decouple import Csv, config
 
 AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
@@ -19,6 +19,22 @@ MY_SESSION = boto3.Session(
     region_name="af-south-1",
 )
 
+MAX_READ_WORKERS = 16
+SCHEDULE_CHUNK_SIZE = 50_000
+EXPORT_CHUNK_SIZE = 10_000
+INGESTION_CHUNK_SIZE = config("INGESTION_CHUNK_SIZE", default=100_000, cast=int)
+MAX_PIPELINE_WORKERS = config("MAX_PIPELINE_WORKERS", default=4, cast=int)
+MAX_UPLOAD_WORKERS = config("MAX_UPLOAD_WORKERS", default=8, cast=int)
+
+STORAGE_BACKEND = config("STORAGE_BACKEND", default="s3")
+LOCAL_STORAGE_ROOT = config("LOCAL_STORAGE_ROOT", default="/tmp/projects")
+# Tenants whose pipeline runs write each stage as one bundle object, "*" for every tenant
+BUNDLED_TENANTS = config("BUNDLED_TENANTS", default="", cast=Csv())
+
+DATAFRAME_CACHE_MAX_BYTES = config(
+    "DATAFRAME_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int
+)
+
 
 class RawFiles(str, Enum):
     details_of_assets = "details_of_assets"
@@ -83,6 +99,10 @@ class IntermediateFiles(str, Enum):
     existing_loans_schedules_outstanding_balances_df = (
         "existing_loans_schedules_outstanding_balances_df"
     )
+    existing_loans_schedules_totals_df = "existing_loans_schedules_totals_df"
+    existing_loans_schedules_totals_by_product_df = (
+        "existing_loans_schedules_totals_by_product_df"
+    )
     long_term_borrowings_schedules_outstanding_balances_df = (
         "long_term_borrowings_schedules_outstanding_balances_df"
     )
@@ -91,6 +111,14 @@ class IntermediateFiles(str, Enum):
     )
 
 
+# Per-loan schedules stored in banded form (see schedules.BandedSchedule) rather than as frames
+BANDED_SCHEDULE_FILES = [
+    IntermediateFiles.existing_loans_schedules_capital_repayments_df,
+    IntermediateFiles.existing_loans_schedules_interest_incomes_df,
+    IntermediateFiles.existing_loans_schedules_outstanding_balances_df,
+]
+
+
 class FinalFiles(str, Enum):
     income_statement_df = "income_statement_df"
     income_statement_yearly_df = "income_statement_yearly_df"
@@ -105,12 +133,65 @@ class FinalFiles(str, Enum):
     ratios_df = "ratios_df"
 
 
+class ReportingPeriod(str, Enum):
+    monthly = "monthly"
+    quarterly = "quarterly"
+    yearly = "yearly"
+    fiscal_year = "fiscal_year"
+
+
 class FileStage(str, Enum):
     intermediate = "intermediate"
     raw = "raw"
     final = "final"
+    pipeline = "pipeline"
+
+
+class PipelineFiles(str, Enum):
+    stage_fingerprints = "stage_fingerprints"
+
+
+STAGE_FILES = {
+    FileStage.raw: RawFiles,
+    FileStage.intermediate: IntermediateFiles,
+    FileStage.final: FinalFiles,
+    FileStage.pipeline: PipelineFiles,
+}
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+    arrow = "arrow"
+
+
+class StorageBackend(str, Enum):
+    s3 = "s3"
+    local = "local"
 
 
 class FundingTerm(str, Enum):
     short_term = "short_term"
     long_term = "long_term"
+
+
+class ProductParameters(str, Enum):
+    """Suffixes of the <PRODUCT>_<PARAMETER> rows of disbursement_parameters"""
+
+    interest_rate = "INTEREST_RATE"
+    average_loan_term = "AVERAGE_LOAN_TERM"
+    average_loan_size = "AVERAGE_LOAN_SIZE"
+    administration_fee = "ADMINISTRATION_FEE"
+    credit_insurance_fee = "CREDIT_INSURANCE_FEE"
+    provision_for_credit_loss = "PROVISION_FOR_CREDIT_LOSS"
+    disbursements = "DISBURSEMENTS"
+    number_of_credit_officers = "NUMBER_OF_CREDIT_OFFICERS"
+    number_of_loans_per_credit_officer = "NUMBER_OF_LOANS_PER_CREDIT_OFFICER"
+    number_of_agents = "NUMBER_OF_AGENTS"
+    number_of_loans_per_agent = "NUMBER_OF_LOANS_PER_AGENT"
+
+
+class DisbursementChannel(str, Enum):
+    direct = "direct"
+    credit_officers = "credit_officers"
+    agents = "agents"
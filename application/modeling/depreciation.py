@@ -3,35 +3,122 @@ import pandas as pd
 
 from application.modeling import helper
 
+# numpy's average Gregorian year and month, which the remaining useful life has always been counted in
+NANOSECONDS_PER_YEAR = pd.Timedelta(np.timedelta64(1, "Y")).value
+NANOSECONDS_PER_MONTH = pd.Timedelta(np.timedelta64(1, "M")).value
 
-def cal_depreciation_and_nbv(
-    depreciation_rate: float, remaining_useful_life: int, nbv: float
-) -> (np.ndarray, np.ndarray):
-    net_book_value = (
-        np.power((1 - depreciation_rate), range(1, remaining_useful_life + 1)) * nbv
+
+def get_depreciation_periods(
+    details_of_assets: pd.DataFrame, start_date, months_to_forecast: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """First and last (exclusive) month of the forecast each asset depreciates in.
+
+    Assets bought before the forecast depreciate from its first month, assets bought during
+    the forecast from the month they are bought in. Every asset stops when its life, counted
+    from the acquisition date, runs out, and an asset bought during the forecast never
+    depreciates for more months than its life.
+    """
+    start_date = pd.Timestamp(start_date)
+    acquisition_dates = helper.convert_each_to_datetime(
+        details_of_assets["acquisition_date"]
     )
-    depreciation = -np.diff(
-        np.power((1 - depreciation_rate), range(0, remaining_useful_life + 1)) * nbv
+
+    end_of_life = (
+        acquisition_dates.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        + details_of_assets["life"].to_numpy(dtype=np.int64) * NANOSECONDS_PER_YEAR
     )
-    return net_book_value, depreciation
+    remaining_useful_life = (end_of_life - start_date.value) // NANOSECONDS_PER_MONTH
 
+    starts = (
+        (acquisition_dates.dt.year - start_date.year) * 12
+        + acquisition_dates.dt.month
+        - start_date.month
+    ).to_numpy(dtype=np.int64)
+
+    starts = np.clip(starts, 0, months_to_forecast)
+    ends = np.clip(remaining_useful_life, starts, months_to_forecast)
+
+    bought_during_forecast = (acquisition_dates > start_date).to_numpy()
+    months_of_life = starts + details_of_assets["life"].to_numpy(dtype=np.int64) * 12
+    ends = np.where(bought_during_forecast, np.minimum(ends, months_of_life), ends)
+    return starts, ends
 
-def create_depreciation_and_nbv_series_index(
-    details_of_assets,
-    remaining_useful_life,
-    asset_id,
-    start_date,
-):
-    acquistion_date = details_of_assets.loc[
-        details_of_assets.asset_id == asset_id, "acquisition_date"
-    ].values[0]
 
-    acquistion_date = helper.convert_to_datetime(acquistion_date)
-    index = pd.period_range(
-        start_date, periods=remaining_useful_life, freq="M"
-    ).strftime("%b-%Y")
+def get_opening_values(details_of_assets: pd.DataFrame, start_date) -> np.ndarray:
+    """Value each asset enters the schedules at.
 
-    return index
+    Assets bought before the forecast carry their net value into it. Assets bought during the
+    forecast enter at cost in the month they are bought in, the amount
+    direct_cashflow.calculate_capital_expenses pays for them.
+    """
+    acquisition_dates = helper.convert_each_to_datetime(
+        details_of_assets["acquisition_date"]
+    )
+    bought_during_forecast = (acquisition_dates > pd.Timestamp(start_date)).to_numpy()
+
+    return np.where(
+        bought_during_forecast,
+        details_of_assets["book_value"].to_numpy(dtype=float),
+        details_of_assets["net_value"].to_numpy(dtype=float),
+    )
+
+
+def get_depreciation_months(
+    starts: np.ndarray, ends: np.ndarray, months_to_forecast: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Months each asset has been depreciating for at the end of every month of the forecast
+    (assets x months), and whether it depreciates in that month"""
+    months = np.arange(months_to_forecast)
+    active = (months >= starts[:, None]) & (months < ends[:, None])
+    return months - starts[:, None] + 1, active
+
+
+def calculate_reducing_balance_schedules(
+    net_book_values: np.ndarray,
+    depreciation_rates: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    months_to_forecast: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Net book value at the end of every month and depreciation of every month, assets x months"""
+    elapsed, active = get_depreciation_months(starts, ends, months_to_forecast)
+    remaining = (1 - depreciation_rates)[:, None]
+
+    opening = np.power(remaining, elapsed - 1) * net_book_values[:, None]
+    closing = np.power(remaining, elapsed) * net_book_values[:, None]
+
+    return np.where(active, closing, 0), np.where(active, opening - closing, 0)
+
+
+def calculate_straight_line_schedules(
+    net_book_values: np.ndarray,
+    monthly_depreciations: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    months_to_forecast: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Net book value at the end of every month and depreciation of every month, assets x months"""
+    _, active = get_depreciation_months(starts, ends, months_to_forecast)
+
+    depreciations = np.where(active, monthly_depreciations[:, None], 0)
+    closing = net_book_values[:, None] - np.cumsum(depreciations, axis=1)
+
+    return np.where(active, closing, 0), depreciations
+
+
+def to_depreciation_frames(
+    net_book_values: np.ndarray,
+    depreciations: np.ndarray,
+    asset_ids: pd.Series,
+    start_date,
+    months_to_forecast: int,
+) -> dict[str, pd.DataFrame]:
+    index = helper.generate_columns(start_date, months_to_forecast)
+    columns = pd.Index(asset_ids.to_numpy())
+    return {
+        "nbvs": pd.DataFrame(net_book_values.T, index=index, columns=columns),
+        "depreciations": pd.DataFrame(depreciations.T, index=index, columns=columns),
+    }
 
 
 def calculate_reducing_balance_depreciation(
@@ -42,58 +129,25 @@ def calculate_reducing_balance_depreciation(
     if details_of_assets.empty:
         return {"nbvs": pd.DataFrame(), "depreciations": pd.DataFrame()}
 
-    depreciations = []
-    nbvs = []
-    df_index = helper.generate_columns(start_date, months_to_forecast)
-
-    details_of_assets = details_of_assets.assign(
-        remaining_useful_life=details_of_assets.apply(
-            lambda row: np.maximum(
-                0,
-                (
-                    helper.convert_to_datetime(row["acquisition_date"])
-                    + np.timedelta64(row["life"], "Y")
-                    - np.datetime64(start_date)
-                )
-                // np.timedelta64(1, "M"),
-            ),
-            axis=1,
-        )
+    starts, ends = get_depreciation_periods(
+        details_of_assets, start_date, months_to_forecast
     )
 
-    for asset_id in details_of_assets.asset_id:
-        nbv = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "net_value"
-        ].values[0]
-        remaining_useful_life = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "remaining_useful_life"
-        ].values[0]
-        depreciation_rate = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "depreciation"
-        ].values[0]
-
-        index = create_depreciation_and_nbv_series_index(
-            details_of_assets=details_of_assets,
-            remaining_useful_life=remaining_useful_life,
-            asset_id=asset_id,
-            start_date=start_date,
-        )
-
-        net_book_value, depreciation = cal_depreciation_and_nbv(
-            depreciation_rate=depreciation_rate,
-            remaining_useful_life=remaining_useful_life,
-            nbv=nbv,
-        )
-
-        net_book_value = pd.Series(net_book_value, index=index, name=asset_id)
-        depreciation = pd.Series(depreciation, index=index, name=asset_id)
-        depreciations.append(depreciation)
-        nbvs.append(net_book_value)
+    net_book_values, depreciations = calculate_reducing_balance_schedules(
+        net_book_values=get_opening_values(details_of_assets, start_date),
+        depreciation_rates=details_of_assets["depreciation"].to_numpy(dtype=float),
+        starts=starts,
+        ends=ends,
+        months_to_forecast=months_to_forecast,
+    )
 
-    return {
-        "nbvs": pd.concat(nbvs, axis=1).reindex(df_index).fillna(0),
-        "depreciations": pd.concat(depreciations, axis=1).reindex(df_index).fillna(0),
-    }
+    return to_depreciation_frames(
+        net_book_values=net_book_values,
+        depreciations=depreciations,
+        asset_ids=details_of_assets["asset_id"],
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
+    )
 
 
 def calculate_straight_line_depreciation(
@@ -104,74 +158,33 @@ def calculate_straight_line_depreciation(
     if details_of_assets.empty:
         return {"nbvs": pd.DataFrame(), "depreciations": pd.DataFrame()}
 
-    depreciations = []
-    nbvs = []
-    df_index = helper.generate_columns(start_date, months_to_forecast)
-
-    details_of_assets = details_of_assets.assign(
-        remaining_useful_life=details_of_assets.apply(
-            lambda row: np.maximum(
-                0,
-                (
-                    helper.convert_to_datetime(row["acquisition_date"])
-                    + np.timedelta64(row["life"], "Y")
-                    - pd.Timestamp(start_date)
-                )
-                // np.timedelta64(1, "M"),
-            ),
-            axis=1,
-        )
+    starts, ends = get_depreciation_periods(
+        details_of_assets, start_date, months_to_forecast
     )
 
-    details_of_assets = details_of_assets.assign(
-        depreciation=(
-            details_of_assets["book_value"] - details_of_assets["salvage_value"]
-        )
+    costs = details_of_assets["book_value"]
+    depreciation_rates = (
+        (costs - details_of_assets["salvage_value"])
         / details_of_assets["life"]
-        / details_of_assets["book_value"]
+        / costs
         / 12
     )
 
-    for asset_id in details_of_assets.asset_id:
-        cost = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "book_value"
-        ].iat[0]
-
-        depreciation_rate = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "depreciation"
-        ].iat[0]
-        remaining_useful_life = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "remaining_useful_life"
-        ].iat[0]
-
-        net_book_value = details_of_assets.loc[
-            details_of_assets.asset_id == asset_id, "net_value"
-        ].iat[0]
-
-        monthly_depreciation = cost * depreciation_rate
-
-        index = create_depreciation_and_nbv_series_index(
-            details_of_assets=details_of_assets,
-            remaining_useful_life=remaining_useful_life,
-            start_date=start_date,
-            asset_id=asset_id,
-        )
-
-        depreciation = pd.Series(
-            np.repeat(monthly_depreciation, remaining_useful_life),
-            index=index,
-            name=asset_id,
-        )
-
-        net_book_value = -depreciation.cumsum() + net_book_value
-
-        depreciations.append(depreciation)
-        nbvs.append(net_book_value)
+    net_book_values, depreciations = calculate_straight_line_schedules(
+        net_book_values=get_opening_values(details_of_assets, start_date),
+        monthly_depreciations=(costs * depreciation_rates).to_numpy(dtype=float),
+        starts=starts,
+        ends=ends,
+        months_to_forecast=months_to_forecast,
+    )
 
-    return {
-        "nbvs": pd.concat(nbvs, axis=1).reindex(df_index).fillna(0),
-        "depreciations": pd.concat(depreciations, axis=1).reindex(df_index).fillna(0),
-    }
+    return to_depreciation_frames(
+        net_book_values=net_book_values,
+        depreciations=depreciations,
+        asset_ids=details_of_assets["asset_id"],
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
+    )
 
 
 def calculate_depreciations_and_nbvs(
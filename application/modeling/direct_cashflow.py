@@ -1,10 +1,47 @@
 import numpy as np
 import pandas as pd
 
-from application.modeling import helper
-
-
-def add_other_assets(other_parameters: pd.DataFrame, direct_cashflow_df: pd.DataFrame):
+from application.modeling import helper, statements
+
+DIRECT_CASHFLOW = statements.parse_layout(
+    """
+    CASH INFLOWS
+    Short Term Borrowing
+    Long Term Borrowing
+    Capital Repayment
+    Interest Income
+    Other Income
+    Receipts From Receivables
+    Sale Of Other Assets
+    Issue Of Equity And Intercompany Loans
+    Total Cash Inflows = sum(Short Term Borrowing .. Issue Of Equity And Intercompany Loans)
+    CASH OUTFLOWS
+    Disbursements
+    Interest Expense
+    Capital Repayment On Borrowings
+    Operating Expenses
+    Capital Expenses
+    Payments To Payables
+    Repayments On Intercompany Loans and Equity Buyback
+    Purchase Of Inventory
+    Purchase Of Other Assets
+    Dividend Paid
+    Tax Paid
+    Total Cash Outflows = sum(Disbursements .. Tax Paid)
+    Net Increase/Decrease In Cash = Total Cash Inflows + Total Cash Outflows
+    Opening Balance
+    Closing Balance
+    """,
+    name="DIRECT_CASHFLOW_STATEMENT",
+    opening_lines=["Opening Balance"],
+    closing_lines=["Closing Balance"],
+)
+
+
+def add_other_assets(
+    other_parameters: pd.DataFrame,
+    direct_cashflow_builder: statements.StatementBuilder,
+):
     other_assets = other_parameters.loc[
         [
             "INTANGIBLE_ASSETS",
@@ -22,19 +59,20 @@ def add_other_assets(other_parameters: pd.DataFrame, direct_cashflow_df: pd.Data
 
     sale_of_other_assets = (np.where(other_assets < 0, 1, 0) * other_assets).sum()
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Purchase Of Other Assets"
     ] = helper.change_period_index_to_strftime(purchase_of_other_assets)
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Sale Of Other Assets"
     ] = helper.change_period_index_to_strftime(sale_of_other_assets)
 
-    return direct_cashflow_df
+    return direct_cashflow_builder
 
 
 def add_equity_and_intercompany_loans(
-    other_parameters: pd.DataFrame, direct_cashflow_df: pd.DataFrame
+    other_parameters: pd.DataFrame,
+    direct_cashflow_builder: statements.StatementBuilder,
 ):
     equity_and_intercompany_loans = other_parameters.loc[
         [
@@ -55,56 +93,21 @@ def add_equity_and_intercompany_loans(
         * equity_and_intercompany_loans
     ).sum()
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Issue Of Equity And Intercompany Loans"
     ] = helper.change_period_index_to_strftime(issue_of_equity_and_intercompany_loans)
 
-    direct_cashflow_df.loc[
-        "Repayments On Intercompany Loans and Equity Buyback",
+    direct_cashflow_builder[
+        "Repayments On Intercompany Loans and Equity Buyback"
     ] = -helper.change_period_index_to_strftime(
         sale_of_equity_and_repayments_on_intercompany_loans
     )
 
-    return direct_cashflow_df
+    return direct_cashflow_builder
 
 
 def generate_direct_cashflow_template(start_date, months_to_forecast):
-    direct_cashflow = pd.DataFrame(
-        index=pd.Index(
-            [
-                "CASH INFLOWS",
-                "Short Term Borrowing",
-                "Long Term Borrowing",
-                "Capital Repayment",
-                "Interest Income",
-                "Other Income",
-                "Receipts From Receivables",
-                "Sale Of Other Assets",
-                "Issue Of Equity And Intercompany Loans",
-                "Total Cash Inflows",
-                "CASH OUTFLOWS",
-                "Disbursements",
-                "Interest Expense",
-                "Capital Repayment On Borrowings",
-                "Operating Expenses",
-                "Capital Expenses",
-                "Payments To Payables",
-                "Repayments On Intercompany Loans and Equity Buyback",
-                "Purchase Of Inventory",
-                "Purchase Of Other Assets",
-                "Dividend Paid",
-                "Tax Paid",
-                "Total Cash Outflows",
-                "Net Increase/Decrease In Cash",
-                "Opening Balance",
-                "Closing Balance",
-            ],
-            name="DIRECT_CASHFLOW_STATEMENT",
-        ),
-        columns=helper.generate_columns(start_date, months_to_forecast),
-        data=np.nan,
-    )
-    return direct_cashflow
+    return DIRECT_CASHFLOW.builder(start_date, months_to_forecast)
 
 
 def calculate_operating_expenses(income_statement: pd.DataFrame):
@@ -233,32 +236,14 @@ def calculate_direct_cashflow_capital_repayment_on_borrowings(
 def calculate_opening_and_closing_balances_for_direct_cashflows(
     direct_cashflow: pd.DataFrame,
     cash_on_hand_opening_balance: float,
-    yearly: bool = False,
 ):
     direct_cashflow.loc[
         "Opening Balance", direct_cashflow.columns[0]
     ] = cash_on_hand_opening_balance
 
-    initial_columns = direct_cashflow.columns
-
-    if yearly:
-        direct_cashflow.columns = pd.PeriodIndex(direct_cashflow.columns, freq="Y")
-    else:
-        direct_cashflow.columns = pd.PeriodIndex(direct_cashflow.columns, freq="M")
-
-    for period in direct_cashflow.columns:
-        direct_cashflow.loc["Closing Balance", period] = direct_cashflow.loc[
-            "Net Increase/Decrease In Cash":"Opening Balance", period
-        ].sum()
-        if period == direct_cashflow.columns[-1]:
-            break
-        direct_cashflow.loc["Opening Balance", period + 1] = direct_cashflow.loc[
-            "Closing Balance", period
-        ]
-
-    direct_cashflow.columns = initial_columns
-
-    return direct_cashflow
+    return helper.roll_forward_balances(
+        direct_cashflow, movement_rows=["Net Increase/Decrease In Cash"]
+    )
 
 
 def calculate_capital_repayment_on_borrowings(
@@ -427,19 +412,3 @@ def calculate_long_and_short_term_borrowing_for_direct_cashflow(
             "total": short_term_borrowing + long_term_borrowing,
         }
     )
-
-
-def calculate_direct_cashflow_yearly(
-    direct_cashflow_df: pd.DataFrame, opening_balances: pd.DataFrame
-):
-    direct_cashflow_yearly_df = direct_cashflow_df.groupby(
-        pd.DatetimeIndex(direct_cashflow_df.columns).year, axis=1
-    ).sum()
-
-    direct_cashflow_yearly_df.columns = direct_cashflow_yearly_df.columns.astype(str)
-
-    return calculate_opening_and_closing_balances_for_direct_cashflows(
-        direct_cashflow=direct_cashflow_yearly_df,
-        cash_on_hand_opening_balance=opening_balances["CASH_ON_HAND"].iat[0],
-        yearly=True,
-    )
@@ -1,33 +1,30 @@
 import numpy as np
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import constants, helper, products
 
 
 def calculate_agent_commission(
-    consumer_pvt_disbursements: pd.Series,
-    consumer_ssb_disbursements: pd.Series,
+    agent_disbursements: pd.Series,
     agent_commission_percentage: pd.Series,
 ):
-    agent_commission = agent_commission_percentage * (
-        consumer_pvt_disbursements + consumer_ssb_disbursements
-    )
+    agent_commission = agent_commission_percentage * agent_disbursements
     return agent_commission
 
 
 def calculate_credit_officer_salaries(
     credit_officer_salary: pd.Series,
-    sme_number_of_credit_officers: pd.Series,
+    number_of_credit_officers: pd.Series,
 ):
-    credit_officer_salaries = credit_officer_salary * sme_number_of_credit_officers
+    credit_officer_salaries = credit_officer_salary * number_of_credit_officers
     return credit_officer_salaries
 
 
 def calculate_credit_officer_commission(
-    sme_disbursements: pd.Series,
+    credit_officer_disbursements: pd.Series,
     credit_officer_commission: pd.Series,
 ):
-    credit_officer_commission = credit_officer_commission * sme_disbursements
+    credit_officer_commission = credit_officer_commission * credit_officer_disbursements
     return credit_officer_commission
 
 
@@ -131,64 +128,35 @@ def calculate_business_acqusition(
     return total_acquisition
 
 
-def calculate_interest_expense(df, to_pad, idx):
-    remaining_loan_term = df.loc[idx, "remaining_loan_term"]
-    loan_interest = df.loc[idx, "interest"]
-    interest = np.pad(
-        np.repeat(loan_interest, remaining_loan_term), (0, to_pad - remaining_loan_term)
-    )
-    return interest
-
-
-def convert_interest_array_to_series(interest_array, start_date):
-    return pd.Series(
-        interest_array, index=helper.generate_columns(start_date, len(interest_array))
-    )
-
-
-def reindex_columns(df, start_date, months_to_forecast):
-    return df.reindex(
-        helper.generate_columns(start_date, months_to_forecast),
-        axis=1,
-        fill_value=0,
-    )
-
-
-def determine_start_date(df, start_date, idx):
-    if "loan_start_date" in df.columns:
-        start_date = df.loc[idx, "loan_start_date"]
+def calculate_interest_expense_on_borrowing(
+    details_of_borrowing: pd.DataFrame, months_to_forecast: int, start_date: str
+) -> pd.DataFrame:
+    """Monthly interest of every facility over the forecast, one row per company. A facility
+    pays interest_rate * principal / loan_term for remaining_loan_term months from its
+    loan_start_date, or from the start of the forecast when the book has no start dates."""
+    first_month = pd.Period(start_date, freq="M").ordinal
+    if "loan_start_date" in details_of_borrowing.columns:
+        starts = (
+            pd.PeriodIndex(
+                pd.to_datetime(details_of_borrowing["loan_start_date"]), freq="M"
+            ).asi8
+            - first_month
+        )
     else:
-        start_date = start_date
-    return start_date
+        starts = np.zeros(len(details_of_borrowing), dtype=int)
+    ends = starts + details_of_borrowing["remaining_loan_term"].to_numpy(dtype=int)
 
+    monthly_interest = (
+        details_of_borrowing["interest_rate"] * details_of_borrowing["principal"]
+    ).to_numpy(dtype=float) / details_of_borrowing["loan_term"].to_numpy(dtype=float)
 
-def calculate_interest_expense_on_borrowing(
-    details_of_borrowing, months_to_forecast, start_date
-):
-    interests = []
-    temp = details_of_borrowing.copy()
-    temp = temp.assign(
-        interest=(
-            details_of_borrowing["interest_rate"] * details_of_borrowing["principal"]
-        )
-        / temp["loan_term"]
-    )
-    to_pad = temp.loan_term.max()
-    for i in range(len(temp)):
-        start_date = determine_start_date(temp, start_date=start_date, idx=i)
-        interest = calculate_interest_expense(temp, to_pad=to_pad, idx=i)
-        interest = convert_interest_array_to_series(
-            interest_array=interest, start_date=start_date
-        )
-        interests.append(interest)
-    interest_expense = pd.concat(interests, axis=1).T.fillna(0)
-    interest_expense = reindex_columns(
-        interest_expense,
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
+    months = np.arange(months_to_forecast)
+    paying = (months >= starts[:, np.newaxis]) & (months < ends[:, np.newaxis])
+    return pd.DataFrame(
+        np.where(paying, monthly_interest[:, np.newaxis], 0),
+        index=pd.Index(details_of_borrowing["company"]),
+        columns=helper.generate_columns(start_date, months_to_forecast),
     )
-    interest_expense.index = temp["company"]
-    return interest_expense
 
 
 def aggregate_interest_expense_short_term_borrowing(
@@ -217,52 +185,20 @@ def aggregate_interest_expense_on_borrowing(
     )
 
 
-def calculate_provision_for_credit_loss(
-    disbursements: pd.Series, provision_for_credit_loss: float
-):
-    return helper.change_period_index_to_strftime(
-        (disbursements * provision_for_credit_loss)
-    )
-
-
 def calculate_provision_for_credit_loss_for_all_new_disbursements(
     new_disbursements_df: pd.DataFrame, disbursement_parameters: pd.DataFrame
 ):
-    sme_provision_for_credit_loss = calculate_provision_for_credit_loss(
-        new_disbursements_df["sme_disbursements"],
-        disbursement_parameters.loc["SME_PROVISION_FOR_CREDIT_LOSS"],
-    )
-    b2b_provision_for_credit_loss = calculate_provision_for_credit_loss(
-        new_disbursements_df["b2b_disbursements"],
-        disbursement_parameters.loc["B2B_PROVISION_FOR_CREDIT_LOSS"],
-    )
-    consumer_ssb_provision_for_credit_loss = calculate_provision_for_credit_loss(
-        new_disbursements_df["consumer_ssb_disbursements"],
-        disbursement_parameters.loc["CONSUMER_SSB_PROVISION_FOR_CREDIT_LOSS"],
-    )
-    consumer_pvt_provision_for_credit_loss = calculate_provision_for_credit_loss(
-        new_disbursements_df["consumer_pvt_disbursements"],
-        disbursement_parameters.loc["CONSUMER_PVT_PROVISION_FOR_CREDIT_LOSS"],
-    )
+    product_segments = products.get_product_segments(disbursement_parameters)
 
-    provision_for_credit_loss_new_disbursements = helper.add_series(
-        [
-            sme_provision_for_credit_loss,
-            b2b_provision_for_credit_loss,
-            consumer_ssb_provision_for_credit_loss,
-            consumer_pvt_provision_for_credit_loss,
-        ]
-    )
-
-    return pd.DataFrame(
-        {
-            "sme_provision_for_credit_loss": sme_provision_for_credit_loss,
-            "b2b_provision_for_credit_loss": b2b_provision_for_credit_loss,
-            "consumer_ssb_provision_for_credit_loss": consumer_ssb_provision_for_credit_loss,
-            "consumer_pvt_provision_for_credit_loss": consumer_pvt_provision_for_credit_loss,
-            "total": provision_for_credit_loss_new_disbursements,
-        }
+    provision_for_credit_loss = product_segments.to_frame(
+        product_segments.select(new_disbursements_df, "disbursements")
+        * product_segments.get(constants.ProductParameters.provision_for_credit_loss)[
+            :, : len(new_disbursements_df)
+        ],
+        suffix="provision_for_credit_loss",
+        index=new_disbursements_df.index,
     )
+    return helper.change_period_index_to_strftime(provision_for_credit_loss)
 
 
 def calculate_salaries_and_pension_and_statutory_contributions(
@@ -277,21 +213,35 @@ def calculate_salaries_and_pension_and_statutory_contributions(
         "PENSION_AND_STATUROTY_CONTRIBUTIONS_PERCENT"
     ]
 
+    product_segments = products.get_product_segments(disbursement_parameters)
+    disbursements = pd.DataFrame(
+        product_segments.select(new_disbursements_df, "disbursements").T,
+        index=new_disbursements_df.index,
+    )
+    through_agents = product_segments.is_channel(constants.DisbursementChannel.agents)
+    through_credit_officers = product_segments.is_channel(
+        constants.DisbursementChannel.credit_officers
+    )
+
     agent_commission = calculate_agent_commission(
-        consumer_pvt_disbursements=new_disbursements_df["consumer_pvt_disbursements"],
-        consumer_ssb_disbursements=new_disbursements_df["consumer_ssb_disbursements"],
+        agent_disbursements=disbursements.loc[:, through_agents].sum(axis=1),
         agent_commission_percentage=disbursement_parameters.loc["AGENT_COMMISSION"],
     )
 
     credit_officer_salaries = calculate_credit_officer_salaries(
         credit_officer_salary=disbursement_parameters.loc["CREDIT_OFFICER_SALARY"],
-        sme_number_of_credit_officers=disbursement_parameters.loc[
-            "SME_NUMBER_OF_CREDIT_OFFICERS"
-        ],
+        number_of_credit_officers=pd.Series(
+            product_segments.get(
+                constants.ProductParameters.number_of_credit_officers, default=0
+            )[through_credit_officers].sum(axis=0),
+            index=disbursement_parameters.columns,
+        ),
     )
 
     credit_officer_commission = calculate_credit_officer_commission(
-        sme_disbursements=new_disbursements_df["sme_disbursements"],
+        credit_officer_disbursements=disbursements.loc[:, through_credit_officers].sum(
+            axis=1
+        ),
         credit_officer_commission=disbursement_parameters.loc[
             "CREDIT_OFFICER_COMMISSION"
         ],
@@ -331,50 +281,24 @@ def calculate_finance_costs(
     start_date: str,
     months_to_forecast: int,
 ):
-    interest_expense_existing_long_term_borrowing = (
+    """Interest expense of the four borrowing books, worked out for all of them in one pass.
+    Companies that borrow in several books get one row with the sum of their facilities."""
+    interest_expense = (
         calculate_interest_expense_on_borrowing(
-            details_of_borrowing=details_of_existing_long_term_borrowing,
+            details_of_borrowing=pd.concat(
+                [
+                    details_of_existing_long_term_borrowing,
+                    details_of_existing_short_term_borrowing,
+                    details_of_new_short_term_borrowing,
+                    details_of_new_long_term_borrowing,
+                ],
+                ignore_index=True,
+            ),
             months_to_forecast=months_to_forecast,
             start_date=start_date,
         )
-    )
-
-    interest_expense_existing_short_term_borrowing = (
-        calculate_interest_expense_on_borrowing(
-            details_of_borrowing=details_of_existing_short_term_borrowing,
-            months_to_forecast=months_to_forecast,
-            start_date=start_date,
-        )
-    )
-
-    interest_expense_new_short_term_borrowing = calculate_interest_expense_on_borrowing(
-        details_of_borrowing=details_of_new_short_term_borrowing,
-        months_to_forecast=months_to_forecast,
-        start_date=start_date,
-    )
-
-    interest_expense_new_long_term_borrowing = calculate_interest_expense_on_borrowing(
-        details_of_borrowing=details_of_new_long_term_borrowing,
-        months_to_forecast=months_to_forecast,
-        start_date=start_date,
-    )
-
-    interest_expense_short_term_borrowing = (
-        aggregate_interest_expense_short_term_borrowing(
-            interest_expense_existing_short_term_borrowing,
-            interest_expense_new_short_term_borrowing,
-        )
-    )
-
-    interest_expense_long_term_borrowing = (
-        aggregate_interest_expense_long_term_borrowing(
-            interest_expense_existing_long_term_borrowing,
-            interest_expense_new_long_term_borrowing,
-        )
-    )
-
-    interest_expense = aggregate_interest_expense_long_term_borrowing(
-        interest_expense_short_term_borrowing, interest_expense_long_term_borrowing
+        .groupby(level=0)
+        .sum()
     )
     interest_expense.loc["total"] = interest_expense.sum()
 
@@ -0,0 +1,104 @@
+import itertools
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.responses import StreamingResponse
+
+from application.modeling import constants
+
+MEDIA_TYPES = {
+    constants.ExportFormat.csv: "text/csv",
+    constants.ExportFormat.parquet: "application/vnd.apache.parquet",
+    constants.ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+}
+
+
+class ByteChunks:
+    """A file that keeps what is written to it until it is taken, for writers that expect a file"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_frame(
+    df: pd.DataFrame, chunk_size: int = constants.EXPORT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Consecutive rows of df, at least one frame even when df is empty so its header is kept"""
+    for start in range(0, max(len(df), 1), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def encode_csv(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=True, header=header).encode()
+        header = False
+
+
+def encode_arrow(
+    chunks: Iterator[pd.DataFrame], file_format: constants.ExportFormat
+) -> Iterator[bytes]:
+    """Encodes frames as one Parquet row group or Arrow record batch each, with the types of the
+    first of them"""
+    sink = ByteChunks()
+    schema = None
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=True)
+        if writer is None:
+            schema = table.schema
+            if file_format == constants.ExportFormat.parquet:
+                writer = pq.ParquetWriter(sink, schema)
+            else:
+                writer = pa.ipc.new_stream(sink, schema)
+        writer.write_table(table)
+        yield sink.take()
+
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+def export_response(
+    chunks: Iterator[pd.DataFrame],
+    download_name: str,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
+    media_type: str | None = None,
+) -> StreamingResponse:
+    """Streams frames as a CSV, Parquet or Arrow download, encoding each one as it is sent.
+
+    The first frame is read before the response starts, so a file that cannot be read fails the
+    request instead of ending the download early.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    chunks = itertools.chain([] if first is None else [first], chunks)
+
+    if file_format == constants.ExportFormat.csv:
+        content = encode_csv(chunks)
+    else:
+        content = encode_arrow(chunks, file_format=file_format)
+
+    return StreamingResponse(
+        content,
+        media_type=media_type or MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{download_name}.{file_format.value}"'
+        },
+    )
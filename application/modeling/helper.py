@@ -1,11 +1,20 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
-from typing import List
+from typing import Iterator, List, Tuple
 
-import awswrangler as wr
+import numpy as np
 import pandas as pd
 from botocore.exceptions import ClientError
 from fastapi import File, HTTPException, Response, UploadFile, status
-from application.modeling import constants
+from application.modeling import (
+    cache,
+    constants,
+    ingestion,
+    project_calendar,
+    schedules,
+    storage,
+)
 
 
 def get_tenant_name(tenant_name: str):
@@ -42,19 +51,25 @@ def upload_multiple_files(
     my_session,
     files: List[UploadFile] = File(...),
 ):
-    filenames = get_list_from_string_enum(constants.RawFiles)
-
-    for i in files:
-        for j in filenames:
-            if i.filename.startswith(j):
-                print(i.filename)
-                temp = pd.read_csv(i.file)
-                temp.columns = temp.columns.str.strip()
-                wr.s3.to_parquet(
-                    df=temp,
-                    path=f"s3://{tenant_name}/project_{project_id}/raw/{j}.parquet",
-                    boto3_session=my_session,
+    project_store = storage.get_project_store(
+        tenant_name=tenant_name, project_id=project_id, boto3_session=my_session
+    )
+
+    try:
+        for file in files:
+            file_name = ingestion.get_raw_file_name(file.filename)
+            if file_name is None:
+                continue
+            ingestion.ingest_csv(
+                file=file.file, file_name=file_name, project_store=project_store
+            )
+            cache.DATAFRAME_CACHE.invalidate(
+                project_store.path(
+                    file_stage=constants.FileStage.raw, file_name=file_name
                 )
+            )
+    except ClientError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     return {"message": "done"}
 
 
@@ -67,15 +82,83 @@ def upload_file(
     file_stage: constants.FileStage,
 ):
     try:
-        wr.s3.to_parquet(
-            df=file,
-            path=f"s3://{tenant_name}/project_{project_id}/{file_stage.value}/{file_name.value}.parquet",
-            boto3_session=boto3_session,
-            index=True,
+        project_store = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        )
+        project_store.write(df=file, file_stage=file_stage, file_name=file_name)
+        cache.DATAFRAME_CACHE.invalidate(
+            project_store.path(file_stage=file_stage, file_name=file_name)
         )
 
-        print(
-            f"s3://{tenant_name}/project_{project_id}/{file_stage.value}/{file_name.value}.parquet"
+        print(project_store.path(file_stage=file_stage, file_name=file_name))
+
+        return {"message": "Files uploaded successfully"}
+    except ClientError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
+def write_behind(endpoint):
+    """Lets a stage endpoint go on calculating while the files it writes are uploaded, and waits for
+    the uploads before it returns. Files that are still uploading are read back from memory.
+    Failed uploads are raised together once every upload has finished, unless the endpoint failed
+    itself, in which case its own error is raised.
+    Inside a pipeline run the run store already holds the writes, so nothing changes there."""
+
+    @functools.wraps(endpoint)
+    def write_behind_endpoint(*args, **kwargs):
+        project_store = storage.get_project_store(
+            tenant_name=kwargs["current_user"].tenant.company_name,
+            project_id=kwargs["project_id"],
+            boto3_session=constants.MY_SESSION,
+        )
+        if isinstance(
+            project_store, (storage.RunProjectStore, storage.WriteBehindProjectStore)
+        ):
+            return endpoint(*args, **kwargs)
+
+        write_behind_store = storage.WriteBehindProjectStore(
+            backing_store=project_store
+        )
+        token = storage.WRITE_BEHIND_STORE.set(write_behind_store)
+        try:
+            response = endpoint(*args, **kwargs)
+        except Exception:
+            # The uploads queued before the endpoint failed still land
+            storage.WRITE_BEHIND_STORE.reset(token)
+            paths, _ = write_behind_store.flush()
+            for path in paths:
+                cache.DATAFRAME_CACHE.invalidate(path)
+            raise
+
+        storage.WRITE_BEHIND_STORE.reset(token)
+        paths, errors = write_behind_store.flush()
+        for path in paths:
+            cache.DATAFRAME_CACHE.invalidate(path)
+
+        if errors:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=errors)
+        return response
+
+    return write_behind_endpoint
+
+
+def upload_banded_schedule(
+    project_id: int,
+    tenant_name: str,
+    boto3_session,
+    schedule: schedules.BandedSchedule,
+    file_name: Enum,
+    file_stage: constants.FileStage = constants.FileStage.intermediate,
+):
+    try:
+        project_store = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        )
+        project_store.write_table(
+            table=schedule.to_table(), file_stage=file_stage, file_name=file_name
+        )
+        cache.DATAFRAME_CACHE.invalidate(
+            project_store.path(file_stage=file_stage, file_name=file_name)
         )
 
         return {"message": "Files uploaded successfully"}
@@ -83,6 +166,25 @@ def upload_file(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
+def read_banded_schedule(
+    tenant_name: str,
+    project_id: int,
+    boto3_session,
+    file_name: Enum,
+    file_stage: constants.FileStage = constants.FileStage.intermediate,
+) -> schedules.BandedSchedule:
+    try:
+        table = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        ).read_table(file_stage=file_stage, file_name=file_name)
+
+        return schedules.BandedSchedule.from_table(table)
+    except ClientError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
 def read_expenses_file(
     tenant_name: str,
     project_id: int,
@@ -92,26 +194,54 @@ def read_expenses_file(
     file_name: Enum,
 ):
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/raw/{file_name.value}.parquet",
-            boto3_session=boto3_session,
-        )
+        df = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        ).read(file_stage=constants.FileStage.raw, file_name=file_name)
 
-        df = df.set_index(df.columns[0])
-        df.index.name = ""
-        df = match_months_to_forecast_with_df(
-            df=df,
-            months_to_forecast=months_to_forecast,
-            start_date=start_date,
+        return format_expenses_file(
+            df=df, months_to_forecast=months_to_forecast, start_date=start_date
         )
-
-        return df
     except ClientError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
+def get_stored_columns(
+    project_store: storage.ProjectStore,
+    file_name: Enum,
+    columns: List[str] | None,
+    filters: storage.Filters | None,
+) -> Tuple[List[str] | None, storage.Filters | None]:
+    """Columns and filters on a raw file, named the way columns_to_snake_case names its columns,
+    renamed to the columns as the file stores them. Columns the file does not have are left out,
+    as they would be missing from a whole read of the file too."""
+    if columns is None and not filters:
+        return columns, filters
+
+    names = project_store.read_column_names(
+        file_stage=constants.FileStage.raw, file_name=file_name
+    )
+    stored = {
+        **dict(
+            zip(pd.Index(names).str.strip().str.lower().str.replace(" ", "_"), names)
+        ),
+        **{name: name for name in names},
+    }
+
+    if columns is not None:
+        columns = [stored[column] for column in columns if column in stored]
+    if filters:
+        filters = [
+            [
+                (stored.get(column, column), operator, value)
+                for column, operator, value in conjunction
+            ]
+            for conjunction in storage.get_conjunctions(filters)
+        ]
+    return columns, filters
+
+
 def read_raw_file(
     tenant_name: str,
     project_id: int,
@@ -119,31 +249,119 @@ def read_raw_file(
     file_name: Enum,
     set_index: bool = False,
     for_output: bool = False,
+    columns: List[str] | None = None,
+    filters: storage.Filters | None = None,
+    limit: int | None = None,
 ):
+    """Reads a raw file, or only its snake_case `columns` and the first `limit` of its rows that
+    pass `filters`, which the store reads without fetching the rest of the file"""
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/raw/{file_name.value}.parquet",
-            boto3_session=boto3_session,
+        project_store = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        )
+        columns, filters = get_stored_columns(
+            project_store=project_store,
+            file_name=file_name,
+            columns=columns,
+            filters=filters,
+        )
+        df = project_store.read(
+            file_stage=constants.FileStage.raw,
+            file_name=file_name,
+            columns=columns,
+            filters=filters,
+            limit=limit,
         )
 
-        if set_index:
-            df = df.set_index(df.columns[0])
-            df.index.name = ""
-        else:
-            df.rename({"Unnamed:_0": ""}, axis=1, inplace=True)
-            # df = df.set_index(df.columns[0])
+        return format_raw_file(df=df, set_index=set_index, for_output=for_output)
+    except ClientError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
-        if for_output:
-            df = df.set_index(df.columns[0])
-            df.rename({"Unnamed:_0": ""}, axis=1, inplace=True)
 
-        return df
+def read_raw_file_in_chunks(
+    tenant_name: str,
+    project_id: int,
+    boto3_session,
+    file_name: Enum,
+    chunk_size: int = constants.SCHEDULE_CHUNK_SIZE,
+    columns: List[str] | None = None,
+    for_output: bool = False,
+) -> Iterator[pd.DataFrame]:
+    try:
+        project_store = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        )
+        columns, _ = get_stored_columns(
+            project_store=project_store,
+            file_name=file_name,
+            columns=columns,
+            filters=None,
+        )
+        chunks = project_store.read_chunks(
+            file_stage=constants.FileStage.raw,
+            file_name=file_name,
+            chunk_size=chunk_size,
+            columns=columns,
+        )
+
+        for chunk in chunks:
+            yield format_raw_file(df=chunk, for_output=for_output)
     except ClientError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
+def read_existing_loan_disbursement_dates(
+    tenant_name: str,
+    project_id: int,
+    boto3_session,
+) -> pd.Series:
+    """Disbursement dates of the whole loan tape, parsed in chunks with the format of the first chunk.
+    Within a pipeline run the tape is parsed once and every stage gets the same dates."""
+
+    def parse() -> pd.Series:
+        date_format = None
+        dates = []
+        for existing_loans in read_raw_file_in_chunks(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=boto3_session,
+            file_name=constants.RawFiles.existing_loans,
+            columns=["disbursement_date"],
+        ):
+            existing_loans = columns_to_snake_case(existing_loans)
+            if date_format is None:
+                date_format = get_date_format(existing_loans["disbursement_date"])
+            dates.append(
+                pd.to_datetime(
+                    existing_loans["disbursement_date"], format=date_format
+                ).to_numpy()
+            )
+
+        return pd.Series(
+            np.concatenate(dates) if dates else np.array([], dtype="datetime64[ns]"),
+            name="disbursement_date",
+        )
+
+    try:
+        dates = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        ).derive(
+            file_stage=constants.FileStage.raw,
+            file_name=constants.RawFiles.existing_loans,
+            name="disbursement_date",
+            compute=parse,
+        )
+        return dates.copy()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
 def read_disbursement_parameters_file(
     tenant_name: str,
     project_id: int,
@@ -152,22 +370,16 @@ def read_disbursement_parameters_file(
     months_to_forecast: int,
 ):
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/raw/disbursement_parameters.parquet",
-            boto3_session=boto3_session,
+        df = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        ).read(
+            file_stage=constants.FileStage.raw,
+            file_name=constants.RawFiles.disbursement_parameters,
         )
 
-        df = df.set_index(df.columns[0])
-        df.index.name = ""
-        df = match_months_to_forecast_with_df(
-            df=df,
-            months_to_forecast=months_to_forecast,
-            start_date=start_date,
+        return format_parameters_file(
+            df=df, months_to_forecast=months_to_forecast, start_date=start_date
         )
-
-        df.columns = list(map(str, df.columns))
-
-        return df
     except ClientError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except Exception as e:
@@ -182,23 +394,16 @@ def read_other_parameters_file(
     months_to_forecast: int,
 ):
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/raw/other_parameters.parquet",
-            boto3_session=boto3_session,
+        df = storage.get_project_store(
+            tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+        ).read(
+            file_stage=constants.FileStage.raw,
+            file_name=constants.RawFiles.other_parameters,
         )
 
-        df = df.set_index(df.columns[0])
-        df.index.name = ""
-
-        df = match_months_to_forecast_with_df(
-            df=df,
-            months_to_forecast=months_to_forecast,
-            start_date=start_date,
+        return format_parameters_file(
+            df=df, months_to_forecast=months_to_forecast, start_date=start_date
         )
-
-        df.columns = list(map(str, df.columns))
-
-        return df
     except ClientError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except Exception as e:
@@ -210,11 +415,24 @@ def read_intermediate_file(
     project_id: int,
     boto3_session,
     file_name: Enum,
+    columns: List[str] | None = None,
+    filters: storage.Filters | None = None,
+    limit: int | None = None,
 ):
+    """Reads an intermediate file, or only its `columns` and the first `limit` of its rows that
+    pass `filters`. The index is always read."""
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/intermediate/{file_name.value}.parquet",
-            boto3_session=boto3_session,
+        df = cache.read_cached(
+            project_store=storage.get_project_store(
+                tenant_name=tenant_name,
+                project_id=project_id,
+                boto3_session=boto3_session,
+            ),
+            file_stage=constants.FileStage.intermediate,
+            file_name=file_name,
+            columns=columns,
+            filters=filters,
+            limit=limit,
         )
 
         return df
@@ -231,9 +449,14 @@ def read_final_file(
     file_name: Enum,
 ):
     try:
-        df = wr.s3.read_parquet(
-            f"s3://{tenant_name}/project_{project_id}/final/{file_name.value}.parquet",
-            boto3_session=boto3_session,
+        df = cache.read_cached(
+            project_store=storage.get_project_store(
+                tenant_name=tenant_name,
+                project_id=project_id,
+                boto3_session=boto3_session,
+            ),
+            file_stage=constants.FileStage.final,
+            file_name=file_name,
         )
 
         return df
@@ -243,22 +466,99 @@ def read_final_file(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
 
 
-def add_period_index(series: pd.Series, start_date: str, periods: int):
-    index = pd.period_range(start=start_date, periods=periods, freq="M").strftime(
-        "%b-%Y"
+def read_files(
+    tenant_name: str,
+    project_id: int,
+    boto3_session,
+    file_keys: List[Tuple[constants.FileStage, Enum]],
+    max_workers: int = constants.MAX_READ_WORKERS,
+) -> List[pd.DataFrame]:
+    """Reads several files on a bounded thread pool and returns them in the order of `file_keys`.
+    Banded schedule files come back as schedules.BandedSchedule, everything else as a DataFrame.
+    Failures are collected per file and raised together once every read has finished."""
+    project_store = storage.get_project_store(
+        tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
     )
-    series.index = index
-    return series
+
+    def read(file_stage: constants.FileStage, file_name: Enum) -> pd.DataFrame:
+        if file_name in constants.BANDED_SCHEDULE_FILES:
+            return schedules.BandedSchedule.from_table(
+                project_store.read_table(file_stage=file_stage, file_name=file_name)
+            )
+        if file_stage == constants.FileStage.raw:
+            return project_store.read(file_stage=file_stage, file_name=file_name)
+        return cache.read_cached(
+            project_store=project_store, file_stage=file_stage, file_name=file_name
+        )
+
+    results = [None] * len(file_keys)
+    errors = {}
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(file_keys)))
+    ) as executor:
+        futures = {
+            executor.submit(read, file_stage=file_stage, file_name=file_name): position
+            for position, (file_stage, file_name) in enumerate(file_keys)
+        }
+
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                results[position] = future.result()
+            except Exception as e:
+                file_stage, file_name = file_keys[position]
+                errors[f"{file_stage.value}/{file_name.value}"] = str(e)
+
+    if errors:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=errors)
+
+    return results
+
+
+def format_raw_file(
+    df: pd.DataFrame, set_index: bool = False, for_output: bool = False
+):
+    if set_index:
+        df = df.set_index(df.columns[0])
+        df.index.name = ""
+    else:
+        df.rename({"Unnamed:_0": ""}, axis=1, inplace=True)
+        # df = df.set_index(df.columns[0])
+
+    if for_output:
+        df = df.set_index(df.columns[0])
+        df.rename({"Unnamed:_0": ""}, axis=1, inplace=True)
+
+    return df
+
+
+def format_expenses_file(df: pd.DataFrame, months_to_forecast: int, start_date: str):
+    df = df.set_index(df.columns[0])
+    df.index.name = ""
+    return match_months_to_forecast_with_df(
+        df=df,
+        months_to_forecast=months_to_forecast,
+        start_date=start_date,
+    )
+
+
+def format_parameters_file(df: pd.DataFrame, months_to_forecast: int, start_date: str):
+    df = format_expenses_file(
+        df=df, months_to_forecast=months_to_forecast, start_date=start_date
+    )
+    df.columns = list(map(str, df.columns))
+    return df
 
 
-def shift(df: pd.DataFrame):
-    for i in range(len(df)):
-        df.iloc[i] = df.iloc[i].shift(i)
-    return df.fillna(0)
+def add_period_index(series: pd.Series, start_date: str, periods: int):
+    series.index = generate_columns(start_date, periods)
+    return series
 
 
 def generate_columns(start_date: str, period: int):
-    return pd.period_range(start=start_date, periods=period, freq="M").strftime("%b-%Y")
+    # A shallow copy of the shared calendar labels, so renaming it cannot leak into other frames
+    return project_calendar.get_calendar(start_date, period).labels.copy()
 
 
 def add_series(list_of_series: list):
@@ -266,11 +566,25 @@ def add_series(list_of_series: list):
 
 
 def change_period_index_to_strftime(input: pd.DataFrame | pd.Series):
+    calendar = project_calendar.get_calendar_for_labels(input.index)
+    if calendar is not None:
+        input.index = calendar.labels.copy()
+        return input
+
     input.index = pd.PeriodIndex(input.index, freq="M")
     input.index = input.index.strftime("%b-%Y")
     return input
 
 
+def get_date_format(date: pd.Series) -> str:
+    """The format convert_to_datetime would parse these dates with, so later batches of the same file can reuse it"""
+    try:
+        pd.to_datetime(date, format="%d/%m/%Y")
+        return "%d/%m/%Y"
+    except:
+        return "%m/%d/%Y"
+
+
 def convert_to_datetime(date: pd.Series):
     try:
         date = pd.to_datetime(date, format="%d/%m/%Y")
@@ -280,6 +594,20 @@ def convert_to_datetime(date: pd.Series):
     return date
 
 
+def convert_each_to_datetime(dates: pd.Series) -> pd.Series:
+    """Parses every date on its own the way convert_to_datetime parses a single date:
+    day first, and month first only for the dates that are not valid day first"""
+    dates = pd.Series(dates)
+    converted = pd.to_datetime(dates, format="%d/%m/%Y", errors="coerce")
+
+    not_day_first = converted.isna() & dates.notna()
+    if not_day_first.any():
+        converted[not_day_first] = pd.to_datetime(
+            dates[not_day_first], format="%m/%d/%Y"
+        )
+    return converted
+
+
 def columns_to_snake_case(df: pd.DataFrame):
     df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
     return df
@@ -318,20 +646,60 @@ def get_list_from_string_enum(enum: Enum):
     return [item.value for item in enum]
 
 
-def calculate_opening_and_closing_balances(df: pd.DataFrame):
-    for index, period in enumerate(df.columns):
-        closing_balance_iloc = df.index.get_loc("Closing Balance")
-        opening_balance_iloc = df.index.get_loc("Opening Balance")
-        df.iloc[closing_balance_iloc, index] = df.iloc[
-            opening_balance_iloc:closing_balance_iloc, index
-        ].sum()
-
-        if period == df.columns[-1]:
-            break
-        df.iloc[opening_balance_iloc, index + 1] = df.iloc[closing_balance_iloc, index]
+def roll_forward(opening_balance: float, movements: np.ndarray) -> np.ndarray:
+    """Closing balance of every period of a balance schedule.
+
+    `movements` holds one row per movement line and one column per period. The closing balance
+    of a period is the opening balance plus every movement up to and including that period,
+    taken as one cumulative sum in period order and, within a period, in row order. That is
+    the order the schedules used to be added up column by column, so the results are the same
+    to the last bit. Missing values count as zero.
+    """
+    movements = np.nan_to_num(np.atleast_2d(np.asarray(movements, dtype=float)))
+    number_of_lines, number_of_periods = movements.shape
+    opening_balance = np.nan_to_num(float(opening_balance))
+
+    if not number_of_lines:
+        return np.full(number_of_periods, opening_balance)
+
+    running_totals = np.cumsum(np.r_[opening_balance, movements.T.ravel()])
+    return running_totals[number_of_lines::number_of_lines]
+
+
+def roll_forward_balances(
+    df: pd.DataFrame,
+    opening_row: str = "Opening Balance",
+    closing_row: str = "Closing Balance",
+    movement_rows: list | None = None,
+) -> pd.DataFrame:
+    """Fills the closing row of a balance schedule and the opening row of every period after the first.
+
+    The opening balance of the first period must already be in the frame. The movements are the
+    rows between the opening and the closing row unless `movement_rows` names them.
+    """
+    opening_loc = df.index.get_loc(opening_row)
+    closing_loc = df.index.get_loc(closing_row)
+
+    if movement_rows is None:
+        movements = df.iloc[opening_loc + 1 : closing_loc]
+    else:
+        movements = df.loc[movement_rows]
+
+    closing_balances = roll_forward(
+        opening_balance=pd.to_numeric(df.iat[opening_loc, 0], errors="coerce"),
+        movements=movements.to_numpy(dtype=float),
+    )
+
+    df.iloc[closing_loc] = closing_balances
+    if len(closing_balances) > 1:
+        df.iloc[opening_loc, 1:] = closing_balances[:-1]
     return df
 
 
+def calculate_opening_and_closing_balances(df: pd.DataFrame):
+    return roll_forward_balances(df)
+
+
 def get_tenant_name(tenant_name: str):
     """Appends the '-budgeting' suffix to the tenant name. This is to match the bucket name in s3 since that was also added when a tenant was registered"""
     return tenant_name + "-ifrs-9"
@@ -363,20 +731,16 @@ def match_months_to_forecast_with_df(
 ):
     number_of_months_in_df = df.columns.shape[0]
 
-    new_columns = pd.period_range(
-        start=start_date, periods=months_to_forecast, freq="M"
-    ).strftime("%b-%Y")
+    new_columns = generate_columns(start_date, months_to_forecast)
 
     if number_of_months_in_df == months_to_forecast:
         df.columns = new_columns
         return df
 
     if number_of_months_in_df > months_to_forecast:
-        df.columns = pd.date_range(
-            start=start_date, periods=int(df.columns[-1]), freq="M"
-        ).strftime("%b-%Y")
+        df.columns = generate_columns(start_date, int(df.columns[-1]))
 
-        return df.loc[:, new_columns]
+        return df.iloc[:, :months_to_forecast]
 
     number_of_months_to_add = months_to_forecast - number_of_months_in_df
     repeated_last_column = df[df.columns[-1]].repeat(number_of_months_to_add)
@@ -393,15 +757,3 @@ def match_months_to_forecast_with_df(
     new_df.columns = new_columns
 
     return new_df
-
-
-def group_next_year_on_wards(df: pd.DataFrame):
-    df_copy = df.copy()
-    df_copy.columns = pd.to_datetime(df_copy.columns, format="%b-%Y")
-    df_yearly = df_copy.groupby(df_copy.columns.year, axis=1).sum()
-    df_yearly.columns = df_yearly.columns.astype(str)
-
-    # current_year = str(pd.to_datetime(df.columns[0]).year)
-    # df_current_year_in_months = df.T.loc[df.columns.str.endswith(current_year)].T
-
-    return df_yearly
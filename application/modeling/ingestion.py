@@ -0,0 +1,338 @@
+import re
+from enum import Enum
+from typing import BinaryIO, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, status
+
+from application.modeling import constants, storage
+
+FLOAT = "float64"
+INTEGER = "int32"
+TEXT = "string"
+CATEGORY = "category"
+DATE = "date"
+
+ARROW_TYPES = {
+    FLOAT: pa.float64(),
+    INTEGER: pa.int32(),
+    TEXT: pa.string(),
+    CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+    DATE: pa.timestamp("ns"),
+}
+
+# Formats a date column may be written in, tried in this order. The whole column is parsed with
+# the first format all of its dates are written in, the way helper.convert_to_datetime does.
+DATE_FORMATS = ["%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d"]
+
+
+class RawFileSchema:
+    """The columns of an uploaded raw file and the types they are stored with.
+
+    Columns are matched on their snake_case name, so "Loan Term " and "loan_term" are the same
+    column, and keep the name they were uploaded with, stripped. Every one of `columns` must be
+    in the file, `optional_columns` may be left out. The first column of the file gets the
+    `first_column` type when one is given, and any other column gets `other_columns`.
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, str] | None = None,
+        optional_columns: dict[str, str] | None = None,
+        first_column: str | None = None,
+        other_columns: str = TEXT,
+    ):
+        self.columns = columns or {}
+        self.optional_columns = optional_columns or {}
+        self.first_column = first_column
+        self.other_columns = other_columns
+
+    def get_types(self, file_name: Enum, columns: pd.Index) -> dict[str, str]:
+        """The type of every column of a file with these column names"""
+        keys = columns.str.strip().str.lower().str.replace(" ", "_")
+
+        missing = [column for column in self.columns if column not in keys]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{file_name.value} is missing the columns: {', '.join(missing)}",
+            )
+
+        types = {}
+        for position, (column, key) in enumerate(zip(columns, keys)):
+            if key in self.columns:
+                types[column] = self.columns[key]
+            elif key in self.optional_columns:
+                types[column] = self.optional_columns[key]
+            elif position == 0 and self.first_column is not None:
+                types[column] = self.first_column
+            else:
+                types[column] = self.other_columns
+        return types
+
+
+PARAMETERS_SCHEMA = RawFileSchema(first_column=TEXT, other_columns=FLOAT)
+
+BORROWING_SCHEMA = RawFileSchema(
+    columns={
+        "effective_date": DATE,
+        "institution": CATEGORY,
+        "nominal_amount": FLOAT,
+        "interest_rate": FLOAT,
+        "tenure": INTEGER,
+        "frequency": INTEGER,
+        "method": CATEGORY,
+    },
+    optional_columns={"repayment_frequency": CATEGORY},
+)
+
+RAW_FILE_SCHEMAS = {
+    constants.RawFiles.existing_loans: RawFileSchema(
+        columns={
+            "loan_number": TEXT,
+            "disbursement_date": DATE,
+            "loan_term": INTEGER,
+            "loan_amount": FLOAT,
+            "closing_balance": FLOAT,
+            "interest_rate": FLOAT,
+            "admin_fee": FLOAT,
+            "credit_insurance_fee": FLOAT,
+        },
+        optional_columns={"loan_type": CATEGORY},
+    ),
+    constants.RawFiles.details_of_assets: RawFileSchema(
+        columns={
+            "asset_id": TEXT,
+            "acquisition_date": DATE,
+            "life": INTEGER,
+            "book_value": FLOAT,
+            "net_value": FLOAT,
+            "salvage_value": FLOAT,
+            "method": CATEGORY,
+            "depreciation": FLOAT,
+        }
+    ),
+    constants.RawFiles.details_of_long_term_borrowing: BORROWING_SCHEMA,
+    constants.RawFiles.details_of_short_term_borrowing: BORROWING_SCHEMA,
+    constants.RawFiles.disbursement_parameters: PARAMETERS_SCHEMA,
+    constants.RawFiles.other_parameters: PARAMETERS_SCHEMA,
+    constants.RawFiles.expenses_certain: PARAMETERS_SCHEMA,
+    constants.RawFiles.expenses_uncertain: PARAMETERS_SCHEMA,
+    constants.RawFiles.opening_balances: RawFileSchema(other_columns=FLOAT),
+}
+
+# Longest names first, so a file name is matched to the most specific raw file
+RAW_FILE_NAME = re.compile(
+    "|".join(
+        re.escape(file_name.value)
+        for file_name in sorted(
+            constants.RawFiles, key=lambda file_name: -len(file_name.value)
+        )
+    )
+)
+
+
+def get_raw_file_name(filename: str) -> constants.RawFiles | None:
+    """The raw file an uploaded file is, going by the start of its name"""
+    match = RAW_FILE_NAME.match(filename or "")
+    return constants.RawFiles(match.group()) if match else None
+
+
+def get_arrow_schema(types: dict[str, str]) -> pa.Schema:
+    return pa.schema([(column, ARROW_TYPES[kind]) for column, kind in types.items()])
+
+
+def is_written(values: np.ndarray) -> np.ndarray:
+    return np.array([isinstance(value, str) for value in values], dtype=bool)
+
+
+def get_date_formats(values: pd.Series, date_formats: list[str]) -> list[str]:
+    """The formats among date_formats that every written date of values parses with"""
+    distinct = values.dropna().unique().astype(object)
+    written = distinct[is_written(distinct)]
+    formats = []
+    for date_format in date_formats:
+        try:
+            pd.to_datetime(written, format=date_format)
+        except (TypeError, ValueError):
+            continue
+        formats.append(date_format)
+    return formats
+
+
+def parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    """Parses the written dates of a column, keeping the ones that already are dates. A loan book
+    has far fewer distinct dates than loans, so every distinct date is only parsed once."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, distinct = pd.factorize(values.to_numpy(dtype=object))
+    written = is_written(distinct)
+    # One slot more than there are distinct dates, left empty for the missing ones (code -1)
+    dates = np.full(len(distinct) + 1, np.datetime64("NaT"), dtype="datetime64[ns]")
+    dates[:-1][written] = pd.to_datetime(distinct[written], format=date_format)
+    dates[:-1][~written] = pd.to_datetime(distinct[~written])
+    return pd.Series(dates[codes], index=values.index, name=values.name)
+
+
+def describe_rows(index: pd.Index, limit: int = 10) -> str:
+    """The rows of index, counted from 1 for the first row under the header, the first `limit` of them"""
+    rows = [str(row + 1) for row in index[:limit]]
+    if len(index) > limit:
+        rows.append(f"and {len(index) - limit} more")
+    return ", ".join(rows)
+
+
+def cast_frame(
+    df: pd.DataFrame,
+    file_name: Enum,
+    types: dict[str, str],
+    date_formats: dict[str, str],
+    categories: dict[str, list],
+) -> pd.DataFrame:
+    """Casts the columns of df to their schema types. Categories are added to `categories` in the
+    order they are first seen, so consecutive frames share the codes of the ones before them."""
+    df = df.copy()
+    for column, kind in types.items():
+        values = df[column]
+        try:
+            if kind == DATE:
+                df[column] = parse_dates(values, date_formats[column])
+            elif kind == FLOAT:
+                df[column] = pd.to_numeric(values).astype(np.float64)
+            elif kind == INTEGER:
+                numbers = pd.to_numeric(values).astype(np.float64)
+                if numbers.isna().any():
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"The {column} column of {file_name.value} is missing values "
+                        f"in rows {describe_rows(numbers.index[numbers.isna()])}",
+                    )
+                if not np.all(np.isfinite(numbers)) or not np.all(
+                    numbers == np.round(numbers)
+                ):
+                    raise ValueError("every value must be a whole number")
+                df[column] = numbers.astype(np.int32)
+            elif kind == CATEGORY:
+                texts = values.where(values.isna(), values.astype(str))
+                known = set(categories[column])
+                categories[column].extend(
+                    category
+                    for category in pd.unique(texts.dropna())
+                    if category not in known
+                )
+                df[column] = pd.Categorical(texts, categories=categories[column])
+            else:
+                df[column] = values.where(values.isna(), values.astype(str))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"The {column} column of {file_name.value} is not a valid {kind} column: {e}",
+            )
+    return df
+
+
+def find_date_formats(
+    file_name: Enum, date_columns: Iterator[pd.Series]
+) -> dict[str, str]:
+    """Picks the format of every date column from consecutive pieces of the columns"""
+    candidates = {}
+    for values in date_columns:
+        candidates[values.name] = get_date_formats(
+            values, candidates.get(values.name, DATE_FORMATS)
+        )
+
+    unreadable = [column for column, formats in candidates.items() if not formats]
+    if unreadable:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"The dates in {', '.join(unreadable)} of {file_name.value} "
+            f"must all be written as one of {', '.join(DATE_FORMATS)}",
+        )
+    return {column: formats[0] for column, formats in candidates.items()}
+
+
+def conform_to_schema(df: pd.DataFrame, file_name: constants.RawFiles) -> pd.DataFrame:
+    """Casts a whole raw file held in memory to its schema types, for files edited by the API"""
+    types = RAW_FILE_SCHEMAS[file_name].get_types(file_name, df.columns)
+    date_formats = find_date_formats(
+        file_name,
+        (df[column] for column, kind in types.items() if kind == DATE),
+    )
+    return cast_frame(
+        df,
+        file_name=file_name,
+        types=types,
+        date_formats=date_formats,
+        categories={column: [] for column, kind in types.items() if kind == CATEGORY},
+    )
+
+
+def ingest_csv(
+    file: BinaryIO,
+    file_name: constants.RawFiles,
+    project_store: storage.ProjectStore,
+    chunk_size: int = constants.INGESTION_CHUNK_SIZE,
+):
+    """Stores an uploaded CSV as a raw file, reading at most chunk_size rows at a time.
+
+    The file is read twice: once for only its date columns, to find the format they are
+    written in, and once to cast every chunk to the schema types and write it as a row group.
+    """
+    names = pd.read_csv(file, nrows=0).columns
+    file.seek(0)
+    types = RAW_FILE_SCHEMAS[file_name].get_types(file_name, names.str.strip())
+    kinds = dict(zip(names, types.values()))
+
+    date_columns = [name for name, kind in kinds.items() if kind == DATE]
+    date_formats = {}
+    if date_columns:
+        date_formats = find_date_formats(
+            file_name,
+            (
+                chunk[name].rename(name.strip())
+                for chunk in pd.read_csv(
+                    file, usecols=date_columns, dtype=str, chunksize=chunk_size
+                )
+                for name in date_columns
+            ),
+        )
+        file.seek(0)
+
+    schema = get_arrow_schema(types)
+    categories = {column: [] for column, kind in types.items() if kind == CATEGORY}
+
+    def tables() -> Iterator[pa.Table]:
+        chunks = pd.read_csv(
+            file,
+            chunksize=chunk_size,
+            dtype={
+                name: np.float64 if kind in (FLOAT, INTEGER) else str
+                for name, kind in kinds.items()
+            },
+        )
+        try:
+            for chunk in chunks:
+                chunk.columns = chunk.columns.str.strip()
+                chunk = cast_frame(
+                    chunk,
+                    file_name=file_name,
+                    types=types,
+                    date_formats=date_formats,
+                    categories=categories,
+                )
+                yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{file_name.value} could not be read: {e}",
+            )
+
+    project_store.write_batches(
+        tables=tables(),
+        schema=schema,
+        file_stage=constants.FileStage.raw,
+        file_name=file_name,
+    )
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import constants, helper, products
 
 
 def calculate_repayment_amount(disbursements, monthly_interest_rate, average_loan_term):
@@ -12,7 +12,58 @@ def calculate_repayment_amount(disbursements, monthly_interest_rate, average_loa
 
 
 def generate_columns(start_date: str, period: int):
-    return pd.period_range(start=start_date, periods=period, freq="M").strftime("%b-%Y")
+    return helper.generate_columns(start_date, period)
+
+
+def calculate_annuity_schedules(
+    principal: np.ndarray,
+    monthly_interest_rate: np.ndarray,
+    repayment_amount: np.ndarray,
+    months_to_forecast: int,
+) -> dict:
+    """Closed-form amortisation of every vintage of every segment at once.
+
+    The inputs are shaped (segments, vintages). Vintage v is disbursed in month v and its schedule is placed
+    on the diagonal of a (segments, vintages, months) grid, so column m holds the loan's state m - v months
+    after disbursement and the months before disbursement are zero.
+    """
+    principal = np.asarray(principal, dtype=float)[..., np.newaxis]
+    rate = np.asarray(monthly_interest_rate, dtype=float)[..., np.newaxis]
+    repayment = np.asarray(repayment_amount, dtype=float)[..., np.newaxis]
+
+    months_since_disbursement = (
+        np.arange(months_to_forecast)[np.newaxis, :]
+        - np.arange(principal.shape[1])[:, np.newaxis]
+    )
+    disbursed = months_since_disbursement >= 0
+    months_since_disbursement = np.where(disbursed, months_since_disbursement, 0)
+
+    # Balance after k level payments: P(1 + r)^k - A((1 + r)^k - 1) / r, floored at zero once the loan is repaid
+    growth = (1 + rate) ** months_since_disbursement
+    with np.errstate(divide="ignore", invalid="ignore"):
+        repaid = np.where(
+            rate == 0,
+            repayment * months_since_disbursement,
+            repayment * (growth - 1) / rate,
+        )
+    outstanding_at_start = np.maximum(principal * growth - repaid, 0)
+
+    interest = outstanding_at_start * rate
+    capital_repayments = np.where(
+        outstanding_at_start < repayment - interest,
+        outstanding_at_start,
+        repayment - interest,
+    )
+
+    # Months before disbursement, and rates the annuity formula cannot price, are reported as zero
+    return {
+        name: np.where(disbursed & ~np.isnan(schedule), schedule, 0)
+        for name, schedule in (
+            ("interest", interest),
+            ("capital_repayments", capital_repayments),
+            ("outstanding_at_start", outstanding_at_start),
+        )
+    }
 
 
 def generate_loan_schedule_new_disbursements(
@@ -21,87 +72,42 @@ def generate_loan_schedule_new_disbursements(
     repayment_amount: pd.Series,
     months_to_forecast: int,
 ) -> dict:
-    number_of_disbursements = len(disbursements)
-
-    outstanding_at_start = np.zeros((number_of_disbursements, months_to_forecast))
-    interest = np.zeros((number_of_disbursements, months_to_forecast))
-    capital_repayments = np.zeros((number_of_disbursements, months_to_forecast))
-    outstanding_at_start[:, 0] = disbursements.values
-
-    for i in range(months_to_forecast):
-        interest[:, i] = outstanding_at_start[:, i] * monthly_interest_rate
-        capital_repayments[:, i] = np.where(
-            outstanding_at_start[:, i] < repayment_amount.values - interest[:, i],
-            outstanding_at_start[:, i],
-            repayment_amount.values - interest[:, i],
-        )
-        if i + 1 == months_to_forecast:
-            break
-        outstanding_at_start[:, i + 1] = np.maximum(
-            outstanding_at_start[:, i] - capital_repayments[:, i], 0
-        )
+    schedules = calculate_annuity_schedules(
+        principal=[disbursements.values],
+        monthly_interest_rate=[
+            np.broadcast_to(monthly_interest_rate, len(disbursements))
+        ],
+        repayment_amount=[repayment_amount.values],
+        months_to_forecast=months_to_forecast,
+    )
+
     date_of_disbursement = disbursements.index
     columns = generate_columns(date_of_disbursement[1], months_to_forecast)
     return {
-        "interest": helper.shift(
-            pd.DataFrame(interest, index=date_of_disbursement, columns=columns)
-        ),
-        "capital_repayments": helper.shift(
-            pd.DataFrame(
-                capital_repayments, index=date_of_disbursement, columns=columns
-            )
-        ),
-        "outstanding_at_start": helper.shift(
-            pd.DataFrame(
-                outstanding_at_start, index=date_of_disbursement, columns=columns
-            )
-        ),
+        name: pd.DataFrame(schedule[0], index=date_of_disbursement, columns=columns)
+        for name, schedule in schedules.items()
     }
 
 
 def calculate_monthly_repayments_new_disbursements(
     new_disbursements_df: pd.DataFrame, disbursement_parameters: pd.DataFrame
 ):
-    # Todo: Try using a loop on this one
-
-    sme_monthly_repayment = calculate_repayment_amount(
-        disbursements=new_disbursements_df["sme_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["SME_INTEREST_RATE"],
-        average_loan_term=disbursement_parameters.loc["SME_AVERAGE_LOAN_TERM"],
-    )
-
-    consumer_ssb_monthly_repayment = calculate_repayment_amount(
-        disbursements=new_disbursements_df["consumer_ssb_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["CONSUMER_SSB_INTEREST_RATE"],
-        average_loan_term=disbursement_parameters.loc["CONSUMER_SSB_AVERAGE_LOAN_TERM"],
-    )
-    consumer_pvt_monthly_repayment = calculate_repayment_amount(
-        disbursements=new_disbursements_df["consumer_pvt_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["CONSUMER_PVT_INTEREST_RATE"],
-        average_loan_term=disbursement_parameters.loc["CONSUMER_PVT_AVERAGE_LOAN_TERM"],
-    )
+    product_segments = products.get_product_segments(disbursement_parameters)
 
-    b2b_monthly_repayment = calculate_repayment_amount(
-        disbursements=new_disbursements_df["b2b_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["B2B_INTEREST_RATE"],
-        average_loan_term=disbursement_parameters.loc["B2B_AVERAGE_LOAN_TERM"],
-    )
-
-    return pd.DataFrame(
-        {
-            "sme_monthly_repayment": sme_monthly_repayment,
-            "b2b_monthly_repayment": b2b_monthly_repayment,
-            "consumer_ssb_monthly_repayment": consumer_ssb_monthly_repayment,
-            "consumer_pvt_monthly_repayment": consumer_pvt_monthly_repayment,
-            "total": helper.add_series(
-                [
-                    b2b_monthly_repayment,
-                    consumer_pvt_monthly_repayment,
-                    consumer_ssb_monthly_repayment,
-                    sme_monthly_repayment,
-                ]
+    return product_segments.to_frame(
+        calculate_repayment_amount(
+            disbursements=product_segments.select(
+                new_disbursements_df, "disbursements"
             ),
-        }
+            monthly_interest_rate=product_segments.get(
+                constants.ProductParameters.interest_rate
+            ),
+            average_loan_term=product_segments.get(
+                constants.ProductParameters.average_loan_term
+            ),
+        ),
+        suffix="monthly_repayment",
+        index=new_disbursements_df.index,
     )
 
 
@@ -124,129 +130,68 @@ def generate_loan_schedules_for_all_new_disbursements(
     monthly_repayment_new_disbursements_df: pd.DataFrame,
     months_to_forecast: int,
 ):
-    # Todo: Try using a loop
-
-    sme_loan_schedules = generate_loan_schedule_new_disbursements(
-        disbursements=new_disbursements_df["sme_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["SME_INTEREST_RATE"],
-        repayment_amount=monthly_repayment_new_disbursements_df[
-            "sme_monthly_repayment"
-        ],
-        months_to_forecast=months_to_forecast,
-    )
-
-    consumer_ssb_loan_schedules = generate_loan_schedule_new_disbursements(
-        disbursements=new_disbursements_df["consumer_ssb_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["CONSUMER_SSB_INTEREST_RATE"],
-        repayment_amount=monthly_repayment_new_disbursements_df[
-            "consumer_ssb_monthly_repayment"
-        ],
+    product_segments = products.get_product_segments(disbursement_parameters)
+
+    schedules = calculate_annuity_schedules(
+        principal=product_segments.select(new_disbursements_df, "disbursements"),
+        monthly_interest_rate=product_segments.get(
+            constants.ProductParameters.interest_rate
+        )[:, : len(new_disbursements_df)],
+        repayment_amount=product_segments.select(
+            monthly_repayment_new_disbursements_df, "monthly_repayment"
+        ),
         months_to_forecast=months_to_forecast,
     )
 
-    b2b_loan_schedules = generate_loan_schedule_new_disbursements(
-        disbursements=new_disbursements_df["b2b_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["B2B_INTEREST_RATE"],
-        repayment_amount=monthly_repayment_new_disbursements_df[
-            "b2b_monthly_repayment"
-        ],
-        months_to_forecast=months_to_forecast,
-    )
+    date_of_disbursement = new_disbursements_df.index
+    columns = generate_columns(date_of_disbursement[1], months_to_forecast)
+    return {
+        f"{product}_loan_schedules": {
+            name: pd.DataFrame(
+                schedule[position], index=date_of_disbursement, columns=columns
+            )
+            for name, schedule in schedules.items()
+        }
+        for position, product in enumerate(product_segments.names)
+    }
 
-    consumer_pvt_loan_schedules = generate_loan_schedule_new_disbursements(
-        disbursements=new_disbursements_df["consumer_pvt_disbursements"],
-        monthly_interest_rate=disbursement_parameters.loc["CONSUMER_PVT_INTEREST_RATE"],
-        repayment_amount=monthly_repayment_new_disbursements_df[
-            "consumer_pvt_monthly_repayment"
-        ],
-        months_to_forecast=months_to_forecast,
-    )
 
-    return {
-        "sme_loan_schedules": sme_loan_schedules,
-        "b2b_loan_schedules": b2b_loan_schedules,
-        "consumer_ssb_loan_schedules": consumer_ssb_loan_schedules,
-        "consumer_pvt_loan_schedules": consumer_pvt_loan_schedules,
+def sum_loan_schedules_by_product(
+    loan_schedules_for_all_new_disbursements: dict, schedule: str, suffix: str
+) -> pd.DataFrame:
+    """Totals of one schedule over every vintage, one <product>_<suffix> column per product"""
+    loan_schedules = {
+        name.removesuffix("_loan_schedules"): schedules[schedule]
+        for name, schedules in loan_schedules_for_all_new_disbursements.items()
     }
+    totals = pd.DataFrame(
+        {
+            f"{product}_{suffix}": schedule.sum()
+            for product, schedule in loan_schedules.items()
+        }
+    )
+    totals["total"] = totals.sum(axis=1)
+    return totals
 
 
 def generate_capital_repayment_new_disbursements_df(
     loan_schedules_for_all_new_disbursements: dict,
 ):
-    # ? Can't we clean the code below?
-    capital_repayment_new_disbursements_df = pd.DataFrame(
-        {
-            "sme_capital_repayments": loan_schedules_for_all_new_disbursements[
-                "sme_loan_schedules"
-            ]["capital_repayments"].sum(),
-            "b2b_capital_repayments": loan_schedules_for_all_new_disbursements[
-                "b2b_loan_schedules"
-            ]["capital_repayments"].sum(),
-            "consumer_pvt_capital_repayments": loan_schedules_for_all_new_disbursements[
-                "consumer_pvt_loan_schedules"
-            ]["capital_repayments"].sum(),
-            "consumer_ssb_capital_repayments": loan_schedules_for_all_new_disbursements[
-                "consumer_ssb_loan_schedules"
-            ]["capital_repayments"].sum(),
-            "total": helper.add_series(
-                [
-                    loan_schedules_for_all_new_disbursements["sme_loan_schedules"][
-                        "capital_repayments"
-                    ].sum(),
-                    loan_schedules_for_all_new_disbursements["b2b_loan_schedules"][
-                        "capital_repayments"
-                    ].sum(),
-                    loan_schedules_for_all_new_disbursements[
-                        "consumer_pvt_loan_schedules"
-                    ]["capital_repayments"].sum(),
-                    loan_schedules_for_all_new_disbursements[
-                        "consumer_ssb_loan_schedules"
-                    ]["capital_repayments"].sum(),
-                ]
-            ),
-        }
+    return sum_loan_schedules_by_product(
+        loan_schedules_for_all_new_disbursements,
+        schedule="capital_repayments",
+        suffix="capital_repayments",
     )
-    return capital_repayment_new_disbursements_df
 
 
 def generate_interest_income_new_disbursements_df(
-    loan_schedules_for_all_new_disbursements: pd.DataFrame,
+    loan_schedules_for_all_new_disbursements: dict,
 ):
-    # ? Can't we clean the code below?
-
-    interest_income_new_disbursements_df = pd.DataFrame(
-        {
-            "sme_interest_income": loan_schedules_for_all_new_disbursements[
-                "sme_loan_schedules"
-            ]["interest"].sum(),
-            "b2b_interest_income": loan_schedules_for_all_new_disbursements[
-                "b2b_loan_schedules"
-            ]["interest"].sum(),
-            "consumer_pvt_interest_income": loan_schedules_for_all_new_disbursements[
-                "consumer_pvt_loan_schedules"
-            ]["interest"].sum(),
-            "consumer_ssb_interest_income": loan_schedules_for_all_new_disbursements[
-                "consumer_ssb_loan_schedules"
-            ]["interest"].sum(),
-            "total": helper.add_series(
-                [
-                    loan_schedules_for_all_new_disbursements["sme_loan_schedules"][
-                        "interest"
-                    ].sum(),
-                    loan_schedules_for_all_new_disbursements["b2b_loan_schedules"][
-                        "interest"
-                    ].sum(),
-                    loan_schedules_for_all_new_disbursements[
-                        "consumer_pvt_loan_schedules"
-                    ]["interest"].sum(),
-                    loan_schedules_for_all_new_disbursements[
-                        "consumer_ssb_loan_schedules"
-                    ]["interest"].sum(),
-                ]
-            ),
-        }
+    return sum_loan_schedules_by_product(
+        loan_schedules_for_all_new_disbursements,
+        schedule="interest",
+        suffix="interest_income",
     )
-    return interest_income_new_disbursements_df
 
 
 def generate_loan_schedules_existing_loans(
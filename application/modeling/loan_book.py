@@ -1,6 +1,18 @@
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import helper, statements
+
+LOAN_BOOK = statements.parse_layout(
+    """
+    Opening Balance
+    New Disbursements
+    Repayments
+    Interest Income
+    Closing Balance
+    """,
+    opening_lines=["Opening Balance"],
+    closing_lines=["Closing Balance"],
+)
 
 
 def aggregate_new_and_existing_loans_capital_repayments(
@@ -17,41 +29,19 @@ def aggregate_new_and_existing_loans_capital_repayments(
 
 
 def generate_loan_book_template(start_date: str, months_to_forecast: int):
-    loan_book = pd.DataFrame(
-        index=[
-            "Opening Balance",
-            "New Disbursements",
-            "Repayments",
-            "Interest Income",
-            "Closing Balance",
-        ],
-        columns=helper.generate_columns(start_date, months_to_forecast),
-    )
-    return loan_book
+    return LOAN_BOOK.builder(start_date, months_to_forecast)
 
 
 def insert_loan_book_items(
-    loan_book: pd.DataFrame,
-    opening_balance_on_loan_book: float,
+    loan_book: statements.StatementBuilder,
     disbursements: pd.Series,
     total_interest_income: pd.Series,
     total_capital_repayments: pd.Series,
 ):
-    loan_book.loc[
-        "Opening Balance", loan_book.columns[0]
-    ] = opening_balance_on_loan_book
-    loan_book.loc["New Disbursements"] = disbursements
-    loan_book.loc["Repayments"] = -total_capital_repayments.add(
+    loan_book["New Disbursements"] = disbursements
+    loan_book["Repayments"] = -total_capital_repayments.add(
         total_interest_income, fill_value=0
     )
-    loan_book.loc["Interest Income"] = total_interest_income
+    loan_book["Interest Income"] = total_interest_income
 
     return loan_book
-
-
-def calculate_loan_book_yearly(loan_book: pd.DataFrame):
-    loan_book_yearly = loan_book.groupby(
-        pd.DatetimeIndex(loan_book.columns).year, axis=1
-    ).sum()
-    loan_book_yearly.columns = loan_book_yearly.columns.astype(str)
-    return helper.calculate_opening_and_closing_balances(loan_book_yearly)
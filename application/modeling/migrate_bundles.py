@@ -0,0 +1,73 @@
+"""Moves the files of projects between the one-object-per-file layout and stage bundles.
+
+Add the tenant to BUNDLED_TENANTS before bundling its projects, since only bundled tenants read
+bundles, and unbundle them before taking the tenant out again.
+
+    python -m application.modeling.migrate_bundles --tenant acme --projects 1 2
+    python -m application.modeling.migrate_bundles --tenant acme --projects 1 --unbundle
+"""
+import argparse
+
+from application.modeling import constants, storage
+
+
+def migrate_project(
+    tenant_name: str,
+    project_id: int,
+    file_stages: list[constants.FileStage],
+    unbundle: bool = False,
+):
+    project_store = storage.BundleProjectStore(
+        backing_store=storage.get_file_store(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+        )
+    )
+
+    for file_stage in file_stages:
+        if unbundle:
+            names = project_store.unbundle(file_stage)
+        else:
+            names = project_store.bundle(file_stage)
+        print(
+            f"project_{project_id}/{file_stage.value}: "
+            f"{'unbundled' if unbundle else 'bundled'} {len(names)} files"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenant", required=True)
+    parser.add_argument("--projects", type=int, nargs="+", required=True)
+    parser.add_argument(
+        "--stages",
+        type=constants.FileStage,
+        nargs="+",
+        default=[
+            constants.FileStage.intermediate,
+            constants.FileStage.final,
+            constants.FileStage.pipeline,
+        ],
+    )
+    parser.add_argument(
+        "--unbundle",
+        action="store_true",
+        help="write the bundled files back as single files and delete the bundles",
+    )
+    args = parser.parse_args()
+
+    if not args.unbundle and not storage.is_bundled(args.tenant):
+        print(f"{args.tenant} is not in BUNDLED_TENANTS and will not read its bundles")
+
+    for project_id in args.projects:
+        migrate_project(
+            tenant_name=args.tenant,
+            project_id=project_id,
+            file_stages=args.stages,
+            unbundle=args.unbundle,
+        )
+
+
+if __name__ == "__main__":
+    main()
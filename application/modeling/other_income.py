@@ -1,56 +1,137 @@
 import numpy as np
 import pandas as pd
 
-from application.modeling import borrowings, helper
+from application.modeling import constants, helper, products
 
 
-def calculate_admin_fee_new_disbursements(
-    disbursements: pd.Series,
-    admin_fee_percentage: float,
-    average_loan_term: int,
-    months_to_forecast: int | pd.Series,
-) -> pd.Series:
-    average_loan_term = int(average_loan_term.mean())
+# Above this many multiply-adds a box convolution is done with FFTs instead of directly
+FFT_CONVOLUTION_MIN_SIZE = 100_000
 
-    admin_fee = disbursements * admin_fee_percentage / average_loan_term
 
-    admin_fee = np.repeat(admin_fee.values, average_loan_term).reshape(
-        len(admin_fee), average_loan_term
-    )
-    admin_fee = pd.DataFrame(
-        admin_fee,
-        columns=helper.generate_columns(disbursements.index[0], average_loan_term),
-        index=disbursements.index,
-    )
-    admin_fee = admin_fee.reindex(
-        helper.generate_columns(disbursements.index[0], months_to_forecast), axis=1
-    )
-    return helper.shift(admin_fee).sum()
+def convolve_with_box(values: np.ndarray, length: int) -> np.ndarray:
+    """Full convolution of `values` with `length` ones, so entry m is the sum of the
+    `length` values up to and including m"""
+    size = len(values) + length - 1
+    if len(values) * length < FFT_CONVOLUTION_MIN_SIZE:
+        return np.convolve(values, np.ones(length))
 
+    fft_size = 1 << (size - 1).bit_length()
+    return np.fft.irfft(
+        np.fft.rfft(values, fft_size) * np.fft.rfft(np.ones(length), fft_size),
+        fft_size,
+    )[:size]
 
-def calculate_credit_insurance_fee_new_disbursements(
-    disbursements: pd.Series,
-    credit_insurance_fee_percentage: float,
-    average_loan_term: int,
-    months_to_forecast: int | pd.Series,
-) -> pd.Series:
-    average_loan_term = int(average_loan_term.mean())
 
-    credit_insurance_fee = (
-        disbursements * credit_insurance_fee_percentage / average_loan_term
+def spread_fees(
+    monthly_fees: np.ndarray,
+    starts: np.ndarray,
+    terms: np.ndarray,
+    months_to_forecast: int,
+) -> np.ndarray:
+    """Monthly fee income of loans that each earn the same fee every month of their term.
+
+    Loan i earns monthly_fees[i] from month starts[i] (relative to the first month of the
+    forecast, negative for loans that started before it) for terms[i] months. Loans with the
+    same term are added up by start month and the resulting series is convolved with a box
+    of that length, so the work grows with the number of distinct terms rather than loans.
+    """
+    monthly_fees = np.nan_to_num(np.asarray(monthly_fees, dtype=float))
+    starts = np.asarray(starts, dtype=np.int64)
+    terms = np.asarray(terms, dtype=np.int64)
+
+    earning = (terms > 0) & (monthly_fees != 0) & (starts < months_to_forecast)
+    monthly_fees, starts, terms = monthly_fees[earning], starts[earning], terms[earning]
+
+    income = np.zeros(months_to_forecast)
+    if not len(monthly_fees):
+        return income
+
+    # Starts are counted from the earliest start so they can index the series
+    first_start = min(starts.min(), 0)
+    number_of_starts = months_to_forecast - first_start
+
+    for term in np.unique(terms):
+        same_term = terms == term
+        fees_by_start = np.bincount(
+            starts[same_term] - first_start,
+            weights=monthly_fees[same_term],
+            minlength=number_of_starts,
+        )
+        income += convolve_with_box(fees_by_start, int(term))[
+            -first_start : -first_start + months_to_forecast
+        ]
+    return income
+
+
+def calculate_fee_for_all_new_disbursements(
+    new_disbursements_df: pd.DataFrame,
+    disbursement_parameters: pd.DataFrame,
+    fee_percentage: constants.ProductParameters,
+    suffix: str,
+    months_to_forecast: int,
+) -> pd.DataFrame:
+    """Fees on new disbursements, earned evenly over the loan term of the vintage they were
+    disbursed in. Vintages without a loan term use the product's average term."""
+    product_segments = products.get_product_segments(disbursement_parameters)
+    number_of_vintages = len(new_disbursements_df)
+
+    loan_terms = product_segments.get(constants.ProductParameters.average_loan_term)[
+        :, :number_of_vintages
+    ]
+    average_loan_terms = np.nanmean(loan_terms, axis=1).astype(int)
+    loan_terms = np.where(
+        np.isnan(loan_terms), average_loan_terms[:, np.newaxis], loan_terms
+    ).astype(int)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_fees = (
+            product_segments.select(new_disbursements_df, "disbursements")
+            * product_segments.get(fee_percentage)[:, :number_of_vintages]
+            / loan_terms
+        )
+
+    fees = np.stack(
+        [
+            spread_fees(
+                monthly_fees=monthly_fees[product],
+                starts=np.arange(number_of_vintages),
+                terms=loan_terms[product],
+                months_to_forecast=months_to_forecast,
+            )
+            for product in range(len(product_segments))
+        ]
     )
-    credit_insurance_fee = np.repeat(
-        credit_insurance_fee.values, average_loan_term
-    ).reshape(len(credit_insurance_fee), average_loan_term)
-    credit_insurance_fee = pd.DataFrame(
-        credit_insurance_fee,
-        columns=helper.generate_columns(disbursements.index[0], average_loan_term),
-        index=disbursements.index,
+
+    return product_segments.to_frame(
+        fees,
+        suffix=suffix,
+        index=helper.generate_columns(
+            new_disbursements_df.index[0], months_to_forecast
+        ),
     )
-    credit_insurance_fee = credit_insurance_fee.reindex(
-        helper.generate_columns(disbursements.index[0], months_to_forecast), axis=1
+
+
+def calculate_fee_existing_loans(
+    loan_amount: pd.Series,
+    fee_percentage: pd.Series,
+    loan_term_months: pd.Series,
+    remaining_term_months: pd.Series,
+    months_to_forecast: int,
+    start_date: str,
+) -> pd.Series:
+    """Fees still to be earned on existing loans: the monthly share of each loan's fee for
+    every one of its remaining months, from the first month of the forecast"""
+    return pd.Series(
+        spread_fees(
+            monthly_fees=(loan_amount * fee_percentage / loan_term_months).to_numpy(
+                dtype=float
+            ),
+            starts=np.zeros(len(loan_amount), dtype=np.int64),
+            terms=remaining_term_months.to_numpy(dtype=np.int64),
+            months_to_forecast=months_to_forecast,
+        ),
+        index=helper.generate_columns(start_date, period=months_to_forecast),
     )
-    return helper.shift(credit_insurance_fee).sum()
 
 
 def calculate_admin_fee_existing_loans(
@@ -61,29 +142,14 @@ def calculate_admin_fee_existing_loans(
     months_to_forecast: int,
     start_date: str,
 ):
-    admin_fee_existing = loan_amount * admin_fee_percentage / loan_term_months
-
-    admin_fees_existing_loans = []
-    for i in admin_fee_existing.index:
-        temp = pd.Series(
-            np.repeat(
-                admin_fee_existing.loc[i],
-                remaining_term_months.loc[i],
-            ),
-            name=i,
-        )
-        admin_fees_existing_loans.append(temp)
-
-    admin_fees_existing_loans = pd.concat(admin_fees_existing_loans, axis=1).T.fillna(0)
-
-    admin_fees_existing_loans = admin_fees_existing_loans.iloc[:, :months_to_forecast]
-
-    admin_fees_existing_loans.columns = helper.generate_columns(
-        start_date, period=months_to_forecast
+    return calculate_fee_existing_loans(
+        loan_amount=loan_amount,
+        fee_percentage=admin_fee_percentage,
+        loan_term_months=loan_term_months,
+        remaining_term_months=remaining_term_months,
+        months_to_forecast=months_to_forecast,
+        start_date=start_date,
     )
-    admin_fees_existing_loans
-
-    return admin_fees_existing_loans.sum()
 
 
 def calculate_credit_insurance_fee_existing_loans(
@@ -94,32 +160,14 @@ def calculate_credit_insurance_fee_existing_loans(
     months_to_forecast: int,
     start_date: str,
 ):
-    credit_insurance_fee_existing = (
-        loan_amount * credit_insurance_fee_percentage / loan_term_months
-    )
-
-    credit_insurance_fees_existing_loans = []
-    for i in credit_insurance_fee_existing.index:
-        temp = pd.Series(
-            np.repeat(
-                credit_insurance_fee_existing.loc[i],
-                remaining_term_months.loc[i],
-            ),
-            name=i,
-        )
-        credit_insurance_fees_existing_loans.append(temp)
-    credit_insurance_fees_existing_loans = pd.concat(
-        credit_insurance_fees_existing_loans, axis=1
-    ).T.fillna(0)
-    credit_insurance_fees_existing_loans = credit_insurance_fees_existing_loans.iloc[
-        :, :months_to_forecast
-    ]
-    credit_insurance_fees_existing_loans.columns = helper.generate_columns(
-        start_date, period=months_to_forecast
+    return calculate_fee_existing_loans(
+        loan_amount=loan_amount,
+        fee_percentage=credit_insurance_fee_percentage,
+        loan_term_months=loan_term_months,
+        remaining_term_months=remaining_term_months,
+        months_to_forecast=months_to_forecast,
+        start_date=start_date,
     )
-    credit_insurance_fees_existing_loans
-
-    return credit_insurance_fees_existing_loans.sum()
 
 
 def aggregate_new_and_existing_loans_insurance_fee(
@@ -139,46 +187,13 @@ def calculate_admin_fee_for_all_new_disbursements(
     disbursement_parameters: pd.DataFrame,
     months_to_forecast: int,
 ):
-    sme_admin_fee = calculate_admin_fee_new_disbursements(
-        disbursements=new_disbursements_df["sme_disbursements"],
-        admin_fee_percentage=disbursement_parameters.loc["SME_ADMINISTRATION_FEE"],
-        average_loan_term=disbursement_parameters.loc["SME_AVERAGE_LOAN_TERM"],
-        months_to_forecast=months_to_forecast,
-    )
-    b2b_admin_fee = calculate_admin_fee_new_disbursements(
-        disbursements=new_disbursements_df["b2b_disbursements"],
-        admin_fee_percentage=disbursement_parameters.loc["B2B_ADMINISTRATION_FEE"],
-        average_loan_term=disbursement_parameters.loc["B2B_AVERAGE_LOAN_TERM"],
-        months_to_forecast=months_to_forecast,
-    )
-    consumer_ssb_admin_fee = calculate_admin_fee_new_disbursements(
-        disbursements=new_disbursements_df["consumer_ssb_disbursements"],
-        admin_fee_percentage=disbursement_parameters.loc[
-            "CONSUMER_SSB_ADMINISTRATION_FEE"
-        ],
-        average_loan_term=disbursement_parameters.loc["CONSUMER_SSB_AVERAGE_LOAN_TERM"],
+    return calculate_fee_for_all_new_disbursements(
+        new_disbursements_df=new_disbursements_df,
+        disbursement_parameters=disbursement_parameters,
+        fee_percentage=constants.ProductParameters.administration_fee,
+        suffix="admin_fee",
         months_to_forecast=months_to_forecast,
     )
-    consumer_pvt_admin_fee = calculate_admin_fee_new_disbursements(
-        disbursements=new_disbursements_df["consumer_pvt_disbursements"],
-        admin_fee_percentage=disbursement_parameters.loc[
-            "CONSUMER_PVT_ADMINISTRATION_FEE"
-        ],
-        average_loan_term=disbursement_parameters.loc["CONSUMER_PVT_AVERAGE_LOAN_TERM"],
-        months_to_forecast=months_to_forecast,
-    )
-    admin_fee_new_disbursements = helper.add_series(
-        [consumer_pvt_admin_fee, consumer_ssb_admin_fee, b2b_admin_fee, sme_admin_fee]
-    )
-    return pd.DataFrame(
-        {
-            "sme_admin_fee": sme_admin_fee,
-            "b2b_admin_fee": b2b_admin_fee,
-            "consumer_ssb_admin_fee": consumer_ssb_admin_fee,
-            "consumer_pvt_admin_fee": consumer_pvt_admin_fee,
-            "total": admin_fee_new_disbursements,
-        }
-    )
 
 
 def calculate_credit_insurance_fee_for_all_new_disbursements(
@@ -186,124 +201,56 @@ def calculate_credit_insurance_fee_for_all_new_disbursements(
     disbursement_parameters: pd.DataFrame,
     months_to_forecast: int,
 ):
-    sme_credit_insurance_fee = calculate_credit_insurance_fee_new_disbursements(
-        new_disbursements_df["sme_disbursements"],
-        credit_insurance_fee_percentage=disbursement_parameters.loc[
-            "SME_CREDIT_INSURANCE_FEE"
-        ],
-        average_loan_term=disbursement_parameters.loc["SME_AVERAGE_LOAN_TERM"],
-        months_to_forecast=months_to_forecast,
-    )
-    b2b_credit_insurance_fee = calculate_credit_insurance_fee_new_disbursements(
-        new_disbursements_df["b2b_disbursements"],
-        credit_insurance_fee_percentage=disbursement_parameters.loc[
-            "B2B_CREDIT_INSURANCE_FEE"
-        ],
-        average_loan_term=disbursement_parameters.loc["B2B_AVERAGE_LOAN_TERM"],
+    return calculate_fee_for_all_new_disbursements(
+        new_disbursements_df=new_disbursements_df,
+        disbursement_parameters=disbursement_parameters,
+        fee_percentage=constants.ProductParameters.credit_insurance_fee,
+        suffix="credit_insurance_fee",
         months_to_forecast=months_to_forecast,
     )
-    consumer_ssb_credit_insurance_fee = (
-        calculate_credit_insurance_fee_new_disbursements(
-            new_disbursements_df["consumer_ssb_disbursements"],
-            credit_insurance_fee_percentage=disbursement_parameters.loc[
-                "CONSUMER_SSB_CREDIT_INSURANCE_FEE"
-            ],
-            average_loan_term=disbursement_parameters.loc[
-                "CONSUMER_SSB_AVERAGE_LOAN_TERM"
-            ],
-            months_to_forecast=months_to_forecast,
-        )
-    )
-    consumer_pvt_credit_insurance_fee = (
-        calculate_credit_insurance_fee_new_disbursements(
-            new_disbursements_df["consumer_pvt_disbursements"],
-            credit_insurance_fee_percentage=disbursement_parameters.loc[
-                "CONSUMER_PVT_CREDIT_INSURANCE_FEE"
-            ],
-            average_loan_term=disbursement_parameters.loc[
-                "CONSUMER_PVT_AVERAGE_LOAN_TERM"
-            ],
-            months_to_forecast=months_to_forecast,
-        )
-    )
-
-    credit_insurance_fee_new_disbursements = helper.add_series(
-        [
-            consumer_pvt_credit_insurance_fee,
-            consumer_ssb_credit_insurance_fee,
-            b2b_credit_insurance_fee,
-            sme_credit_insurance_fee,
-        ]
-    )
-
-    return pd.DataFrame(
-        {
-            "sme_credit_insurance_fee": sme_credit_insurance_fee,
-            "b2b_credit_insurance_fee": b2b_credit_insurance_fee,
-            "consumer_ssb_credit_insurance_fee": consumer_ssb_credit_insurance_fee,
-            "consumer_pvt_credit_insurance_fee": consumer_pvt_credit_insurance_fee,
-            "total": credit_insurance_fee_new_disbursements,
-        }
-    )
 
 
 def calculate_other_income_existing_loans(
-    existing_loans: pd.DataFrame, start_date: str, months_to_forecast: int
+    existing_loans: pd.DataFrame,
+    start_date: str,
+    months_to_forecast: int,
+    disbursement_dates: pd.Series | None = None,
 ):
-    existing_loans["disbursement_date"] = helper.convert_to_datetime(
-        existing_loans["disbursement_date"]
-    )
-
-    existing_loans = existing_loans.assign(
-        remaining_term_months=existing_loans.apply(
-            lambda row: np.maximum(
-                0,
-                (
-                    row["disbursement_date"]
-                    + np.timedelta64(row["loan_term"], "M")
-                    - np.datetime64(start_date)
-                )
-                // np.timedelta64(1, "M"),
-            ),
-            axis=1,
+    """Admin and credit insurance fees of the loan tape over the forecast. Every loan earns
+    fee * loan_amount / loan_term a month for loan_term months from the month after it was
+    disbursed. `disbursement_dates` are the parsed dates of the tape, when already at hand."""
+    if disbursement_dates is None:
+        disbursement_dates = helper.convert_to_datetime(
+            existing_loans["disbursement_date"]
         )
-    )
-
-    admin_fee_existing_loans = borrowings.calculate_straight_line_payments(
-        effective_dates=existing_loans["disbursement_date"],
-        tenures=existing_loans["loan_term"],
-        frequencies=existing_loans["admin_fee"] * 0 + 12,
-        amounts=existing_loans["admin_fee"]
-        * existing_loans["loan_amount"]
-        / existing_loans["loan_term"],
-        loan_identifiers=existing_loans["loan_number"],
-    )
-
-    admin_fee_existing_loans = admin_fee_existing_loans.sum()
 
-    credit_insurance_fee_existing_loans = borrowings.calculate_straight_line_payments(
-        effective_dates=existing_loans["disbursement_date"],
-        tenures=existing_loans["loan_term"],
-        frequencies=existing_loans["admin_fee"] * 0 + 12,
-        amounts=(
-            existing_loans["credit_insurance_fee"]
-            * existing_loans["loan_amount"]
-            / existing_loans["loan_term"]
-        ),
-        loan_identifiers=existing_loans["loan_number"],
-    )
-
-    credit_insurance_fee_existing_loans = credit_insurance_fee_existing_loans.sum()
-    other_income_existing_loans = helper.add_series(
-        [credit_insurance_fee_existing_loans, admin_fee_existing_loans]
-    )
+    disbursement_months = (
+        np.asarray(disbursement_dates, dtype="datetime64[M]").astype(np.int64)
+        - pd.Period(start_date, freq="M").ordinal
+    )
+    loan_terms = existing_loans["loan_term"].to_numpy(dtype=float)
+    loan_amounts = existing_loans["loan_amount"].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fees = {
+            fee: spread_fees(
+                monthly_fees=existing_loans[fee].to_numpy(dtype=float)
+                * loan_amounts
+                / loan_terms,
+                starts=disbursement_months + 1,
+                terms=np.nan_to_num(loan_terms).astype(np.int64),
+                months_to_forecast=months_to_forecast,
+            )
+            for fee in ["credit_insurance_fee", "admin_fee"]
+        }
 
     return pd.DataFrame(
         {
-            "credit_insurance_fee_existing_loans": credit_insurance_fee_existing_loans,
-            "admin_fee_existing_loans": admin_fee_existing_loans,
-            "total": other_income_existing_loans,
-        }
+            "credit_insurance_fee_existing_loans": fees["credit_insurance_fee"],
+            "admin_fee_existing_loans": fees["admin_fee"],
+            "total": fees["credit_insurance_fee"] + fees["admin_fee"],
+        },
+        index=helper.generate_columns(start_date, months_to_forecast),
     )
 
 
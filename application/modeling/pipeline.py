@@ -0,0 +1,310 @@
+import contextvars
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, status
+
+from application.modeling import cache, constants, storage
+
+FileKey = Tuple[constants.FileStage, Enum]
+
+
+class Stage:
+    """One step of the calculation graph with the files it reads and the files it writes.
+    `version` is part of the stage's fingerprint: bump it whenever a change to the code makes the
+    stage write different outputs, so runs stop reusing the outputs of the old code."""
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable,
+        inputs: List[FileKey],
+        outputs: List[FileKey],
+        version: int = 1,
+    ):
+        self.name = name
+        self.function = function
+        self.inputs = inputs
+        self.outputs = outputs
+        self.version = version
+
+
+def get_file_key_name(file_key: FileKey) -> str:
+    file_stage, file_name = file_key
+    return f"{file_stage.value}/{file_name.value}"
+
+
+def hash_table(table: pa.Table) -> str:
+    """Content hash of an Arrow table covering its schema (column names, types and pandas metadata) and every buffer"""
+    digest = hashlib.sha256()
+    digest.update(table.schema.serialize())
+    for column in table.itercolumns():
+        for chunk in column.chunks:
+            digest.update(str((chunk.offset, len(chunk))).encode())
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    digest.update(buffer)
+    return digest.hexdigest()
+
+
+def fingerprint_stage(
+    stage: Stage, project_parameters: dict, input_versions: Dict[str, str]
+) -> str:
+    """Hashes everything a stage's outputs depend on: the version of its code, the project parameters
+    and the version of every input file"""
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "stage": stage.name,
+                "version": stage.version,
+                "project_parameters": project_parameters,
+                "inputs": input_versions,
+            },
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+
+def get_stage_dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    """Maps every stage to the stages producing its inputs. Inputs nobody produces (the raw files) are not dependencies"""
+    producers = {}
+    for stage in stages:
+        for file_key in stage.outputs:
+            if file_key in producers:
+                raise ValueError(
+                    f"{file_key[0].value}/{file_key[1].value} is produced by both "
+                    f"{producers[file_key]} and {stage.name}"
+                )
+            producers[file_key] = stage.name
+
+    dependencies = {}
+    for stage in stages:
+        dependencies[stage.name] = sorted(
+            {
+                producers[file_key]
+                for file_key in stage.inputs
+                if file_key in producers and producers[file_key] != stage.name
+            }
+        )
+
+    return dependencies
+
+
+def run_stages(
+    stages: List[Stage],
+    run_stage: Callable[[Stage], dict | None],
+    max_workers: int = constants.MAX_PIPELINE_WORKERS,
+) -> List[dict]:
+    """Runs every stage once all the stages it depends on have finished, starting independent stages concurrently.
+    Stages run in a copy of the caller's context. Returns the start offset and duration of each stage in seconds
+    together with whatever `run_stage` returned for it."""
+    dependencies = get_stage_dependencies(stages)
+    stages_by_name = {stage.name: stage for stage in stages}
+    pending = {name: set(upstream) for name, upstream in dependencies.items()}
+    started_at = time.perf_counter()
+    timings = {}
+    errors = {}
+
+    def timed(stage: Stage):
+        start = time.perf_counter()
+        report = run_stage(stage) or {}
+        timings[stage.name] = {
+            "stage": stage.name,
+            "started_after_seconds": round(start - started_at, 3),
+            "duration_seconds": round(time.perf_counter() - start, 3),
+            "depends_on": dependencies[stage.name],
+            **report,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+
+        def submit_ready_stages():
+            for name in [name for name, upstream in pending.items() if not upstream]:
+                del pending[name]
+                context = contextvars.copy_context()
+                future = executor.submit(context.run, timed, stages_by_name[name])
+                running[future] = name
+
+        submit_ready_stages()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except HTTPException as e:
+                    errors[name] = e.detail
+                except Exception as e:
+                    errors[name] = str(e)
+                else:
+                    for upstream in pending.values():
+                        upstream.discard(name)
+
+            if not errors:
+                submit_ready_stages()
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"failed_stages": errors, "skipped_stages": sorted(pending)},
+        )
+
+    if pending:
+        raise ValueError(f"Stages {sorted(pending)} have circular dependencies")
+
+    return [timings[stage.name] for stage in stages]
+
+
+def read_stage_fingerprints(project_store: storage.ProjectStore) -> dict:
+    """Returns the fingerprint of every stage recorded by the previous run and the content hash and ETag of each of its outputs"""
+    try:
+        df = project_store.read(
+            file_stage=constants.FileStage.pipeline,
+            file_name=constants.PipelineFiles.stage_fingerprints,
+        )
+    except Exception:
+        return {}
+
+    stage_fingerprints = {}
+    for row in df.itertuples(index=False):
+        stage_fingerprint = stage_fingerprints.setdefault(
+            row.stage, {"fingerprint": row.fingerprint, "outputs": {}}
+        )
+        stage_fingerprint["outputs"][row.file] = {
+            "content_hash": row.content_hash,
+            "etag": row.etag,
+        }
+
+    return stage_fingerprints
+
+
+def write_stage_fingerprints(
+    project_store: storage.ProjectStore, stage_fingerprints: dict
+):
+    rows = [
+        {
+            "stage": stage,
+            "fingerprint": stage_fingerprint["fingerprint"],
+            "file": file,
+            "content_hash": output["content_hash"],
+            "etag": output["etag"],
+        }
+        for stage, stage_fingerprint in stage_fingerprints.items()
+        for file, output in stage_fingerprint["outputs"].items()
+    ]
+
+    project_store.write(
+        df=pd.DataFrame(
+            rows, columns=["stage", "fingerprint", "file", "content_hash", "etag"]
+        ),
+        file_stage=constants.FileStage.pipeline,
+        file_name=constants.PipelineFiles.stage_fingerprints,
+        index=False,
+    )
+
+
+def run_incremental_stages(
+    stages: List[Stage],
+    call_stage: Callable[[Stage], None],
+    backing_store: storage.ProjectStore,
+    project_parameters: dict,
+    force: bool = False,
+) -> Tuple[List[dict], float]:
+    """Runs the stages with `call_stage`, reusing the stored outputs of every stage whose fingerprint has not changed.
+    A fingerprint covers the version of the stage, the project parameters and the version of each input: the ETag
+    (content MD5) of raw files and the content hash of files produced by other stages, so a recomputed stage that
+    reproduces the same output does not invalidate the stages after it.
+    Returns the report of every stage, as run_stages does, and the seconds spent uploading the outputs."""
+    run_store = storage.RunProjectStore(backing_store=backing_store)
+
+    previous_fingerprints = {} if force else read_stage_fingerprints(backing_store)
+    stage_fingerprints = {}
+    content_hashes = {}
+
+    def get_input_version(file_key: FileKey) -> str:
+        file = get_file_key_name(file_key)
+        if file in content_hashes:
+            return content_hashes[file]
+        return backing_store.etag(file_stage=file_key[0], file_name=file_key[1])
+
+    def is_unchanged(file_key: FileKey, etag: str) -> bool:
+        try:
+            return (
+                backing_store.etag(file_stage=file_key[0], file_name=file_key[1])
+                == etag
+            )
+        except Exception:
+            return False
+
+    def run_stage(stage: Stage):
+        fingerprint = fingerprint_stage(
+            stage=stage,
+            project_parameters=project_parameters,
+            input_versions={
+                get_file_key_name(file_key): get_input_version(file_key)
+                for file_key in stage.inputs
+            },
+        )
+
+        previous = previous_fingerprints.get(stage.name)
+        outputs = {get_file_key_name(file_key): file_key for file_key in stage.outputs}
+        if (
+            previous is not None
+            and previous["fingerprint"] == fingerprint
+            and set(previous["outputs"]) == set(outputs)
+            and all(
+                is_unchanged(file_key=file_key, etag=previous["outputs"][file]["etag"])
+                for file, file_key in outputs.items()
+            )
+        ):
+            stage_fingerprints[stage.name] = previous
+            for file, output in previous["outputs"].items():
+                content_hashes[file] = output["content_hash"]
+            return {"reused": True}
+
+        call_stage(stage)
+
+        stage_fingerprints[stage.name] = {"fingerprint": fingerprint, "outputs": {}}
+        for file, file_key in outputs.items():
+            content_hashes[file] = hash_table(
+                run_store.read_table(file_stage=file_key[0], file_name=file_key[1])
+            )
+            stage_fingerprints[stage.name]["outputs"][file] = {
+                "content_hash": content_hashes[file],
+                "etag": None,
+            }
+        return {"reused": False}
+
+    token = storage.RUN_PROJECT_STORE.set(run_store)
+    try:
+        reports = run_stages(stages=stages, run_stage=run_stage)
+    finally:
+        storage.RUN_PROJECT_STORE.reset(token)
+
+    upload_start = time.perf_counter()
+    for path in run_store.flush():
+        cache.DATAFRAME_CACHE.invalidate(path)
+
+    for stage in stages:
+        for file_key in stage.outputs:
+            output = stage_fingerprints[stage.name]["outputs"][
+                get_file_key_name(file_key)
+            ]
+            if output["etag"] is None:
+                output["etag"] = backing_store.etag(
+                    file_stage=file_key[0], file_name=file_key[1]
+                )
+    write_stage_fingerprints(
+        backing_store,
+        {stage.name: stage_fingerprints[stage.name] for stage in stages},
+    )
+
+    return reports, round(time.perf_counter() - upload_start, 3)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, status
+
+from application.modeling import constants
+
+CHANNEL_PARAMETERS = {
+    constants.DisbursementChannel.direct: [constants.ProductParameters.disbursements],
+    constants.DisbursementChannel.credit_officers: [
+        constants.ProductParameters.number_of_credit_officers,
+        constants.ProductParameters.average_loan_size,
+        constants.ProductParameters.number_of_loans_per_credit_officer,
+    ],
+    constants.DisbursementChannel.agents: [
+        constants.ProductParameters.number_of_agents,
+        constants.ProductParameters.average_loan_size,
+        constants.ProductParameters.number_of_loans_per_agent,
+    ],
+}
+
+
+class ProductSegments:
+    """The loan products of a project, as laid out in disbursement_parameters.
+
+    Every <PRODUCT>_INTEREST_RATE row defines a product, and its other parameters are the
+    <PRODUCT>_<PARAMETER> rows. Products keep the order they appear in the file and are named
+    after their prefix in lower case, so SME_INTEREST_RATE makes the "sme" product whose
+    disbursements go in the "sme_disbursements" column.
+
+    A product is disbursed through the first channel whose rows are all there: a
+    <PRODUCT>_DISBURSEMENTS row, credit officers or agents.
+    """
+
+    def __init__(self, disbursement_parameters: pd.DataFrame):
+        self.parameters = disbursement_parameters
+
+        suffix = f"_{constants.ProductParameters.interest_rate.value}"
+        self.prefixes = [
+            label[: -len(suffix)]
+            for label in disbursement_parameters.index
+            if isinstance(label, str) and label.endswith(suffix)
+        ]
+        if not self.prefixes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"No loan product found in disbursement parameters, every product needs a <PRODUCT>{suffix} row",
+            )
+        self.names = [prefix.lower() for prefix in self.prefixes]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_channel(self, prefix: str) -> constants.DisbursementChannel:
+        for channel, parameters in CHANNEL_PARAMETERS.items():
+            if all(
+                f"{prefix}_{parameter.value}" in self.parameters.index
+                for parameter in parameters
+            ):
+                return channel
+
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Disbursement parameters do not say how much the {prefix} product disburses, "
+            f"add a {prefix}_DISBURSEMENTS row or its credit officer or agent rows",
+        )
+
+    def get(
+        self,
+        parameter: constants.ProductParameters,
+        default: float | None = None,
+    ) -> np.ndarray:
+        """One parameter of every product, shaped (products, months). Products without the row
+        get `default`, or are reported as an error when there is no default."""
+        labels = [f"{prefix}_{parameter.value}" for prefix in self.prefixes]
+        found = np.array([label in self.parameters.index for label in labels])
+
+        if not found.all() and default is None:
+            missing = [label for label, exists in zip(labels, found) if not exists]
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Disbursement parameters are missing {', '.join(missing)}",
+            )
+
+        values = np.full((len(labels), self.parameters.shape[1]), np.nan)
+        values[found] = self.parameters.loc[
+            [label for label, exists in zip(labels, found) if exists]
+        ].to_numpy(dtype=float)
+        values[~found] = default
+        return values
+
+    def is_channel(self, channel: constants.DisbursementChannel) -> np.ndarray:
+        return np.array(
+            [self.get_channel(prefix) == channel for prefix in self.prefixes]
+        )
+
+    def columns(self, suffix: str) -> list[str]:
+        return [f"{name}_{suffix}" for name in self.names]
+
+    def select(self, df: pd.DataFrame, suffix: str) -> np.ndarray:
+        """The <product>_<suffix> columns of a frame, shaped (products, rows)"""
+        return df[self.columns(suffix)].to_numpy(dtype=float).T
+
+    def to_frame(self, values: np.ndarray, suffix: str, index) -> pd.DataFrame:
+        """A frame with one <product>_<suffix> column per product and their total"""
+        df = pd.DataFrame(values.T, index=index, columns=self.columns(suffix))
+        df["total"] = np.nansum(values, axis=0)
+        return df
+
+
+def get_product_segments(disbursement_parameters: pd.DataFrame) -> ProductSegments:
+    return ProductSegments(disbursement_parameters)
+
+
+def get_product_column(df: pd.DataFrame, product: str, suffix: str) -> pd.Series:
+    """The column of one product, or zeros when the project does not have that product"""
+    column = f"{product}_{suffix}"
+    if column in df.columns:
+        return df[column]
+    return pd.Series(0.0, index=df.index, name=column)
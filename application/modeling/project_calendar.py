@@ -0,0 +1,166 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class ProjectCalendar:
+    """The monthly time axis of a projection.
+
+    Month i of the projection is position i of every monthly array. The "%b-%Y" labels,
+    the year and quarter of every month and the reporting periods they fall in are worked
+    out once, so callers bucket and align on integer positions and only format labels
+    when a frame is written out.
+    """
+
+    def __init__(self, first_month: int, months_to_forecast: int):
+        self.first_month = int(first_month)
+        self.months_to_forecast = int(months_to_forecast)
+
+        self.months = np.arange(self.months_to_forecast)
+        self.ordinals = self.first_month + self.months
+        self.years = self.ordinals // 12 + 1970
+        self.month_of_year = self.ordinals % 12 + 1
+        self.quarter_of_year = (self.month_of_year - 1) // 3 + 1
+
+        self.labels = pd.Index(
+            pd.period_range(
+                start=pd.Period(ordinal=self.first_month, freq="M"),
+                periods=self.months_to_forecast,
+                freq="M",
+            ).strftime("%b-%Y")
+        )
+
+        self.yearly = PeriodBuckets(
+            starts=bucket_starts(self.years),
+            length=self.months_to_forecast,
+            labels=self.years.astype(str),
+        )
+
+        quarters = self.years * 4 + self.quarter_of_year
+        self.quarterly = PeriodBuckets(
+            starts=bucket_starts(quarters),
+            length=self.months_to_forecast,
+            labels=[
+                f"Q{quarter}-{year}"
+                for quarter, year in zip(self.quarter_of_year, self.years)
+            ],
+        )
+        self.fiscal_year_buckets = {}
+
+        # Every projection of the same shape shares this object, so nobody may write to it
+        for values in vars(self).values():
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+
+    def __len__(self) -> int:
+        return self.months_to_forecast
+
+    def positions(self, labels) -> np.ndarray:
+        """Position of every label on the axis, -1 for labels outside the projection"""
+        return self.labels.get_indexer(pd.Index(labels))
+
+    def align(self, series: pd.Series, fill_value: float = 0) -> np.ndarray:
+        """Values of a label-indexed Series laid out on the axis, fill_value where it has none"""
+        values = np.full(self.months_to_forecast, fill_value, dtype=float)
+        positions = self.positions(series.index)
+        found = positions >= 0
+        values[positions[found]] = series.to_numpy(dtype=float)[found]
+        return values
+
+    def fiscal_years(self, year_end_month: int = 12) -> "PeriodBuckets":
+        """Financial years ending with `year_end_month`, named after the calendar year they end in"""
+        if not 1 <= year_end_month <= 12:
+            raise ValueError(f"{year_end_month} is not a month of the year")
+
+        if year_end_month not in self.fiscal_year_buckets:
+            fiscal_years = self.years + (self.month_of_year > year_end_month)
+            self.fiscal_year_buckets[year_end_month] = PeriodBuckets(
+                starts=bucket_starts(fiscal_years),
+                length=self.months_to_forecast,
+                labels=[f"FY{year}" for year in fiscal_years],
+            )
+        return self.fiscal_year_buckets[year_end_month]
+
+    def to_frame(self, values: np.ndarray, index) -> pd.DataFrame:
+        return pd.DataFrame(values, index=index, columns=self.labels)
+
+
+class PeriodBuckets:
+    """Consecutive months of a calendar grouped into reporting periods such as years or quarters.
+
+    Lines that flow over a period (income, expenses, cash movements) add up its months, while
+    balances are read at the first month of a period (opening balances) or at its last month.
+    `labels` name every month and the first label of a period names the period.
+    """
+
+    def __init__(self, starts: np.ndarray, length: int, labels):
+        self.starts = starts
+        self.ends = bucket_ends(starts, length)
+        self.labels = pd.Index(np.asarray(labels, dtype=str)[starts])
+
+        self.starts.flags.writeable = False
+        self.ends.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def sum(self, values: np.ndarray) -> np.ndarray:
+        """Sums the months of each period along the last axis; NaNs count as zero"""
+        return sum_buckets(values, self.starts)
+
+    def first(self, values: np.ndarray) -> np.ndarray:
+        return np.asarray(values, dtype=float)[..., self.starts]
+
+    def last(self, values: np.ndarray) -> np.ndarray:
+        return np.asarray(values, dtype=float)[..., self.ends]
+
+
+def bucket_starts(keys: np.ndarray) -> np.ndarray:
+    if not len(keys):
+        return np.array([], dtype=int)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def bucket_ends(starts: np.ndarray, length: int) -> np.ndarray:
+    """Position of the last month of every bucket"""
+    return np.r_[starts[1:], length].astype(int) - 1
+
+
+def sum_buckets(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    if not len(starts):
+        return np.zeros(values.shape[:-1] + (0,))
+    return np.add.reduceat(np.where(np.isnan(values), 0, values), starts, axis=-1)
+
+
+@lru_cache(maxsize=256)
+def get_calendar_for_month(
+    first_month: int, months_to_forecast: int
+) -> ProjectCalendar:
+    return ProjectCalendar(
+        first_month=first_month, months_to_forecast=months_to_forecast
+    )
+
+
+def get_calendar(start_date, months_to_forecast: int) -> ProjectCalendar:
+    """Shared calendar of a projection starting in the month of start_date (a date or a "%b-%Y" label)"""
+    return get_calendar_for_month(
+        pd.Period(start_date, freq="M").ordinal, int(months_to_forecast)
+    )
+
+
+def get_calendar_for_labels(labels) -> ProjectCalendar | None:
+    """The calendar whose labels are exactly `labels`, or None when they are not consecutive "%b-%Y" months"""
+    labels = pd.Index(labels)
+    if not len(labels) or not isinstance(labels[0], str):
+        return None
+
+    try:
+        calendar = get_calendar(labels[0], len(labels))
+    except (ValueError, TypeError):
+        return None
+
+    if not calendar.labels.equals(labels):
+        return None
+    return calendar
@@ -0,0 +1,255 @@
+import json
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+SCHEDULE_METADATA_KEY = b"banded_schedule"
+
+
+def month_ordinals(labels) -> np.ndarray:
+    """Turns "%b-%Y" labels into monthly period ordinals"""
+    return pd.PeriodIndex(
+        pd.to_datetime(pd.Index(labels), format="%b-%Y"), freq="M"
+    ).asi8.astype(np.int64)
+
+
+class BandedSchedule:
+    """Per-loan schedules that keep only the band of consecutive months each loan is active in.
+
+    Loan i covers months first_month + starts[i] up to first_month + starts[i] + lengths[i] - 1
+    and its amounts are values[offsets[i]:offsets[i + 1]]. Every month outside a loan's band is zero.
+    `columns` keeps the labels (and their order) of the dense loans x months frame the schedule stands for.
+    """
+
+    def __init__(
+        self,
+        loans: pd.Index,
+        first_month: int,
+        number_of_months: int,
+        starts: np.ndarray,
+        lengths: np.ndarray,
+        values: np.ndarray,
+        columns: pd.Index | None = None,
+    ):
+        self.loans = pd.Index(loans)
+        self.first_month = int(first_month)
+        self.number_of_months = int(number_of_months)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).astype(np.int64)
+        self.values = np.asarray(values, dtype=float)
+        self.columns = self.months if columns is None else pd.Index(columns)
+
+    @property
+    def months(self) -> pd.Index:
+        """Labels of every month between the first and the last month of the schedule"""
+        return pd.Index(
+            pd.period_range(
+                start=pd.Period(ordinal=self.first_month, freq="M"),
+                periods=self.number_of_months,
+                freq="M",
+            ).strftime("%b-%Y")
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.starts.nbytes + self.lengths.nbytes
+
+    def __len__(self) -> int:
+        return len(self.loans)
+
+    def column_positions(self) -> np.ndarray:
+        return month_ordinals(self.columns) - self.first_month
+
+    def band_positions(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the loan and the month (relative to first_month) of every entry of `values`"""
+        loans = np.repeat(np.arange(len(self.loans)), self.lengths)
+        months = (
+            np.arange(len(self.values)) - self.offsets[:-1][loans] + self.starts[loans]
+        )
+        return loans, months
+
+    @classmethod
+    def from_dense(cls, df: pd.DataFrame) -> "BandedSchedule":
+        """Builds the banded form of a loans x months frame whose columns are "%b-%Y" labels"""
+        ordinals = month_ordinals(df.columns)
+        if not len(ordinals):
+            return cls(
+                loans=df.index,
+                first_month=0,
+                number_of_months=0,
+                starts=np.zeros(len(df), dtype=np.int64),
+                lengths=np.zeros(len(df), dtype=np.int64),
+                values=np.array([]),
+                columns=df.columns,
+            )
+
+        first_month = ordinals.min()
+        number_of_months = ordinals.max() - first_month + 1
+
+        dense = np.zeros((len(df), number_of_months))
+        dense[:, ordinals - first_month] = df.to_numpy(dtype=float)
+
+        nonzero = dense != 0
+        active = nonzero.any(axis=1)
+        starts = np.where(active, nonzero.argmax(axis=1), 0)
+        ends = np.where(active, number_of_months - nonzero[:, ::-1].argmax(axis=1), 0)
+
+        months = np.arange(number_of_months)
+        band = (months >= starts[:, None]) & (months < ends[:, None])
+
+        return cls(
+            loans=df.index,
+            first_month=first_month,
+            number_of_months=number_of_months,
+            starts=starts,
+            lengths=ends - starts,
+            values=dense[band],
+            columns=df.columns,
+        )
+
+    def to_dense(self) -> pd.DataFrame:
+        dense = np.zeros((len(self.loans), self.number_of_months))
+        loans, months = self.band_positions()
+        dense[loans, months] = self.values
+
+        positions = self.column_positions()
+        if not np.array_equal(positions, np.arange(self.number_of_months)):
+            dense = dense[:, positions]
+
+        return pd.DataFrame(dense, index=self.loans, columns=self.columns, copy=False)
+
+    def column_sums(self) -> pd.Series:
+        """Total of every month across loans, the same as to_dense().sum()"""
+        _, months = self.band_positions()
+        totals = np.bincount(
+            months, weights=self.values, minlength=self.number_of_months
+        )
+        return pd.Series(totals[self.column_positions()], index=self.columns)
+
+    def sum_by(self, groups) -> pd.DataFrame:
+        """Monthly totals per group, for example per product; `groups` holds one key per loan.
+        Loans whose key is missing are left out."""
+        codes, keys = pd.factorize(np.asarray(groups), sort=True)
+        loans, months = self.band_positions()
+        codes = codes[loans]
+        grouped = codes >= 0
+
+        totals = np.bincount(
+            codes[grouped] * self.number_of_months + months[grouped],
+            weights=self.values[grouped],
+            minlength=len(keys) * self.number_of_months,
+        ).reshape(len(keys), self.number_of_months)
+
+        return pd.DataFrame(
+            totals[:, self.column_positions()], index=keys, columns=self.columns
+        )
+
+    def slice_months(self, start, end) -> "BandedSchedule":
+        """Keeps the months from `start` to `end` (labels, dates or periods), both included, the way
+        .loc[:, start:end] would on a chronologically ordered frame. Every loan is kept, with an empty band if it is inactive then."""
+        lowest, highest = (
+            pd.Period(month, freq="M").ordinal - self.first_month
+            for month in (start, end)
+        )
+        lowest = int(np.clip(lowest, 0, self.number_of_months))
+        highest = int(np.clip(highest + 1, lowest, self.number_of_months))
+
+        starts = np.clip(self.starts, lowest, highest)
+        ends = np.clip(self.starts + self.lengths, lowest, highest)
+        lengths = ends - starts
+
+        loans = np.repeat(np.arange(len(self.loans)), lengths)
+        positions = (
+            np.arange(lengths.sum())
+            - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            + self.offsets[:-1][loans]
+            + (starts - self.starts)[loans]
+        )
+
+        column_positions = self.column_positions()
+        in_range = (column_positions >= lowest) & (column_positions < highest)
+
+        return BandedSchedule(
+            loans=self.loans,
+            first_month=self.first_month + lowest,
+            number_of_months=highest - lowest,
+            starts=starts - lowest,
+            lengths=lengths,
+            values=self.values[positions],
+            columns=self.columns[in_range],
+        )
+
+    def head(self, n: int = 5) -> "BandedSchedule":
+        return self.slice_loans(0, n)
+
+    def slice_loans(self, start: int, stop: int) -> "BandedSchedule":
+        """The schedules of loans start up to stop, sharing the values of this schedule"""
+        start = min(start, len(self.loans))
+        stop = min(max(stop, start), len(self.loans))
+        return BandedSchedule(
+            loans=self.loans[start:stop],
+            first_month=self.first_month,
+            number_of_months=self.number_of_months,
+            starts=self.starts[start:stop],
+            lengths=self.lengths[start:stop],
+            values=self.values[self.offsets[start] : self.offsets[stop]],
+            columns=self.columns,
+        )
+
+    def iter_dense(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """to_dense() a chunk_size loans at a time, so only one chunk is ever dense in memory"""
+        for start in range(0, max(len(self.loans), 1), chunk_size):
+            yield self.slice_loans(start, start + chunk_size).to_dense()
+
+    def to_table(self) -> pa.Table:
+        """One row per loan: its identifier, the start of its band and its values as a list.
+        The list offsets carry the band lengths, so the values are stored once, back to back."""
+        table = pa.table(
+            {
+                "loan": pa.array(self.loans.to_numpy()),
+                "start": pa.array(self.starts, type=pa.int32()),
+                "values": pa.ListArray.from_arrays(
+                    pa.array(self.offsets, type=pa.int32()), pa.array(self.values)
+                ),
+            }
+        )
+        return table.replace_schema_metadata(
+            {
+                SCHEDULE_METADATA_KEY: json.dumps(
+                    {
+                        "first_month": self.first_month,
+                        "number_of_months": self.number_of_months,
+                        "columns": [str(column) for column in self.columns],
+                        "index_name": self.loans.name,
+                    }
+                )
+            }
+        )
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "BandedSchedule":
+        """Reads a table written by to_table. Files written as dense frames before schedules
+        were banded are converted on the fly."""
+        metadata = (table.schema.metadata or {}).get(SCHEDULE_METADATA_KEY)
+        if metadata is None:
+            return cls.from_dense(table.to_pandas())
+
+        metadata = json.loads(metadata)
+        values = table.column("values").combine_chunks()
+        offsets = np.asarray(values.offsets, dtype=np.int64)
+
+        return cls(
+            loans=pd.Index(
+                table.column("loan").to_numpy(),
+                name=metadata["index_name"],
+            ),
+            first_month=metadata["first_month"],
+            number_of_months=metadata["number_of_months"],
+            starts=table.column("start").to_numpy(),
+            lengths=np.diff(offsets),
+            values=values.flatten().to_numpy(zero_copy_only=False),
+            columns=pd.Index(metadata["columns"], dtype=object),
+        )
@@ -1,45 +1,49 @@
 import numpy as np
 import pandas as pd
 
-from application.modeling import helper
+from application.modeling import helper, statements
+
+STATEMENT_OF_CASHFLOWS = statements.parse_layout(
+    """
+    Profit/(loss) Per I/S
+    Treasury Movements
+    Adjustments For:
+    Depreciation
+    Interest Expense Accrued
+    Other Non-Cash Items
+    Cash From Operations Before WC = sum(Profit/(loss) Per I/S .. Other Non-Cash Items)
+    Working Capital Movements
+    (Increase)/Decrease In Receivables
+    Increase/(Decrease) In Payables
+    (Increase)/Decrease In Loan Book (Principle)
+    (Increase)/Decrease In Loan Book (Interest)
+    Increase/(Decrease) In Borrowings
+    Cash From Operations After WC = sum(Cash From Operations Before WC
+        + (Increase)/Decrease In Receivables .. Increase/(Decrease) In Borrowings)
+    Interest Paid
+    Tax Paid
+    Net Cash Flow From Operations = sum(Cash From Operations After WC .. Tax Paid)
+    CASH FLOW FROM INVESTING ACTIVITIES
+    Purchase Of Fixed Assets
+    Cash Flow From Investing Activities = sum(Purchase Of Fixed Assets)
+    CASH FLOW FROM FINANCING ACTIVITIES
+    Repayment Of Borrowings
+    Dividend Paid
+    Cash Flow From Financing Activities = sum(Repayment Of Borrowings .. Dividend Paid)
+    Net Increase/(Decrease) In Cash = Net Cash Flow From Operations
+        + Cash Flow From Investing Activities
+        + Cash Flow From Financing Activities
+    Cash At Beginning Of Period
+    Cash At End Of Period
+    """,
+    name="STATEMENT_OF_CASHFLOWS",
+    opening_lines=["Cash At Beginning Of Period"],
+    closing_lines=["Cash At End Of Period"],
+)
 
 
 def generate_statement_of_cashflow_template(start_date: str, months_to_forecast: int):
-    return pd.DataFrame(
-        index=pd.Index(
-            [
-                "Profit/(loss) Per I/S",
-                "Treasury Movements",
-                "Adjustments For:",
-                "Depreciation",
-                "Interest Expense Accrued",
-                "Other Non-Cash Items",
-                "Cash From Operations Before WC",
-                "Working Capital Movements",
-                "(Increase)/Decrease In Receivables",
-                "Increase/(Decrease) In Payables",
-                "(Increase)/Decrease In Loan Book (Principle)",
-                "(Increase)/Decrease In Loan Book (Interest)",
-                "Increase/(Decrease) In Borrowings",
-                "Cash From Operations After WC",
-                "Interest Paid",
-                "Tax Paid",
-                "Net Cash Flow From Operations",
-                "CASH FLOW FROM INVESTING ACTIVITIES",
-                "Purchase Of Fixed Assets",
-                "Cash Flow From Investing Activities",
-                "CASH FLOW FROM FINANCING ACTIVITIES",
-                "Repayment Of Borrowings",
-                "Dividend Paid",
-                "Cash Flow From Financing Activities",
-                "Net Increase/(Decrease) In Cash",
-                "Cash At Beginning Of Period",
-                "Cash At End Of Period",
-            ],
-            name="STATEMENT_OF_CASHFLOWS",
-        ),
-        columns=helper.generate_columns(start_date, months_to_forecast),
-    )
+    return STATEMENT_OF_CASHFLOWS.builder(start_date, months_to_forecast)
 
 
 def calculate_cash_at_end_and_beginning_of_period(
@@ -49,41 +53,9 @@ def calculate_cash_at_end_and_beginning_of_period(
         "Cash At Beginning Of Period", statement_of_cashflow_df.columns[0]
     ] = float(opening_balances["CASH_ON_HAND"].iat[0])
 
-    cash_at_end_of_period_loc = statement_of_cashflow_df.index.get_loc(
-        "Cash At End Of Period"
-    )
-    cash_at_beginning_of_period_loc = statement_of_cashflow_df.index.get_loc(
-        "Cash At Beginning Of Period"
+    return helper.roll_forward_balances(
+        statement_of_cashflow_df,
+        opening_row="Cash At Beginning Of Period",
+        closing_row="Cash At End Of Period",
+        movement_rows=["Net Increase/(Decrease) In Cash"],
     )
-
-    for index, period in enumerate(statement_of_cashflow_df.columns):
-        statement_of_cashflow_df.iloc[
-            cash_at_end_of_period_loc, index
-        ] = statement_of_cashflow_df.iloc[
-            cash_at_beginning_of_period_loc - 1 : cash_at_end_of_period_loc, index
-        ].sum()
-
-        if period == statement_of_cashflow_df.columns[-1]:
-            break
-
-        statement_of_cashflow_df.iloc[
-            cash_at_beginning_of_period_loc, index + 1
-        ] = statement_of_cashflow_df.iloc[cash_at_end_of_period_loc, index]
-
-    return statement_of_cashflow_df
-
-
-def calculate_statement_of_cashflow_yearly_df(
-    statement_of_cashflow_df: pd.DataFrame, opening_balances: pd.DataFrame
-):
-    statement_of_cashflow_yearly_df = statement_of_cashflow_df.groupby(
-        pd.DatetimeIndex(statement_of_cashflow_df.columns).year, axis=1
-    ).sum()
-
-    statement_of_cashflow_df = calculate_cash_at_end_and_beginning_of_period(
-        statement_of_cashflow_df=statement_of_cashflow_yearly_df,
-        opening_balances=opening_balances,
-    )
-    statement_of_cashflow_df.columns = statement_of_cashflow_df.columns.astype(str)
-
-    return statement_of_cashflow_df
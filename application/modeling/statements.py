@@ -0,0 +1,360 @@
+import re
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, status
+
+from application.modeling import constants, helper, project_calendar
+
+
+class StatementLayout:
+    """The lines of a financial statement, in the order they are reported, and how its subtotals add up.
+
+    A subtotal is an expression over other lines: "A + B - C" adds and subtracts lines and
+    "First .. Last" stands for every line from First to Last, both included. Operators need a
+    space on each side because line names use "-" and "/" themselves. `totals` count lines
+    that have no value as zero, the way the section totals of a statement are added up. A
+    `formulas` line has no value in a period where any of its terms has none.
+
+    The definitions are compiled once into the order they have to be worked out in and, for
+    every step of that order, a sparse (CSR) matrix over the statement lines, so filling in
+    the subtotals is one sparse matrix product over the period axis per step.
+
+    Over a quarter or a year the lines add up their months, except the `opening_lines`, which
+    are the balance at the start of the period, and the `closing_lines`, the balance at its
+    end. Every line of a statement of `balances` is a closing balance.
+    """
+
+    def __init__(
+        self,
+        lines: list[str],
+        name: str | None = None,
+        totals: dict[str, str] | None = None,
+        formulas: dict[str, str] | None = None,
+        opening_lines: list[str] | None = None,
+        closing_lines: list[str] | None = None,
+        balances: bool = False,
+    ):
+        self.lines = pd.Index(lines, name=name)
+        if self.lines.has_duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{', '.join(self.lines[self.lines.duplicated()].unique())} appear more than once in the {name or 'statement'}",
+            )
+        self.rows = {line: row for row, line in enumerate(self.lines)}
+        self.totals = totals or {}
+        self.formulas = formulas or {}
+
+        defined_twice = self.totals.keys() & self.formulas.keys()
+        if defined_twice:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{', '.join(sorted(defined_twice))} are both a total and a formula",
+            )
+
+        self.definitions = {
+            **{
+                line: (self.get_terms(line, expression), True)
+                for line, expression in self.totals.items()
+            },
+            **{
+                line: (self.get_terms(line, expression), False)
+                for line, expression in self.formulas.items()
+            },
+        }
+        self.evaluation_order = self.get_evaluation_order()
+        self.levels = self.compile()
+
+        self.opening_lines = opening_lines or []
+        self.closing_lines = list(self.lines) if balances else closing_lines or []
+        for line in self.opening_lines + self.closing_lines:
+            self.get_row(line)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def get_row(self, line: str) -> int:
+        if line not in self.rows:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{line} is not a line of the {self.lines.name or 'statement'}",
+            )
+        return self.rows[line]
+
+    def get_terms(self, line: str, expression: str) -> list[tuple[int, float]]:
+        """The (row, sign) pairs an expression adds up"""
+        self.get_row(line)
+        expression = expression.strip()
+        if not expression.startswith(("+ ", "- ")):
+            expression = f"+ {expression}"
+        parts = re.split(r"(?:^|\s+)([+-])\s+", expression)
+
+        terms = []
+        for operator, term in zip(parts[1::2], parts[2::2]):
+            sign = -1.0 if operator == "-" else 1.0
+            first, span, last = term.strip().partition(" .. ")
+            if span:
+                rows = range(
+                    self.get_row(first.strip()), self.get_row(last.strip()) + 1
+                )
+            else:
+                rows = [self.get_row(first.strip())]
+            terms.extend((row, sign) for row in rows)
+
+        if not terms:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{line} does not add up any line",
+            )
+        return terms
+
+    def get_evaluation_order(self) -> list[str]:
+        """The subtotals ordered so that every subtotal comes after the subtotals it uses"""
+        order = []
+        visiting = []
+
+        def visit(line: str):
+            if line in order:
+                return
+            if line in visiting:
+                cycle = visiting[visiting.index(line) :] + [line]
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"{line} adds up to itself through {' -> '.join(cycle)}",
+                )
+            visiting.append(line)
+            terms, _ = self.definitions[line]
+            for row, _ in terms:
+                if self.lines[row] in self.definitions:
+                    visit(self.lines[row])
+            visiting.pop()
+            order.append(line)
+
+        for line in sorted(self.definitions, key=self.get_row):
+            visit(line)
+        return order
+
+    def compile(self) -> list[tuple]:
+        """Groups the subtotals into levels, a subtotal being one level above the deepest subtotal it
+        uses, and lays out each level as a CSR matrix: the rows it fills, the offsets of every row's
+        terms, the line each term reads, its sign and whether a missing value counts as zero"""
+        depths = {}
+        for line in self.evaluation_order:
+            terms, _ = self.definitions[line]
+            depths[line] = 1 + max(
+                [depths.get(self.lines[row], 0) for row, _ in terms], default=0
+            )
+
+        levels = []
+        for depth in range(1, max(depths.values(), default=0) + 1):
+            lines = sorted(
+                [line for line in depths if depths[line] == depth], key=self.get_row
+            )
+            terms = [self.definitions[line][0] for line in lines]
+            levels.append(
+                (
+                    np.array([self.rows[line] for line in lines]),
+                    np.cumsum([0] + [len(line_terms) for line_terms in terms[:-1]]),
+                    np.array([row for line_terms in terms for row, _ in line_terms]),
+                    np.array([sign for line_terms in terms for _, sign in line_terms]),
+                    np.array(
+                        [
+                            self.definitions[line][1]
+                            for line, line_terms in zip(lines, terms)
+                            for _ in line_terms
+                        ]
+                    ),
+                )
+            )
+        return levels
+
+    def roll_up(
+        self,
+        df: pd.DataFrame,
+        reporting_period: constants.ReportingPeriod,
+        year_end_month: int = 12,
+    ) -> pd.DataFrame:
+        """The monthly statement df over longer reporting periods. Lines add up the months of a
+        period, except that opening lines take the first month and closing lines the last."""
+        if reporting_period == constants.ReportingPeriod.monthly:
+            return df
+
+        calendar = project_calendar.get_calendar_for_labels(df.columns)
+        if calendar is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"The {self.lines.name or 'statement'} is not laid out in consecutive months",
+            )
+
+        if reporting_period == constants.ReportingPeriod.quarterly:
+            buckets = calendar.quarterly
+        elif reporting_period == constants.ReportingPeriod.yearly:
+            buckets = calendar.yearly
+        else:
+            buckets = calendar.fiscal_years(year_end_month)
+
+        values = df.to_numpy(dtype=float)
+        rolled_up = buckets.sum(values)
+        opening = df.index.isin(self.opening_lines)
+        rolled_up[opening] = buckets.first(values[opening])
+        closing = df.index.isin(self.closing_lines)
+        rolled_up[closing] = buckets.last(values[closing])
+
+        return pd.DataFrame(
+            rolled_up, index=df.index.copy(), columns=buckets.labels.copy()
+        )
+
+    def builder(self, start_date, months_to_forecast: int) -> "StatementBuilder":
+        return StatementBuilder(
+            self, project_calendar.get_calendar(start_date, months_to_forecast)
+        )
+
+
+def parse_layout(
+    definition: str,
+    name: str | None = None,
+    opening_lines: list[str] | None = None,
+    closing_lines: list[str] | None = None,
+    balances: bool = False,
+) -> StatementLayout:
+    """Reads a layout written one statement line per text line, in the order they are reported.
+    A line that is worked out from others is followed by " = " and its expression, wrapped in
+    sum(...) when lines without a value count as zero:
+
+        Interest Income
+        Other Income
+        Total Revenue = Interest Income + Other Income
+        Total Staff Costs = sum(Salaries .. CILL)
+
+    A text line starting with "+ " or "- " carries on the expression of the line above it.
+    """
+    texts = []
+    for text in definition.splitlines():
+        if texts and text.strip().startswith(("+ ", "- ")):
+            texts[-1] = f"{texts[-1]} {text.strip()}"
+        else:
+            texts.append(text)
+
+    lines = []
+    totals = {}
+    formulas = {}
+    for text in texts:
+        line, equals, expression = text.partition(" = ")
+        line = line.strip()
+        expression = expression.strip()
+        if not line:
+            continue
+
+        lines.append(line)
+        if not equals:
+            continue
+        if line in totals or line in formulas:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{line} is defined more than once",
+            )
+        if expression.startswith("sum(") and expression.endswith(")"):
+            totals[line] = expression[len("sum(") : -1]
+        else:
+            formulas[line] = expression
+
+    return StatementLayout(
+        lines=lines,
+        name=name,
+        totals=totals,
+        formulas=formulas,
+        opening_lines=opening_lines,
+        closing_lines=closing_lines,
+        balances=balances,
+    )
+
+
+class StatementBuilder:
+    """A statement being filled in, held as one float64 (lines x periods) array.
+
+    Lines nobody has filled in (headings among them) have no value. Subtotals are worked out
+    from the layout whenever they are read through `calculate_subtotals`, and a DataFrame is
+    only made by `to_frame` when the statement is written out.
+    """
+
+    def __init__(
+        self, layout: StatementLayout, calendar: project_calendar.ProjectCalendar
+    ):
+        self.layout = layout
+        self.calendar = calendar
+        self.values = np.full((len(layout), len(calendar)), np.nan)
+
+    def align(self, values) -> np.ndarray:
+        """Values of one line on the period axis. A Series is matched on its "%b-%Y" labels and
+        periods it does not have get no value, anything else must already be on the axis."""
+        if isinstance(values, pd.Series):
+            return self.calendar.align(values, fill_value=np.nan)
+        return np.broadcast_to(np.asarray(values, dtype=float), (len(self.calendar),))
+
+    def __getitem__(self, line: str) -> np.ndarray:
+        return self.values[self.layout.get_row(line)].copy()
+
+    def __setitem__(self, line: str, values):
+        self.values[self.layout.get_row(line)] = self.align(values)
+
+    def update(self, df: pd.DataFrame):
+        """Fills in every line of the statement that is a row of df, leaving out rows it does not have"""
+        rows = self.layout.lines.get_indexer(df.index)
+        found = rows >= 0
+        self.values[rows[found]] = np.nan
+
+        columns = self.calendar.positions(df.columns)
+        on_axis = columns >= 0
+        self.values[np.ix_(rows[found], columns[on_axis])] = df.to_numpy(dtype=float)[
+            np.ix_(found, on_axis)
+        ]
+        return self
+
+    def calculate_subtotals(self):
+        for rows, offsets, terms, signs, missing_as_zero in self.layout.levels:
+            values = self.values[terms]
+            values[missing_as_zero[:, None] & np.isnan(values)] = 0
+            self.values[rows] = np.add.reduceat(
+                values * signs[:, None], offsets, axis=0
+            )
+        return self
+
+    def roll_forward(
+        self,
+        opening_balance: float,
+        opening_line: str = "Opening Balance",
+        closing_line: str = "Closing Balance",
+        movement_lines: list[str] | None = None,
+    ):
+        """Fills the closing line and the opening line of every period after the first, see
+        helper.roll_forward_balances. The movements are the lines between the opening and the
+        closing line unless `movement_lines` names them."""
+        self.calculate_subtotals()
+        opening_row = self.layout.get_row(opening_line)
+        closing_row = self.layout.get_row(closing_line)
+
+        if movement_lines is None:
+            movements = self.values[opening_row + 1 : closing_row]
+        else:
+            movements = self.values[
+                [self.layout.get_row(line) for line in movement_lines]
+            ]
+
+        if not len(self.calendar):
+            return self
+
+        self.values[opening_row, 0] = opening_balance
+        closing_balances = helper.roll_forward(
+            opening_balance=opening_balance, movements=movements
+        )
+        self.values[closing_row] = closing_balances
+        self.values[opening_row, 1:] = closing_balances[:-1]
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        self.calculate_subtotals()
+        return pd.DataFrame(
+            self.values.copy(),
+            index=self.layout.lines.copy(),
+            columns=self.calendar.labels.copy(),
+        )
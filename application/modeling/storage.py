@@ -0,0 +1,1555 @@
+import hashlib
+import io
+import json
+import operator
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from enum import Enum
+from functools import cached_property
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import awswrangler as wr
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from application.modeling import constants
+
+# Row filters in the form pyarrow takes them: (column, operator, value) conditions that rows must
+# all pass, or a list of such lists that rows must pass one of
+Filters = List[Tuple[str, str, Any]] | List[List[Tuple[str, str, Any]]]
+
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, value: values.isin(value),
+    "not in": lambda values, value: ~values.isin(value),
+}
+
+
+def get_conjunctions(filters: Filters) -> List[List[Tuple[str, str, Any]]]:
+    return [filters] if isinstance(filters[0], tuple) else filters
+
+
+def get_filter_columns(filters: Filters | None) -> List[str]:
+    if not filters:
+        return []
+    return list(
+        dict.fromkeys(
+            column
+            for conjunction in get_conjunctions(filters)
+            for column, _, _ in conjunction
+        )
+    )
+
+
+def get_read_columns(
+    columns: List[str] | None, filters: Filters | None
+) -> List[str] | None:
+    """The columns to read to give back `columns` after filtering on `filters`"""
+    if columns is None:
+        return None
+    return list(dict.fromkeys([*columns, *get_filter_columns(filters)]))
+
+
+def get_index_columns(schema: pa.Schema) -> List[str]:
+    """The columns pandas stored its index in, a RangeIndex being stored in the metadata only"""
+    metadata = schema.pandas_metadata or {}
+    return [
+        column
+        for column in metadata.get("index_columns", [])
+        if isinstance(column, str)
+    ]
+
+
+def project_table(
+    table: pa.Table,
+    columns: List[str] | None = None,
+    filters: Filters | None = None,
+    limit: int | None = None,
+) -> pa.Table:
+    """The first `limit` rows of table that pass `filters`, with only `columns` and the index"""
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(
+            list(dict.fromkeys([*columns, *get_index_columns(table.schema)]))
+        )
+    if limit is not None:
+        table = table.slice(0, limit)
+    return table
+
+
+def project_frame(
+    df: pd.DataFrame,
+    columns: List[str] | None = None,
+    filters: Filters | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """project_table for a frame already in memory. Like a filtered Parquet read, a frame
+    without an index of its own gets a new one counting the rows that are left."""
+    if filters:
+        counted = isinstance(df.index, pd.RangeIndex)
+        keep = np.zeros(len(df), dtype=bool)
+        for conjunction in get_conjunctions(filters):
+            passes = np.ones(len(df), dtype=bool)
+            for column, operator_name, value in conjunction:
+                passes &= np.asarray(
+                    FILTER_OPERATORS[operator_name](df[column], value), dtype=bool
+                )
+            keep |= passes
+
+        df = df[keep]
+        if counted:
+            df = df.reset_index(drop=True)
+    if columns is not None:
+        df = df[columns]
+    if limit is not None:
+        df = df.iloc[:limit]
+    return df
+
+
+def is_projected(
+    columns: List[str] | None, filters: Filters | None, limit: int | None
+) -> bool:
+    return columns is not None or bool(filters) or limit is not None
+
+
+def collect_chunks(
+    chunks: Iterator[pd.DataFrame],
+    columns: List[str] | None = None,
+    filters: Filters | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame | None:
+    """Filters consecutive chunks of a file and joins them, reading no more chunks once `limit`
+    rows have passed. None when the file has no chunks."""
+    frames = []
+    rows = 0
+    for chunk in chunks:
+        frames.append(project_frame(chunk, filters=filters))
+        rows += len(frames[-1])
+        if limit is not None and rows >= limit:
+            break
+
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=isinstance(frames[0].index, pd.RangeIndex))
+    return project_frame(df, columns=columns, limit=limit)
+
+
+# A bundle holds the files of one stage back to back, each in the format its store keeps single
+# files in, followed by a JSON table of contents, the length of the table of contents and BUNDLE_MAGIC
+BUNDLE_MAGIC = b"PRJBNDL1"
+BUNDLE_FOOTER = struct.Struct("<Q8s")
+BUNDLE_VERSION = 1
+# Enough of the end of a bundle to hold the table of contents of any stage in one request
+BUNDLE_TAIL_SIZE = 64 * 1024
+
+# The table of contents of every bundle read, by path, with the version of the bundle it was read from
+BUNDLE_CONTENTS: Dict[str, Tuple[Any, Dict[str, dict]]] = {}
+BUNDLE_CONTENTS_LOCK = threading.Lock()
+
+
+def decode_table(data: bytes, columns: List[str] | None = None) -> pa.Table:
+    """Reads a file stored in a bundle, which is either Parquet or an Arrow IPC file"""
+    if data[:4] == b"PAR1":
+        return pq.read_table(
+            pa.BufferReader(data), columns=columns, use_pandas_metadata=True
+        )
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+
+def write_bundle(file: BinaryIO, segments: Dict[str, bytes], entries: Dict[str, dict]):
+    """Writes the stored files in segments to file as a bundle. entries holds the etag and column
+    names of every file."""
+    tables = {}
+    for name, data in segments.items():
+        tables[name] = dict(entries[name], offset=file.tell(), length=len(data))
+        file.write(data)
+
+    contents = json.dumps({"version": BUNDLE_VERSION, "tables": tables}).encode()
+    file.write(contents)
+    file.write(BUNDLE_FOOTER.pack(len(contents), BUNDLE_MAGIC))
+
+
+def get_bundle_entry(table: pa.Table, data: bytes) -> dict:
+    # The MD5 of a file is what S3 tags a single part upload of it with
+    return {
+        "etag": f'"{hashlib.md5(data).hexdigest()}"',
+        "columns": table.schema.names,
+    }
+
+
+def read_bundle_contents(
+    project_store: "ProjectStore", file_stage: constants.FileStage, version: Any
+) -> Dict[str, dict]:
+    """The table of contents of the bundle of a stage, fetched with a single request for the end of
+    the bundle and kept until the version of the bundle changes"""
+    path = project_store.bundle_path(file_stage)
+    with BUNDLE_CONTENTS_LOCK:
+        cached = BUNDLE_CONTENTS.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    tail = project_store.read_bytes(path, start=-BUNDLE_TAIL_SIZE)
+    length, magic = BUNDLE_FOOTER.unpack(tail[-BUNDLE_FOOTER.size :])
+    if magic != BUNDLE_MAGIC:
+        raise ValueError(f"{path} is not a project bundle")
+    if length + BUNDLE_FOOTER.size > len(tail):
+        tail = project_store.read_bytes(path, start=-(length + BUNDLE_FOOTER.size))
+
+    contents = json.loads(tail[-(length + BUNDLE_FOOTER.size) : -BUNDLE_FOOTER.size])
+    if contents["version"] != BUNDLE_VERSION:
+        raise ValueError(f"{path} is a version {contents['version']} project bundle")
+
+    with BUNDLE_CONTENTS_LOCK:
+        BUNDLE_CONTENTS[path] = (version, contents["tables"])
+    return contents["tables"]
+
+
+def write_output(
+    project_store: "ProjectStore",
+    file_stage: constants.FileStage,
+    file_name: Enum,
+    table: pa.Table,
+    index: bool | None,
+) -> str:
+    """Writes a table held for a store that buffers writes, as a frame unless its index is None,
+    and returns its path"""
+    if index is None:
+        project_store.write_table(
+            table=table, file_stage=file_stage, file_name=file_name
+        )
+    else:
+        project_store.write(
+            df=table.to_pandas(),
+            file_stage=file_stage,
+            file_name=file_name,
+            index=index,
+        )
+    return project_store.path(file_stage=file_stage, file_name=file_name)
+
+
+class ProjectStore:
+    """Reads and writes the files of one project, keyed by stage and file name."""
+
+    cacheable = True
+
+    def __init__(self, tenant_name: str, project_id: int):
+        self.tenant_name = tenant_name
+        self.project_id = project_id
+
+    def is_cacheable(self, file_stage: constants.FileStage, file_name: Enum) -> bool:
+        """Whether reads of a file may be served from DATAFRAME_CACHE"""
+        return self.cacheable
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        raise NotImplementedError
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        """Returns a tag that changes whenever the stored file changes"""
+        raise NotImplementedError
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        """Reads a file, or only its `columns` and the first `limit` of its rows that pass
+        `filters`, fetching as little of the stored file as the store allows"""
+        raise NotImplementedError
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        """The names of the columns of a stored file, read from its metadata"""
+        raise NotImplementedError
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        raise NotImplementedError
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        """Reads a file as an Arrow table, for files that are not plain frames"""
+        raise NotImplementedError
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Reads a file, or only its `columns`, as consecutive frames of at most chunk_size rows
+        without loading all of it"""
+        raise NotImplementedError
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        raise NotImplementedError
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        """Writes consecutive tables of one schema as a single file, one row group or record batch
+        per table, without holding more than one of them in memory"""
+        raise NotImplementedError
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        raise NotImplementedError
+
+    def existing_path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        """The path a stored file is read from"""
+        return self.path(file_stage=file_stage, file_name=file_name)
+
+    def bundle_path(self, file_stage: constants.FileStage) -> str:
+        """The path of the bundle holding the files of a stage in one object"""
+        raise NotImplementedError
+
+    def list_modified(
+        self, file_stage: constants.FileStage
+    ) -> Tuple[Dict[str, Any], Any]:
+        """The modification times of the files of a stage by file name, and the modification time
+        and etag of the bundle of the stage, None when there is none, from a single listing"""
+        raise NotImplementedError
+
+    def read_bytes(self, path: str, start: int = 0, length: int | None = None) -> bytes:
+        """Reads length bytes of a stored object from start, or its last -start bytes when start
+        is negative"""
+        raise NotImplementedError
+
+    def write_file(self, path: str, file: BinaryIO):
+        """Stores the contents of an open file at path"""
+        raise NotImplementedError
+
+    def delete_files(self, file_stage: constants.FileStage, file_names: List[str]):
+        raise NotImplementedError
+
+    def delete_bundle(self, file_stage: constants.FileStage):
+        raise NotImplementedError
+
+    def encode_table(self, table: pa.Table) -> bytes:
+        """The bytes of a table in the format the store keeps single files in"""
+        raise NotImplementedError
+
+    def write_files(
+        self,
+        outputs: Dict[Tuple[constants.FileStage, Enum], Tuple[pa.Table, bool | None]],
+        max_workers: int = constants.MAX_READ_WORKERS,
+    ) -> List[str]:
+        """Writes tables, kept as frames when their index is not None, and returns their paths"""
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(outputs)))
+        ) as executor:
+            futures = [
+                executor.submit(write_output, self, file_stage, file_name, table, index)
+                for (file_stage, file_name), (table, index) in outputs.items()
+            ]
+            return [future.result() for future in futures]
+
+    def derive(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        name: str,
+        compute: Callable[[], Any],
+    ):
+        """Returns `compute()`, a value worked out from a stored file such as one of its columns parsed.
+        Stores that live for a pipeline run keep it, so the stages of the run share one copy."""
+        return compute()
+
+
+class S3ProjectStore(ProjectStore):
+    def __init__(self, tenant_name: str, project_id: int, boto3_session):
+        super().__init__(tenant_name=tenant_name, project_id=project_id)
+        self.boto3_session = boto3_session
+
+    def prefix(self, file_stage: constants.FileStage) -> str:
+        return f"s3://{self.tenant_name}/project_{self.project_id}/{file_stage.value}"
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return f"{self.prefix(file_stage)}/{file_name.value}.parquet"
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        path = self.path(file_stage, file_name)
+        return wr.s3.describe_objects(
+            path, use_threads=False, boto3_session=self.boto3_session
+        )[path]["ETag"]
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        path = self.path(file_stage, file_name)
+        if not filters and limit is None:
+            return wr.s3.read_parquet(
+                path, columns=columns, boto3_session=self.boto3_session
+            )
+
+        # Only the column chunks asked for are fetched, one batch of rows at a time, and no
+        # more batches once enough rows have passed the filters
+        df = collect_chunks(
+            wr.s3.read_parquet(
+                path,
+                columns=get_read_columns(columns, filters),
+                chunked=limit if not filters else constants.SCHEDULE_CHUNK_SIZE,
+                boto3_session=self.boto3_session,
+            ),
+            columns=columns,
+            filters=filters,
+            limit=limit,
+        )
+        if df is None:
+            return wr.s3.read_parquet(
+                path, columns=columns, boto3_session=self.boto3_session
+            )
+        return df
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        columns_types, _ = wr.s3.read_parquet_metadata(
+            self.path(file_stage, file_name), boto3_session=self.boto3_session
+        )
+        return list(columns_types)
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        wr.s3.to_parquet(
+            df=df,
+            path=self.path(file_stage, file_name),
+            boto3_session=self.boto3_session,
+            index=index,
+        )
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        buffer = io.BytesIO()
+        wr.s3.download(
+            path=self.path(file_stage, file_name),
+            local_file=buffer,
+            boto3_session=self.boto3_session,
+        )
+        buffer.seek(0)
+        return pq.read_table(buffer)
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        return wr.s3.read_parquet(
+            self.path(file_stage, file_name),
+            columns=columns,
+            chunked=chunk_size,
+            boto3_session=self.boto3_session,
+        )
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        buffer.seek(0)
+        wr.s3.upload(
+            local_file=buffer,
+            path=self.path(file_stage, file_name),
+            boto3_session=self.boto3_session,
+        )
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        # Row groups are spooled to local disk and the finished file is uploaded in parts
+        with tempfile.TemporaryFile() as buffer:
+            with pq.ParquetWriter(buffer, schema) as writer:
+                for table in tables:
+                    writer.write_table(table)
+            buffer.seek(0)
+            wr.s3.upload(
+                local_file=buffer,
+                path=self.path(file_stage, file_name),
+                boto3_session=self.boto3_session,
+            )
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        # The trailing slash keeps the bundle of the stage, stored next to its folder, out
+        files = wr.s3.list_objects(
+            f"{self.prefix(file_stage)}/", boto3_session=self.boto3_session
+        )
+        return [file.split("/")[-1].split(".")[0] for file in files]
+
+    @cached_property
+    def client(self):
+        return self.boto3_session.client("s3")
+
+    def get_bucket_and_key(self, path: str) -> Tuple[str, str]:
+        bucket, _, key = path[len("s3://") :].partition("/")
+        return bucket, key
+
+    def bundle_path(self, file_stage: constants.FileStage) -> str:
+        return f"{self.prefix(file_stage)}.bundle"
+
+    def list_modified(
+        self, file_stage: constants.FileStage
+    ) -> Tuple[Dict[str, Any], Any]:
+        bucket, prefix = self.get_bucket_and_key(self.prefix(file_stage))
+        _, bundle_key = self.get_bucket_and_key(self.bundle_path(file_stage))
+
+        files = {}
+        bundle = None
+        for page in self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=bucket, Prefix=prefix
+        ):
+            for item in page.get("Contents", []):
+                if item["Key"] == bundle_key:
+                    bundle = (item["LastModified"], item["ETag"])
+                elif item["Key"].startswith(f"{prefix}/"):
+                    files[item["Key"].split("/")[-1].split(".")[0]] = item[
+                        "LastModified"
+                    ]
+        return files, bundle
+
+    def read_bytes(self, path: str, start: int = 0, length: int | None = None) -> bytes:
+        bucket, key = self.get_bucket_and_key(path)
+        if start < 0:
+            byte_range = f"bytes={start}"
+        elif length is None:
+            byte_range = f"bytes={start}-"
+        else:
+            byte_range = f"bytes={start}-{start + length - 1}"
+        return self.client.get_object(Bucket=bucket, Key=key, Range=byte_range)[
+            "Body"
+        ].read()
+
+    def write_file(self, path: str, file: BinaryIO):
+        wr.s3.upload(local_file=file, path=path, boto3_session=self.boto3_session)
+
+    def delete_files(self, file_stage: constants.FileStage, file_names: List[str]):
+        if file_names:
+            wr.s3.delete_objects(
+                [f"{self.prefix(file_stage)}/{name}.parquet" for name in file_names],
+                boto3_session=self.boto3_session,
+            )
+
+    def delete_bundle(self, file_stage: constants.FileStage):
+        wr.s3.delete_objects(
+            [self.bundle_path(file_stage)], boto3_session=self.boto3_session
+        )
+
+    def encode_table(self, table: pa.Table) -> bytes:
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+
+
+class LocalProjectStore(ProjectStore):
+    """Keeps project files on local disk as uncompressed Arrow IPC files that are memory-mapped on read,
+    so large schedules are paged in by the OS instead of being copied into a read buffer.
+    Parquet files dropped into the same folders (for example a copy of an S3 prefix) are read as well."""
+
+    def __init__(self, tenant_name: str, project_id: int, root: str):
+        super().__init__(tenant_name=tenant_name, project_id=project_id)
+        self.root = root
+
+    def prefix(self, file_stage: constants.FileStage) -> str:
+        return os.path.join(
+            self.root, self.tenant_name, f"project_{self.project_id}", file_stage.value
+        )
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return os.path.join(self.prefix(file_stage), f"{file_name.value}.arrow")
+
+    def existing_path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        path = self.path(file_stage, file_name)
+        if os.path.exists(path):
+            return path
+        return os.path.splitext(path)[0] + ".parquet"
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        stat = os.stat(self.existing_path(file_stage, file_name))
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        path = self.existing_path(file_stage, file_name)
+
+        if path.endswith(".arrow"):
+            # A memory-mapped file only pages in the columns and rows that are kept
+            table = project_table(
+                self.read_table(file_stage=file_stage, file_name=file_name),
+                columns=columns,
+                filters=filters,
+                limit=limit,
+            )
+        elif filters or limit is None:
+            # Only the columns asked for are read, skipping row groups whose statistics rule
+            # out every row
+            table = project_table(
+                pq.read_table(
+                    path,
+                    columns=get_read_columns(columns, filters),
+                    filters=filters or None,
+                    memory_map=True,
+                    use_pandas_metadata=True,
+                ),
+                columns=columns,
+                limit=limit,
+            )
+        else:
+            # Only the first row groups, enough to hold `limit` rows, are read
+            parquet_file = pq.ParquetFile(path, memory_map=True)
+            row_groups = []
+            rows = 0
+            for row_group in range(parquet_file.num_row_groups):
+                if rows >= limit:
+                    break
+                row_groups.append(row_group)
+                rows += parquet_file.metadata.row_group(row_group).num_rows
+            table = parquet_file.read_row_groups(
+                row_groups, columns=columns, use_pandas_metadata=True
+            ).slice(0, limit)
+
+        return table.to_pandas(split_blocks=True)
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        path = self.existing_path(file_stage, file_name)
+
+        if path.endswith(".arrow"):
+            with pa.memory_map(path, "r") as source:
+                return pa.ipc.open_file(source).schema.names
+
+        return pq.read_schema(path, memory_map=True).names
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        self.write_table(
+            table=pa.Table.from_pandas(df, preserve_index=index),
+            file_stage=file_stage,
+            file_name=file_name,
+        )
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        path = self.existing_path(file_stage, file_name)
+
+        if path.endswith(".arrow"):
+            with pa.memory_map(path, "r") as source:
+                return pa.ipc.open_file(source).read_all()
+
+        return pq.read_table(path, memory_map=True)
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        path = self.existing_path(file_stage, file_name)
+
+        if path.endswith(".arrow"):
+            with pa.memory_map(path, "r") as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    for start in range(0, batch.num_rows, chunk_size):
+                        yield project_table(
+                            pa.Table.from_batches([batch.slice(start, chunk_size)]),
+                            columns=columns,
+                        ).to_pandas()
+            return
+
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(
+            batch_size=chunk_size, columns=columns
+        ):
+            yield pa.Table.from_batches([batch]).to_pandas()
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        path = self.path(file_stage, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write next to the target and rename so readers never map a half-written file
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(temporary_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, path)
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        path = self.path(file_stage, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Categories found in later tables are appended to the dictionaries as deltas
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with pa.OSFile(temporary_path, "wb") as sink:
+                with pa.ipc.new_file(sink, schema, options=options) as writer:
+                    for table in tables:
+                        writer.write_table(table)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        os.replace(temporary_path, path)
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        prefix = self.prefix(file_stage)
+        if not os.path.isdir(prefix):
+            return []
+
+        return sorted(
+            {
+                os.path.splitext(file)[0]
+                for file in os.listdir(prefix)
+                if file.endswith((".arrow", ".parquet"))
+            }
+        )
+
+    def bundle_path(self, file_stage: constants.FileStage) -> str:
+        return f"{self.prefix(file_stage)}.bundle"
+
+    def list_modified(
+        self, file_stage: constants.FileStage
+    ) -> Tuple[Dict[str, Any], Any]:
+        files = {}
+        if os.path.isdir(self.prefix(file_stage)):
+            for entry in os.scandir(self.prefix(file_stage)):
+                name, extension = os.path.splitext(entry.name)
+                if extension in (".arrow", ".parquet"):
+                    files[name] = max(files.get(name, 0), entry.stat().st_mtime_ns)
+
+        bundle = None
+        if os.path.exists(self.bundle_path(file_stage)):
+            stat = os.stat(self.bundle_path(file_stage))
+            bundle = (stat.st_mtime_ns, f"{stat.st_mtime_ns}-{stat.st_size}")
+        return files, bundle
+
+    def read_bytes(self, path: str, start: int = 0, length: int | None = None) -> bytes:
+        with open(path, "rb") as file:
+            if start < 0:
+                file.seek(max(0, os.fstat(file.fileno()).st_size + start))
+            else:
+                file.seek(start)
+            return file.read() if length is None else file.read(length)
+
+    def write_file(self, path: str, file: BinaryIO):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as sink:
+            shutil.copyfileobj(file, sink)
+        os.replace(temporary_path, path)
+
+    def delete_files(self, file_stage: constants.FileStage, file_names: List[str]):
+        for name in file_names:
+            for extension in (".arrow", ".parquet"):
+                path = os.path.join(self.prefix(file_stage), f"{name}{extension}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def delete_bundle(self, file_stage: constants.FileStage):
+        if os.path.exists(self.bundle_path(file_stage)):
+            os.remove(self.bundle_path(file_stage))
+
+    def encode_table(self, table: pa.Table) -> bytes:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class BundleProjectStore(ProjectStore):
+    """Keeps the files a pipeline run writes to a stage in one bundle object next to the stage folder,
+    so a run uploads one object per stage and readers fetch a single range of it per file.
+
+    Single files are still written, and read, in the layout of the backing store. A file stored on
+    its own takes the place of the file bundled under its name unless the bundle was written after
+    it, so projects written before bundling was turned on read as they did. The listing of a stage
+    is read once per store and dropped whenever the store writes to the stage.
+    """
+
+    def __init__(self, backing_store: ProjectStore):
+        super().__init__(
+            tenant_name=backing_store.tenant_name, project_id=backing_store.project_id
+        )
+        self.backing_store = backing_store
+        self.listings = {}
+        self.lock = threading.Lock()
+
+    def listing(
+        self, file_stage: constants.FileStage
+    ) -> Tuple[Dict[str, Any], Dict[str, dict]]:
+        """The modification times of the single files of a stage, and the bundle entries of the
+        files that are read from the bundle"""
+        with self.lock:
+            if file_stage in self.listings:
+                return self.listings[file_stage]
+
+        files, bundle = self.backing_store.list_modified(file_stage)
+        bundled = {}
+        if bundle is not None:
+            bundled = {
+                name: entry
+                for name, entry in read_bundle_contents(
+                    self.backing_store, file_stage=file_stage, version=bundle
+                ).items()
+                if name not in files or files[name] < bundle[0]
+            }
+
+        with self.lock:
+            self.listings[file_stage] = (files, bundled)
+        return files, bundled
+
+    def forget_listing(self, file_stage: constants.FileStage):
+        with self.lock:
+            self.listings.pop(file_stage, None)
+
+    def get_entry(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> dict | None:
+        _, bundled = self.listing(file_stage)
+        return bundled.get(file_name.value)
+
+    def read_segment(self, file_stage: constants.FileStage, entry: dict) -> bytes:
+        return self.backing_store.read_bytes(
+            self.backing_store.bundle_path(file_stage),
+            start=entry["offset"],
+            length=entry["length"],
+        )
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return self.backing_store.path(file_stage=file_stage, file_name=file_name)
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        entry = self.get_entry(file_stage, file_name)
+        if entry is None:
+            return self.backing_store.etag(file_stage=file_stage, file_name=file_name)
+        return entry["etag"]
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        entry = self.get_entry(file_stage, file_name)
+        if entry is None:
+            return self.backing_store.read(
+                file_stage=file_stage,
+                file_name=file_name,
+                columns=columns,
+                filters=filters,
+                limit=limit,
+            )
+
+        table = decode_table(
+            self.read_segment(file_stage, entry),
+            columns=get_read_columns(columns, filters),
+        )
+        return project_table(
+            table, columns=columns, filters=filters, limit=limit
+        ).to_pandas(split_blocks=True)
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        entry = self.get_entry(file_stage, file_name)
+        if entry is None:
+            return self.backing_store.read_column_names(
+                file_stage=file_stage, file_name=file_name
+            )
+        return entry["columns"]
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        entry = self.get_entry(file_stage, file_name)
+        if entry is None:
+            return self.backing_store.read_table(
+                file_stage=file_stage, file_name=file_name
+            )
+        return decode_table(self.read_segment(file_stage, entry))
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        entry = self.get_entry(file_stage, file_name)
+        if entry is None:
+            yield from self.backing_store.read_chunks(
+                file_stage=file_stage,
+                file_name=file_name,
+                chunk_size=chunk_size,
+                columns=columns,
+            )
+            return
+
+        table = project_table(
+            decode_table(self.read_segment(file_stage, entry), columns=columns),
+            columns=columns,
+        )
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield pa.Table.from_batches([batch], schema=table.schema).to_pandas()
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        self.backing_store.write(
+            df=df, file_stage=file_stage, file_name=file_name, index=index
+        )
+        self.forget_listing(file_stage)
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        self.backing_store.write_table(
+            table=table, file_stage=file_stage, file_name=file_name
+        )
+        self.forget_listing(file_stage)
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        self.backing_store.write_batches(
+            tables=tables, schema=schema, file_stage=file_stage, file_name=file_name
+        )
+        self.forget_listing(file_stage)
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        files, bundled = self.listing(file_stage)
+        return sorted(set(files) | set(bundled))
+
+    def write_files(
+        self,
+        outputs: Dict[Tuple[constants.FileStage, Enum], Tuple[pa.Table, bool | None]],
+        max_workers: int = constants.MAX_READ_WORKERS,
+    ) -> List[str]:
+        tables = {}
+        for (file_stage, file_name), (table, _) in outputs.items():
+            tables.setdefault(file_stage, {})[file_name.value] = table
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(outputs)))
+        ) as executor:
+            for file_stage, stage_tables in tables.items():
+                names = list(stage_tables)
+                segments = dict(
+                    zip(
+                        names,
+                        executor.map(
+                            self.backing_store.encode_table,
+                            [stage_tables[name] for name in names],
+                        ),
+                    )
+                )
+                self.write_bundle(
+                    file_stage=file_stage,
+                    segments=segments,
+                    entries={
+                        name: get_bundle_entry(stage_tables[name], segments[name])
+                        for name in names
+                    },
+                )
+
+        return [
+            self.path(file_stage=file_stage, file_name=file_name)
+            for file_stage, file_name in outputs
+        ]
+
+    def write_bundle(
+        self,
+        file_stage: constants.FileStage,
+        segments: Dict[str, bytes],
+        entries: Dict[str, dict],
+    ):
+        """Writes a new bundle of a stage holding segments and the files of the old bundle that are
+        still read from it, then deletes the single files the new bundle takes the place of.
+
+        There is no conditional write to guard the bundle with, so two runs bundling the same stage
+        at once keep the files of whichever finishes last.
+        """
+        files, bundled = self.listing(file_stage)
+        bundle_path = self.backing_store.bundle_path(file_stage)
+
+        kept = {name: entry for name, entry in bundled.items() if name not in segments}
+        segments = dict(segments)
+        entries = dict(entries)
+        if kept:
+            # The files kept are fetched with one request spanning them
+            start = min(entry["offset"] for entry in kept.values())
+            end = max(entry["offset"] + entry["length"] for entry in kept.values())
+            data = self.backing_store.read_bytes(
+                bundle_path, start=start, length=end - start
+            )
+            for name, entry in kept.items():
+                segments[name] = data[
+                    entry["offset"] - start : entry["offset"] - start + entry["length"]
+                ]
+                entries[name] = {"etag": entry["etag"], "columns": entry["columns"]}
+
+        with tempfile.TemporaryFile() as file:
+            write_bundle(file, segments=segments, entries=entries)
+            file.seek(0)
+            self.backing_store.write_file(bundle_path, file)
+
+        self.backing_store.delete_files(
+            file_stage, [name for name in segments if name in files]
+        )
+        self.forget_listing(file_stage)
+
+    def bundle(self, file_stage: constants.FileStage) -> List[str]:
+        """Moves the single files of a stage into its bundle, as they are stored, and returns their names"""
+        files, bundled = self.listing(file_stage)
+        names = [name for name in files if name not in bundled]
+        if not names:
+            return []
+
+        file_names = constants.STAGE_FILES[file_stage]
+        segments = {}
+        entries = {}
+        for name in names:
+            file_name = file_names(name)
+            segments[name] = self.backing_store.read_bytes(
+                self.backing_store.existing_path(
+                    file_stage=file_stage, file_name=file_name
+                )
+            )
+            entries[name] = {
+                "etag": self.backing_store.etag(
+                    file_stage=file_stage, file_name=file_name
+                ),
+                "columns": self.backing_store.read_column_names(
+                    file_stage=file_stage, file_name=file_name
+                ),
+            }
+
+        self.write_bundle(file_stage=file_stage, segments=segments, entries=entries)
+        return names
+
+    def unbundle(self, file_stage: constants.FileStage) -> List[str]:
+        """Writes the files read from the bundle of a stage as single files, deletes the bundle and
+        returns their names"""
+        _, bundled = self.listing(file_stage)
+        file_names = constants.STAGE_FILES[file_stage]
+        for name, entry in bundled.items():
+            self.backing_store.write_table(
+                table=decode_table(self.read_segment(file_stage, entry)),
+                file_stage=file_stage,
+                file_name=file_names(name),
+            )
+
+        if self.backing_store.list_modified(file_stage)[1] is not None:
+            self.backing_store.delete_bundle(file_stage)
+        self.forget_listing(file_stage)
+        return list(bundled)
+
+
+class RunProjectStore(ProjectStore):
+    """Holds the files written during a pipeline run in memory so later stages read them without a round trip.
+    Files the run did not write are read from the backing store once and shared by every stage.
+    Nothing reaches the backing store until flush() is called."""
+
+    cacheable = False
+
+    def __init__(self, backing_store: ProjectStore):
+        super().__init__(
+            tenant_name=backing_store.tenant_name, project_id=backing_store.project_id
+        )
+        self.backing_store = backing_store
+        self.outputs = {}
+        self.inputs = {}
+        self.input_tables = {}
+        self.derived = {}
+        self.derived_locks = {}
+        self.lock = threading.Lock()
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return self.backing_store.path(file_stage=file_stage, file_name=file_name)
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return self.backing_store.etag(file_stage=file_stage, file_name=file_name)
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        key = (file_stage, file_name)
+
+        with self.lock:
+            output = self.outputs.get(key)
+            df = self.inputs.get(key)
+
+        if output is not None:
+            return project_table(
+                output[0], columns=columns, filters=filters, limit=limit
+            ).to_pandas()
+
+        if df is None:
+            # Part of a file is read from the backing store each time rather than shared
+            if is_projected(columns, filters, limit):
+                return self.backing_store.read(
+                    file_stage=file_stage,
+                    file_name=file_name,
+                    columns=columns,
+                    filters=filters,
+                    limit=limit,
+                )
+            df = self.backing_store.read(file_stage=file_stage, file_name=file_name)
+            with self.lock:
+                self.inputs[key] = df
+
+        return project_frame(df, columns=columns, filters=filters, limit=limit).copy()
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        key = (file_stage, file_name)
+
+        with self.lock:
+            output = self.outputs.get(key)
+            df = self.inputs.get(key)
+
+        if output is not None:
+            return output[0].column_names
+        if df is not None:
+            return list(df.columns)
+        return self.backing_store.read_column_names(
+            file_stage=file_stage, file_name=file_name
+        )
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        key = (file_stage, file_name)
+
+        with self.lock:
+            output = self.outputs.get(key)
+            table = self.input_tables.get(key)
+
+        if output is not None:
+            return output[0]
+
+        if table is None:
+            table = self.backing_store.read_table(
+                file_stage=file_stage, file_name=file_name
+            )
+            with self.lock:
+                self.input_tables[key] = table
+
+        return table
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        key = (file_stage, file_name)
+
+        with self.lock:
+            output = self.outputs.get(key)
+            df = self.inputs.get(key)
+
+        if output is not None:
+            table = project_table(output[0], columns=columns)
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield pa.Table.from_batches([batch], schema=table.schema).to_pandas()
+        elif df is not None:
+            df = project_frame(df, columns=columns)
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start : start + chunk_size].copy()
+        else:
+            yield from self.backing_store.read_chunks(
+                file_stage=file_stage,
+                file_name=file_name,
+                chunk_size=chunk_size,
+                columns=columns,
+            )
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        # Kept as an Arrow table so readers get back exactly what a Parquet round trip would give them
+        table = pa.Table.from_pandas(df, preserve_index=index)
+        with self.lock:
+            self.outputs[(file_stage, file_name)] = (table, index)
+            self.inputs.pop((file_stage, file_name), None)
+            self.input_tables.pop((file_stage, file_name), None)
+            self.forget_derived(file_stage=file_stage, file_name=file_name)
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        # An index of None marks a table that is flushed as is rather than as a frame
+        with self.lock:
+            self.outputs[(file_stage, file_name)] = (table, None)
+            self.inputs.pop((file_stage, file_name), None)
+            self.input_tables.pop((file_stage, file_name), None)
+            self.forget_derived(file_stage=file_stage, file_name=file_name)
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        self.write_table(
+            table=pa.concat_tables([schema.empty_table(), *tables]),
+            file_stage=file_stage,
+            file_name=file_name,
+        )
+
+    def derive(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        name: str,
+        compute: Callable[[], Any],
+    ):
+        key = (file_stage, file_name, name)
+        with self.lock:
+            key_lock = self.derived_locks.setdefault(key, threading.Lock())
+
+        # Stages that ask for the same value at the same time wait for the first one to work it out
+        with key_lock:
+            with self.lock:
+                if key in self.derived:
+                    return self.derived[key]
+
+            value = compute()
+            with self.lock:
+                self.derived[key] = value
+            return value
+
+    def forget_derived(self, file_stage: constants.FileStage, file_name: Enum):
+        """Drops the values derived from a file. Callers hold self.lock."""
+        for key in [key for key in self.derived if key[:2] == (file_stage, file_name)]:
+            del self.derived[key]
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        with self.lock:
+            written = {
+                file_name.value
+                for stage, file_name in self.outputs
+                if stage == file_stage
+            }
+        return sorted(set(self.backing_store.list_files(file_stage)) | written)
+
+    def flush(self, max_workers: int = constants.MAX_READ_WORKERS) -> List[str]:
+        """Writes every file produced during the run to the backing store and returns their paths"""
+        with self.lock:
+            outputs = dict(self.outputs)
+
+        return self.backing_store.write_files(outputs=outputs, max_workers=max_workers)
+
+
+# Uploads queued by every WriteBehindProjectStore, so the uploads of concurrent requests share one limit
+UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=constants.MAX_UPLOAD_WORKERS)
+
+
+class WriteBehindProjectStore(ProjectStore):
+    """Uploads the files written to it on UPLOAD_EXECUTOR while the caller carries on calculating.
+    A file is kept in memory until its upload finishes, so reading it back gives what was last
+    written to it even before it reaches the backing store. flush() waits for every upload."""
+
+    def __init__(self, backing_store: ProjectStore):
+        super().__init__(
+            tenant_name=backing_store.tenant_name, project_id=backing_store.project_id
+        )
+        self.backing_store = backing_store
+        self.pending = {}
+        self.file_locks = {}
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def queue(
+        self,
+        table: pa.Table,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool | None,
+    ):
+        key = (file_stage, file_name)
+        version = (table, index)
+        with self.lock:
+            self.pending[key] = version
+            file_lock = self.file_locks.setdefault(key, threading.Lock())
+            future = UPLOAD_EXECUTOR.submit(self.upload, key, version, file_lock)
+            self.futures[future] = key
+
+    def upload(self, key: Tuple[constants.FileStage, Enum], version, file_lock) -> str:
+        # The uploads of a file go one at a time, and an upload of a file written again since it
+        # was queued is left to the upload of the later write
+        with file_lock:
+            with self.lock:
+                superseded = self.pending.get(key) is not version
+            if not superseded:
+                write_output(self.backing_store, key[0], key[1], *version)
+                with self.lock:
+                    if self.pending.get(key) is version:
+                        del self.pending[key]
+        return self.backing_store.path(file_stage=key[0], file_name=key[1])
+
+    def get_pending(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> pa.Table | None:
+        with self.lock:
+            version = self.pending.get((file_stage, file_name))
+        return None if version is None else version[0]
+
+    def is_cacheable(self, file_stage: constants.FileStage, file_name: Enum) -> bool:
+        return self.get_pending(
+            file_stage, file_name
+        ) is None and self.backing_store.is_cacheable(file_stage, file_name)
+
+    def path(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        return self.backing_store.path(file_stage=file_stage, file_name=file_name)
+
+    def etag(self, file_stage: constants.FileStage, file_name: Enum) -> str:
+        # A file only has an etag once it is uploaded, and failed uploads are left to flush()
+        if self.get_pending(file_stage, file_name) is not None:
+            with self.lock:
+                futures = list(self.futures)
+            wait(futures)
+        return self.backing_store.etag(file_stage=file_stage, file_name=file_name)
+
+    def read(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        columns: List[str] | None = None,
+        filters: Filters | None = None,
+        limit: int | None = None,
+    ) -> pd.DataFrame:
+        table = self.get_pending(file_stage, file_name)
+        if table is None:
+            return self.backing_store.read(
+                file_stage=file_stage,
+                file_name=file_name,
+                columns=columns,
+                filters=filters,
+                limit=limit,
+            )
+        return project_table(
+            table, columns=columns, filters=filters, limit=limit
+        ).to_pandas()
+
+    def read_column_names(
+        self, file_stage: constants.FileStage, file_name: Enum
+    ) -> List[str]:
+        table = self.get_pending(file_stage, file_name)
+        if table is None:
+            return self.backing_store.read_column_names(
+                file_stage=file_stage, file_name=file_name
+            )
+        return table.column_names
+
+    def read_table(self, file_stage: constants.FileStage, file_name: Enum) -> pa.Table:
+        table = self.get_pending(file_stage, file_name)
+        if table is None:
+            return self.backing_store.read_table(
+                file_stage=file_stage, file_name=file_name
+            )
+        return table
+
+    def read_chunks(
+        self,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        chunk_size: int,
+        columns: List[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        table = self.get_pending(file_stage, file_name)
+        if table is None:
+            yield from self.backing_store.read_chunks(
+                file_stage=file_stage,
+                file_name=file_name,
+                chunk_size=chunk_size,
+                columns=columns,
+            )
+            return
+
+        table = project_table(table, columns=columns)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield pa.Table.from_batches([batch], schema=table.schema).to_pandas()
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+        index: bool = True,
+    ):
+        # Converting to Arrow copies the frame, so the caller is free to change it afterwards
+        self.queue(
+            table=pa.Table.from_pandas(df, preserve_index=index),
+            file_stage=file_stage,
+            file_name=file_name,
+            index=index,
+        )
+
+    def write_table(
+        self, table: pa.Table, file_stage: constants.FileStage, file_name: Enum
+    ):
+        self.queue(table=table, file_stage=file_stage, file_name=file_name, index=None)
+
+    def write_batches(
+        self,
+        tables: Iterable[pa.Table],
+        schema: pa.Schema,
+        file_stage: constants.FileStage,
+        file_name: Enum,
+    ):
+        self.write_table(
+            table=pa.concat_tables([schema.empty_table(), *tables]),
+            file_stage=file_stage,
+            file_name=file_name,
+        )
+
+    def list_files(self, file_stage: constants.FileStage) -> List[str]:
+        with self.lock:
+            pending = {
+                file_name.value
+                for stage, file_name in self.pending
+                if stage == file_stage
+            }
+        return sorted(set(self.backing_store.list_files(file_stage)) | pending)
+
+    def flush(self) -> Tuple[List[str], Dict[str, str]]:
+        """Waits for every upload queued so far and returns the paths written, and the error of
+        every upload that failed keyed by the stage and name of its file"""
+        with self.lock:
+            futures, self.futures = self.futures, {}
+
+        wait(futures)
+        paths = []
+        errors = {}
+        for future, (file_stage, file_name) in futures.items():
+            try:
+                paths.append(future.result())
+            except Exception as e:
+                errors[f"{file_stage.value}/{file_name.value}"] = str(e)
+        return list(dict.fromkeys(paths)), errors
+
+
+RUN_PROJECT_STORE: ContextVar[RunProjectStore | None] = ContextVar(
+    "RUN_PROJECT_STORE", default=None
+)
+WRITE_BEHIND_STORE: ContextVar[WriteBehindProjectStore | None] = ContextVar(
+    "WRITE_BEHIND_STORE", default=None
+)
+
+
+def get_project_store(tenant_name: str, project_id: int, boto3_session) -> ProjectStore:
+    # Stores that hold the writes of a pipeline run or of a request take the files of their project
+    for context_store in (RUN_PROJECT_STORE.get(), WRITE_BEHIND_STORE.get()):
+        if (
+            context_store is not None
+            and context_store.tenant_name == tenant_name
+            and str(context_store.project_id) == str(project_id)
+        ):
+            return context_store
+
+    file_store = get_file_store(
+        tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+    )
+    if is_bundled(tenant_name):
+        return BundleProjectStore(backing_store=file_store)
+    return file_store
+
+
+def get_file_store(tenant_name: str, project_id: int, boto3_session) -> ProjectStore:
+    """The store keeping the files of a project in the configured backend, one object per file"""
+    if constants.STORAGE_BACKEND == constants.StorageBackend.local:
+        return LocalProjectStore(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            root=constants.LOCAL_STORAGE_ROOT,
+        )
+
+    return S3ProjectStore(
+        tenant_name=tenant_name, project_id=project_id, boto3_session=boto3_session
+    )
+
+
+def is_bundled(tenant_name: str) -> bool:
+    return "*" in constants.BUNDLED_TENANTS or tenant_name in constants.BUNDLED_TENANTS
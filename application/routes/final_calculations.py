@@ -1,9 +1,8 @@
-import io
+from typing import Iterator
 
-import awswrangler as wr
 import pandas as pd
-from fastapi import APIRouter, Depends
-from fastapi.responses import Response, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from application.auth.security import get_current_active_user
@@ -12,12 +11,15 @@ from application.modeling import (
     constants,
     direct_cashflow,
     expenses,
+    exports,
     helper,
     income_statement,
     interest_income,
     loan_book,
+    products,
     ratios,
     statement_of_cashflows,
+    storage,
 )
 from application.routes.projects import crud as project_crud
 from application.utils import models, schemas
@@ -27,6 +29,15 @@ router = APIRouter(
     tags=["FINAL CALCULATIONS"], dependencies=[Depends(get_current_active_user)]
 )
 
+# Monthly final statements and the layouts that roll them up into quarters and years
+STATEMENT_LAYOUTS = {
+    constants.FinalFiles.income_statement_df: income_statement.INCOME_STATEMENT,
+    constants.FinalFiles.direct_cashflow_df: direct_cashflow.DIRECT_CASHFLOW,
+    constants.FinalFiles.loan_book_df: loan_book.LOAN_BOOK,
+    constants.FinalFiles.balance_sheet_df: balance_sheet.BALANCE_SHEET,
+    constants.FinalFiles.statement_of_cashflow_df: statement_of_cashflows.STATEMENT_OF_CASHFLOWS,
+}
+
 
 def read_files_for_generating_income(
     tenant_name: str,
@@ -35,102 +46,90 @@ def read_files_for_generating_income(
     months_to_forecast: int,
     boto3_session,
 ):
-    expenses_certain = helper.read_expenses_file(
+    (
+        expenses_certain,
+        expenses_uncertain,
+        other_parameters,
+        disbursement_parameters,
+        opening_balances,
+        depreciations_df,
+        finance_costs_df,
+        provision_for_credit_loss_for_all_new_disbursements_df,
+        new_disbursements_df,
+        other_income_df,
+        interest_income_new_disbursement_df,
+        existing_loans_schedules_totals_df,
+        salaries_and_pension_and_statutory_contributions_df,
+    ) = helper.read_files(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=boto3_session,
-        file_name=constants.RawFiles.expenses_certain,
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
+        file_keys=[
+            (constants.FileStage.raw, constants.RawFiles.expenses_certain),
+            (constants.FileStage.raw, constants.RawFiles.expenses_uncertain),
+            (constants.FileStage.raw, constants.RawFiles.other_parameters),
+            (constants.FileStage.raw, constants.RawFiles.disbursement_parameters),
+            (constants.FileStage.raw, constants.RawFiles.opening_balances),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.depreciations_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.finance_costs_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.new_disbursements_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.other_income_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.salaries_and_pension_and_statutory_contributions_df,
+            ),
+        ],
     )
 
-    expenses_uncertain = helper.read_expenses_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.expenses_uncertain,
+    expenses_certain = helper.format_expenses_file(
+        df=expenses_certain,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
 
-    other_parameters = helper.read_other_parameters_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
+    expenses_uncertain = helper.format_expenses_file(
+        df=expenses_uncertain,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
 
-    disbursement_parameters = helper.read_disbursement_parameters_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
+    other_parameters = helper.format_parameters_file(
+        df=other_parameters,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
 
-    opening_balances = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.opening_balances,
-    )
-
-    depreciations_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.depreciations_df,
-    )
-
-    finance_costs_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.finance_costs_df,
-    )
-
-    provision_for_credit_loss_for_all_new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
-    )
-
-    new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.new_disbursements_df,
-    )
-
-    other_income_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.other_income_df,
-    )
-
-    interest_income_new_disbursement_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.interest_income_new_disbursement_df,
-    )
-
-    existing_loans_schedules_interest_incomes_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
+    disbursement_parameters = helper.format_parameters_file(
+        df=disbursement_parameters,
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
     )
 
-    salaries_and_pension_and_statutory_contributions_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.salaries_and_pension_and_statutory_contributions_df,
-    )
+    opening_balances = helper.format_raw_file(df=opening_balances)
 
     return (
         other_parameters,
@@ -144,38 +143,11 @@ def read_files_for_generating_income(
         new_disbursements_df,
         other_income_df,
         interest_income_new_disbursement_df,
-        existing_loans_schedules_interest_incomes_df,
+        existing_loans_schedules_totals_df,
         salaries_and_pension_and_statutory_contributions_df,
     )
 
 
-def aggregate_expenses_in_income_statement(income_statement_df: pd.DataFrame):
-    income_statement_df = income_statement.aggregate_staff_costs(income_statement_df)
-    income_statement_df = income_statement.aggregate_travel_and_entertainment(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_marketing_and_public_relations(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_office_costs(income_statement_df)
-    income_statement_df = income_statement.aggregate_professional_fees(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_communication_costs(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_motor_vehicle_costs(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_other_costs(income_statement_df)
-    income_statement_df = income_statement.aggregate_investment_income(
-        income_statement_df
-    )
-    income_statement_df = income_statement.aggregate_finance_costs(income_statement_df)
-
-    return income_statement_df
-
-
 def calculate_variable_expenses_and_change_in_provision_for_credit_loss_and_business_aquisition_and_total_interest_income(
     expenses_uncertain: pd.DataFrame,
     other_parameters: pd.DataFrame,
@@ -184,7 +156,7 @@ def calculate_variable_expenses_and_change_in_provision_for_credit_loss_and_busi
     provision_for_credit_loss_for_all_new_disbursements_df: pd.DataFrame,
     opening_balances: pd.DataFrame,
     interest_income_new_disbursement_df: pd.DataFrame,
-    existing_loans_schedules_interest_incomes_df: pd.DataFrame,
+    existing_loans_schedules_totals_df: pd.DataFrame,
     start_date: str,
     months_to_forecast: int,
 ):
@@ -202,8 +174,12 @@ def calculate_variable_expenses_and_change_in_provision_for_credit_loss_and_busi
         agent_contribution_percent=disbursement_parameters.loc[
             "AGENT_CONTRIBUTION_PERCENT"
         ],
-        consumer_ssb_disbursements=new_disbursements_df["consumer_ssb_disbursements"],
-        consumer_pvt_disbursements=new_disbursements_df["consumer_pvt_disbursements"],
+        consumer_ssb_disbursements=products.get_product_column(
+            new_disbursements_df, "consumer_ssb", "disbursements"
+        ),
+        consumer_pvt_disbursements=products.get_product_column(
+            new_disbursements_df, "consumer_pvt", "disbursements"
+        ),
     )
 
     change_in_provision_for_credit_loss = expenses.calculate_change_in_provision_for_credit_loss(
@@ -217,11 +193,15 @@ def calculate_variable_expenses_and_change_in_provision_for_credit_loss_and_busi
         months_to_forecast=months_to_forecast,
     )
 
-    total_interest_income = interest_income.aggregate_new_and_existing_loans_interest_income(
-        interest_income_new_disbursements_df=interest_income_new_disbursement_df,
-        interest_income_existing_loans=existing_loans_schedules_interest_incomes_df.sum(),
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
+    total_interest_income = (
+        interest_income.aggregate_new_and_existing_loans_interest_income(
+            interest_income_new_disbursements_df=interest_income_new_disbursement_df,
+            interest_income_existing_loans=existing_loans_schedules_totals_df.loc[
+                "interest_payments"
+            ],
+            start_date=start_date,
+            months_to_forecast=months_to_forecast,
+        )
     )
 
     return (
@@ -233,6 +213,7 @@ def calculate_variable_expenses_and_change_in_provision_for_credit_loss_and_busi
 
 
 @router.get("/projects/{project_id}/calculations/income-statement")
+@helper.write_behind
 def generate_income_statement(
     project_id: str,
     db: Session = Depends(get_db),
@@ -255,7 +236,7 @@ def generate_income_statement(
         new_disbursements_df,
         other_income_df,
         interest_income_new_disbursement_df,
-        existing_loans_schedules_interest_incomes_df,
+        existing_loans_schedules_totals_df,
         salaries_and_pension_and_statutory_contributions_df,
     ) = read_files_for_generating_income(
         tenant_name=tenant_name,
@@ -265,7 +246,7 @@ def generate_income_statement(
         boto3_session=constants.MY_SESSION,
     )
 
-    income_statement_df = income_statement.generate_income_statement_template(
+    income_statement_builder = income_statement.generate_income_statement_template(
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
@@ -282,61 +263,52 @@ def generate_income_statement(
         new_disbursements_df=new_disbursements_df,
         provision_for_credit_loss_for_all_new_disbursements_df=provision_for_credit_loss_for_all_new_disbursements_df,
         interest_income_new_disbursement_df=interest_income_new_disbursement_df,
-        existing_loans_schedules_interest_incomes_df=existing_loans_schedules_interest_incomes_df,
+        existing_loans_schedules_totals_df=existing_loans_schedules_totals_df,
         opening_balances=opening_balances,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
 
-    income_statement_df = income_statement.insert_revenue(
-        income_statement=income_statement_df,
+    income_statement.insert_revenue(
+        income_statement=income_statement_builder,
         interest_income=total_interest_income,
         other_income=other_income_df["total"],
     )
 
-    income_statement_df = income_statement.insert_expenses(
-        income_statement=income_statement_df,
+    income_statement.insert_expenses(
+        income_statement=income_statement_builder,
         expenses_certain=expenses_certain,
         uncertain_expenses=uncertain_expenses,
     )
 
-    income_statement_df = income_statement.insert_salaries_and_pensions_and_statutory_contributions(
-        income_statement=income_statement_df,
+    income_statement.insert_salaries_and_pensions_and_statutory_contributions(
+        income_statement=income_statement_builder,
         salaries_and_pension_and_statutory_contributions_df=salaries_and_pension_and_statutory_contributions_df,
     )
 
-    income_statement_df = income_statement.insert_depreciation(
-        income_statement=income_statement_df,
+    income_statement.insert_depreciation(
+        income_statement=income_statement_builder,
         depreciation=depreciations_df["total"],
     )
 
-    income_statement_df = income_statement.insert_credit_loss_provision(
-        income_statement=income_statement_df,
+    income_statement.insert_credit_loss_provision(
+        income_statement=income_statement_builder,
         change_in_provision_for_credit_loss=change_in_provision_for_credit_loss,
     )
 
-    income_statement_df = income_statement.insert_business_acquisition(
-        income_statement=income_statement_df, business_acquisition=business_acquisition
-    )
-
-    income_statement_df = aggregate_expenses_in_income_statement(
-        income_statement_df=income_statement_df
+    income_statement.insert_business_acquisition(
+        income_statement=income_statement_builder,
+        business_acquisition=business_acquisition,
     )
 
-    income_statement_df = income_statement.calculate_total_expenses(income_statement_df)
-    income_statement_df = income_statement.calculate_ebidta(income_statement_df)
+    income_statement_builder["Finance Costs"] = finance_costs_df.loc["total"]
 
-    income_statement_df.loc["Finance Costs"] = finance_costs_df.loc["total"]
-
-    income_statement_df = income_statement.aggregate_finance_costs(income_statement_df)
-
-    income_statement_df = income_statement.calculate_profit_before_tax(
-        income_statement_df
+    income_statement.calculate_tax(
+        income_statement=income_statement_builder,
+        tax_rate=other_parameters.loc["TAX_RATE"],
     )
 
-    income_statement_df = income_statement.calculate_tax(
-        income_statement=income_statement_df, tax_rate=other_parameters.loc["TAX_RATE"]
-    )
+    income_statement_df = income_statement_builder.to_frame()
 
     helper.upload_file(
         tenant_name=tenant_name,
@@ -357,117 +329,95 @@ def read_files_for_generating_direct_cashflow(
     start_date: str,
     months_to_forecast: int,
 ):
-    other_parameters = helper.read_other_parameters_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
-    )
-
-    interest_income_new_disbursement_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.interest_income_new_disbursement_df,
-    )
-
-    details_of_assets = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.details_of_assets,
-    )
-
-    details_of_long_term_borrowing = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.details_of_long_term_borrowing,
-        set_index=False,
-    )
-
-    details_of_short_term_borrowing = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.details_of_short_term_borrowing,
-        set_index=False,
-    )
-
-    opening_balances = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.RawFiles.opening_balances,
-    )
-
-    existing_loans_schedules_interest_incomes_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
-    )
-
-    other_income_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.other_income_df,
-    )
-
-    new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.new_disbursements_df,
-    )
-
-    capital_repayment_new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.capital_repayment_new_disbursements_df,
-    )
-
-    existing_loans_schedules_capital_repayments_df = helper.read_intermediate_file(
+    (
+        other_parameters,
+        details_of_assets,
+        details_of_long_term_borrowing,
+        details_of_short_term_borrowing,
+        opening_balances,
+        interest_income_new_disbursement_df,
+        other_income_df,
+        new_disbursements_df,
+        capital_repayment_new_disbursements_df,
+        existing_loans_schedules_totals_df,
+        finance_costs_df,
+        income_statement_df,
+        capital_repayment_borrowings_df,
+    ) = helper.read_files(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_capital_repayments_df,
+        file_keys=[
+            (constants.FileStage.raw, constants.RawFiles.other_parameters),
+            (constants.FileStage.raw, constants.RawFiles.details_of_assets),
+            (
+                constants.FileStage.raw,
+                constants.RawFiles.details_of_long_term_borrowing,
+            ),
+            (
+                constants.FileStage.raw,
+                constants.RawFiles.details_of_short_term_borrowing,
+            ),
+            (constants.FileStage.raw, constants.RawFiles.opening_balances),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.other_income_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.new_disbursements_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.finance_costs_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.income_statement_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.capital_repayment_borrowings_df,
+            ),
+        ],
     )
 
-    finance_costs_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.finance_costs_df,
+    other_parameters = helper.format_parameters_file(
+        df=other_parameters,
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
     )
 
-    income_statement_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.income_statement_df,
+    details_of_assets = helper.format_raw_file(df=details_of_assets)
+    details_of_long_term_borrowing = helper.format_raw_file(
+        df=details_of_long_term_borrowing
     )
-
-    capital_repayment_borrowings_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=boto3_session,
-        file_name=constants.IntermediateFiles.capital_repayment_borrowings_df,
+    details_of_short_term_borrowing = helper.format_raw_file(
+        df=details_of_short_term_borrowing
     )
+    opening_balances = helper.format_raw_file(df=opening_balances)
 
     return (
         capital_repayment_borrowings_df,
         income_statement_df,
         finance_costs_df,
-        existing_loans_schedules_capital_repayments_df,
+        existing_loans_schedules_totals_df,
         capital_repayment_new_disbursements_df,
         other_parameters,
         new_disbursements_df,
         other_income_df,
-        existing_loans_schedules_interest_incomes_df,
         opening_balances,
         interest_income_new_disbursement_df,
         details_of_assets,
@@ -477,6 +427,7 @@ def read_files_for_generating_direct_cashflow(
 
 
 @router.get("/projects/{project_id}/calculations/direct-cashflow")
+@helper.write_behind
 def generate_direct_cashflow(
     project_id: str,
     db: Session = Depends(get_db),
@@ -488,7 +439,7 @@ def generate_direct_cashflow(
     imtt = project.imtt
     tenant_name = current_user.tenant.company_name
 
-    direct_cashflow_df = direct_cashflow.generate_direct_cashflow_template(
+    direct_cashflow_builder = direct_cashflow.generate_direct_cashflow_template(
         start_date=start_date, months_to_forecast=months_to_forecast
     )
 
@@ -496,12 +447,11 @@ def generate_direct_cashflow(
         capital_repayment_borrowings_df,
         income_statement_df,
         finance_costs_df,
-        existing_loans_schedules_capital_repayments_df,
+        existing_loans_schedules_totals_df,
         capital_repayment_new_disbursements_df,
         other_parameters,
         new_disbursements_df,
         other_income_df,
-        existing_loans_schedules_interest_incomes_df,
         opening_balances,
         interest_income_new_disbursement_df,
         details_of_assets,
@@ -518,7 +468,7 @@ def generate_direct_cashflow(
     print("reading files done")
 
     ## From Parameters
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Receipts From Receivables"
     ] = helper.change_period_index_to_strftime(
         helper.add_series(
@@ -530,11 +480,11 @@ def generate_direct_cashflow(
         )
     )
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Purchase Of Inventory"
     ] = helper.change_period_index_to_strftime(other_parameters.loc["NEW_INVENTORY"])
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Payments To Payables"
     ] = -helper.change_period_index_to_strftime(
         helper.add_series(
@@ -545,33 +495,35 @@ def generate_direct_cashflow(
         )
     )
 
-    direct_cashflow_df.loc["Dividend Paid"] = -helper.change_period_index_to_strftime(
+    direct_cashflow_builder["Dividend Paid"] = -helper.change_period_index_to_strftime(
         other_parameters.loc["DIVIDEND_PAID"]
     )
 
     ## From Calculations/Income Statement
 
-    direct_cashflow_df.loc["Interest Income"] = income_statement_df.loc[
+    direct_cashflow_builder["Interest Income"] = income_statement_df.loc[
         "Interest Income"
     ]
-    direct_cashflow_df.loc["Other Income"] = income_statement_df.loc["Other Income"]
-    direct_cashflow_df.loc["Interest Expense"] = -income_statement_df.loc[
+    direct_cashflow_builder["Other Income"] = income_statement_df.loc["Other Income"]
+    direct_cashflow_builder["Interest Expense"] = -income_statement_df.loc[
         "Finance Costs"
     ]
-    direct_cashflow_df.loc["Disbursements"] = -helper.change_period_index_to_strftime(
+    direct_cashflow_builder["Disbursements"] = -helper.change_period_index_to_strftime(
         new_disbursements_df["total"]
     )
 
     ## Equity and Intercompany Loans
 
-    direct_cashflow_df = direct_cashflow.add_equity_and_intercompany_loans(
-        other_parameters=other_parameters, direct_cashflow_df=direct_cashflow_df
+    direct_cashflow.add_equity_and_intercompany_loans(
+        other_parameters=other_parameters,
+        direct_cashflow_builder=direct_cashflow_builder,
     )
 
     ## Other Assets
 
-    direct_cashflow_df = direct_cashflow.add_other_assets(
-        other_parameters=other_parameters, direct_cashflow_df=direct_cashflow_df
+    direct_cashflow.add_other_assets(
+        other_parameters=other_parameters,
+        direct_cashflow_builder=direct_cashflow_builder,
     )
 
     # Tax Paid
@@ -585,13 +537,13 @@ def generate_direct_cashflow(
         months_to_forecast=months_to_forecast,
     )
 
-    direct_cashflow_df.loc["Tax Paid"] = tax_schedule_df.loc["Tax Paid"]
+    direct_cashflow_builder["Tax Paid"] = tax_schedule_df.loc["Tax Paid"]
 
     operating_expenses = direct_cashflow.calculate_operating_expenses(
         income_statement=income_statement_df
     )
 
-    direct_cashflow_df.loc["Operating Expenses"] = -operating_expenses
+    direct_cashflow_builder["Operating Expenses"] = -operating_expenses
 
     details_of_assets = helper.columns_to_snake_case(details_of_assets)
 
@@ -601,7 +553,7 @@ def generate_direct_cashflow(
         months_to_forecast=months_to_forecast,
     )
 
-    direct_cashflow_df.loc["Capital Expenses"] = -capital_expenses
+    direct_cashflow_builder["Capital Expenses"] = -capital_expenses
 
     details_of_long_term_borrowing = helper.columns_to_snake_case(
         details_of_long_term_borrowing
@@ -619,62 +571,48 @@ def generate_direct_cashflow(
         )
     )
 
-    direct_cashflow_df.loc["Short Term Borrowing"] = long_and_short_term_borrowing_df[
+    direct_cashflow_builder["Short Term Borrowing"] = long_and_short_term_borrowing_df[
         "short_term_borrowing"
     ]
-    direct_cashflow_df.loc["Long Term Borrowing"] = long_and_short_term_borrowing_df[
+    direct_cashflow_builder["Long Term Borrowing"] = long_and_short_term_borrowing_df[
         "long_term_borrowing"
     ]
 
     capital_repayment = helper.add_series(
         [
-            existing_loans_schedules_capital_repayments_df.sum(),
+            existing_loans_schedules_totals_df.loc["capital_repayments"],
             capital_repayment_new_disbursements_df["total"],
         ]
     )
 
-    direct_cashflow_df.loc["Capital Repayment"] = capital_repayment
+    direct_cashflow_builder["Capital Repayment"] = capital_repayment
 
-    direct_cashflow_df.loc[
+    direct_cashflow_builder[
         "Capital Repayment On Borrowings"
     ] = -capital_repayment_borrowings_df.loc["total"]
 
-    direct_cashflow_df.loc["Total Cash Inflows"] = direct_cashflow_df.iloc[
-        direct_cashflow_df.index.get_loc("CASH INFLOWS")
-        + 1 : direct_cashflow_df.index.get_loc("Total Cash Inflows")
-    ].sum()
-
-    direct_cashflow_df.loc["Total Cash Outflows"] = direct_cashflow_df.iloc[
-        direct_cashflow_df.index.get_loc("CASH OUTFLOWS")
-        + 1 : direct_cashflow_df.index.get_loc("Total Cash Outflows")
-    ].sum()
-
-    direct_cashflow_df.loc["Net Increase/Decrease In Cash"] = (
-        direct_cashflow_df.loc["Total Cash Inflows"]
-        + direct_cashflow_df.loc["Total Cash Outflows"]
+    direct_cashflow_builder.roll_forward(
+        opening_balance=opening_balances["CASH_ON_HAND"].iat[0],
+        movement_lines=["Net Increase/Decrease In Cash"],
     )
+    direct_cashflow_df = direct_cashflow_builder.to_frame()
 
-    direct_cashflow_df = (
-        direct_cashflow.calculate_opening_and_closing_balances_for_direct_cashflows(
-            direct_cashflow=direct_cashflow_df,
-            cash_on_hand_opening_balance=opening_balances["CASH_ON_HAND"].iat[0],
-        )
-    )
-
-    direct_cashflow_yearly_df = direct_cashflow.calculate_direct_cashflow_yearly(
-        direct_cashflow_df=direct_cashflow_df, opening_balances=opening_balances
+    direct_cashflow_yearly_df = direct_cashflow.DIRECT_CASHFLOW.roll_up(
+        direct_cashflow_df, reporting_period=constants.ReportingPeriod.yearly
     )
 
-    income_statement_df.loc["2% Taxation"] = (
-        direct_cashflow_df.loc["Total Cash Outflows"] * imtt
+    income_statement_builder = income_statement.generate_income_statement_template(
+        start_date=start_date, months_to_forecast=months_to_forecast
+    ).update(income_statement_df)
+    income_statement_builder["2% Taxation"] = (
+        direct_cashflow_builder["Total Cash Outflows"] * imtt
     )
+    income_statement_df = income_statement_builder.to_frame()
 
-    income_statement_df = income_statement.calculate_profit_or_loss_for_period(
-        income_statement_df
+    income_statement_yearly_df = income_statement.INCOME_STATEMENT.roll_up(
+        income_statement_df, reporting_period=constants.ReportingPeriod.yearly
     )
 
-    income_statement_yearly_df = helper.group_next_year_on_wards(df=income_statement_df)
-
     helper.upload_file(
         tenant_name=tenant_name,
         project_id=project_id,
@@ -735,6 +673,7 @@ def generate_direct_cashflow(
 
 
 @router.get("/projects/{project_id}/calculations/loan-book")
+@helper.write_behind
 def generate_loan_book(
     project_id: str,
     db: Session = Depends(get_db),
@@ -745,60 +684,44 @@ def generate_loan_book(
     months_to_forecast = project.months_to_forecast
     tenant_name = current_user.tenant.company_name
 
-    capital_repayment_new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.capital_repayment_new_disbursements_df,
-    )
-
-    opening_balances = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.RawFiles.opening_balances,
-    )
-
-    existing_loans_schedules_capital_repayments_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_capital_repayments_df,
-    )
-
-    new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.new_disbursements_df,
-    )
-
-    existing_loans_schedules_outstanding_balances_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_outstanding_balances_df,
-    )
-
-    interest_income_new_disbursement_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.interest_income_new_disbursement_df,
+    (
+        capital_repayment_new_disbursements_df,
+        opening_balances,
+        existing_loans_schedules_totals_df,
+        new_disbursements_df,
+        interest_income_new_disbursement_df,
+    ) = helper.read_files(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+        file_keys=[
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+            ),
+            (constants.FileStage.raw, constants.RawFiles.opening_balances),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.new_disbursements_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+        ],
     )
 
-    existing_loans_schedules_interest_incomes_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
-    )
+    opening_balances = helper.format_raw_file(df=opening_balances)
 
-    capital_repayment_existing_loans = (
-        existing_loans_schedules_capital_repayments_df.sum()
-    )
+    capital_repayment_existing_loans = existing_loans_schedules_totals_df.loc[
+        "capital_repayments"
+    ]
 
-    loan_book_df = loan_book.generate_loan_book_template(
+    loan_book_builder = loan_book.generate_loan_book_template(
         start_date=start_date, months_to_forecast=months_to_forecast
     )
 
@@ -809,20 +732,21 @@ def generate_loan_book(
         months_to_forecast=months_to_forecast,
     )
 
-    total_interest_income = interest_income.aggregate_new_and_existing_loans_interest_income(
-        interest_income_new_disbursements_df=interest_income_new_disbursement_df,
-        interest_income_existing_loans=existing_loans_schedules_interest_incomes_df.sum(),
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
+    total_interest_income = (
+        interest_income.aggregate_new_and_existing_loans_interest_income(
+            interest_income_new_disbursements_df=interest_income_new_disbursement_df,
+            interest_income_existing_loans=existing_loans_schedules_totals_df.loc[
+                "interest_payments"
+            ],
+            start_date=start_date,
+            months_to_forecast=months_to_forecast,
+        )
     )
 
     opening_balances = helper.columns_to_screaming_snake_case(opening_balances)
 
-    loan_book_df = loan_book.insert_loan_book_items(
-        loan_book=loan_book_df,
-        opening_balance_on_loan_book=existing_loans_schedules_outstanding_balances_df.sum()[
-            pd.Timestamp(start_date).strftime("%b-%Y")
-        ],
+    loan_book.insert_loan_book_items(
+        loan_book=loan_book_builder,
         total_interest_income=total_interest_income,
         total_capital_repayments=total_capital_repayments,
         disbursements=helper.change_period_index_to_strftime(
@@ -830,9 +754,16 @@ def generate_loan_book(
         ),
     )
 
-    loan_book_df = helper.calculate_opening_and_closing_balances(loan_book_df)
+    loan_book_builder.roll_forward(
+        opening_balance=existing_loans_schedules_totals_df.loc[
+            "outstanding_balance_at_start"
+        ][pd.Timestamp(start_date).strftime("%b-%Y")]
+    )
+    loan_book_df = loan_book_builder.to_frame()
 
-    loan_book_yearly_df = loan_book.calculate_loan_book_yearly(loan_book=loan_book_df)
+    loan_book_yearly_df = loan_book.LOAN_BOOK.roll_up(
+        loan_book_df, reporting_period=constants.ReportingPeriod.yearly
+    )
 
     helper.upload_file(
         tenant_name=tenant_name,
@@ -855,6 +786,7 @@ def generate_loan_book(
 
 
 @router.get("/projects/{project_id}/calculations/balance-sheet")
+@helper.write_behind
 def generate_balance_sheet(
     project_id: str,
     db: Session = Depends(get_db),
@@ -865,115 +797,98 @@ def generate_balance_sheet(
     months_to_forecast = project.months_to_forecast
     tenant_name = current_user.tenant.company_name
 
-    other_parameters = helper.read_other_parameters_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
-    )
-
-    net_book_values_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.net_book_values_df,
-    )
-
-    long_and_short_term_borrowing_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.long_and_short_term_borrowing_df,
-    )
-
-    tax_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.tax_schedule_df,
-    )
-
-    long_term_borrowings_capital_repayments_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
-    )
-
-    short_term_borrowings_capital_repayments_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.short_term_borrowings_capital_repayments_df,
-    )
-
-    loan_book_df = helper.read_final_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.FinalFiles.loan_book_df,
-    )
-
-    direct_cashflow_df = helper.read_final_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.FinalFiles.direct_cashflow_df,
-    )
-
-    income_statement_df = helper.read_final_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.FinalFiles.income_statement_df,
+    (
+        other_parameters,
+        opening_balances,
+        net_book_values_df,
+        long_and_short_term_borrowing_df,
+        tax_schedule_df,
+        long_term_borrowings_capital_repayments_df,
+        short_term_borrowings_capital_repayments_df,
+        short_term_borrowings_schedules_outstanding_balances_df,
+        long_term_borrowings_schedules_outstanding_balances_df,
+        provision_for_credit_loss_for_all_new_disbursements_df,
+        loan_book_df,
+        direct_cashflow_df,
+        income_statement_df,
+    ) = helper.read_files(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+        file_keys=[
+            (constants.FileStage.raw, constants.RawFiles.other_parameters),
+            (constants.FileStage.raw, constants.RawFiles.opening_balances),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.net_book_values_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.long_and_short_term_borrowing_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.tax_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.short_term_borrowings_capital_repayments_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.short_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.long_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+            ),
+            (
+                constants.FileStage.final,
+                constants.FinalFiles.loan_book_df,
+            ),
+            (
+                constants.FileStage.final,
+                constants.FinalFiles.direct_cashflow_df,
+            ),
+            (
+                constants.FileStage.final,
+                constants.FinalFiles.income_statement_df,
+            ),
+        ],
     )
 
-    balance_sheet_df = balance_sheet.generate_balance_sheet_template(
+    other_parameters = helper.format_parameters_file(
+        df=other_parameters,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
     )
 
-    opening_balances = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.RawFiles.opening_balances,
-        set_index=False,
-    )
-
-    short_term_borrowings_schedules_outstanding_balances_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.short_term_borrowings_schedules_outstanding_balances_df,
-    )
-
-    long_term_borrowings_schedules_outstanding_balances_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.long_term_borrowings_schedules_outstanding_balances_df,
-    )
+    opening_balances = helper.format_raw_file(df=opening_balances, set_index=False)
 
-    provision_for_credit_loss_for_all_new_disbursements_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+    balance_sheet_builder = balance_sheet.generate_balance_sheet_template(
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
     )
 
-    balance_sheet_df.loc["Property Plant And Equipment"] = net_book_values_df["total"]
+    balance_sheet_builder["Property Plant And Equipment"] = net_book_values_df["total"]
 
-    balance_sheet_df.loc["Loan Book"] = loan_book_df.loc["Closing Balance"]
+    balance_sheet_builder["Loan Book"] = loan_book_df.loc["Closing Balance"]
 
-    balance_sheet_df.loc["Cash On Hand"] = direct_cashflow_df.loc["Closing Balance"]
+    balance_sheet_builder["Cash On Hand"] = direct_cashflow_df.loc["Closing Balance"]
 
-    balance_sheet_df.loc[
+    balance_sheet_builder[
         "Provisions"
     ] = provision_for_credit_loss_for_all_new_disbursements_df["total"]
 
-    balance_sheet_df.loc[
+    balance_sheet_builder[
         "Provision For Taxation"
     ] = helper.change_period_index_to_strftime(
         other_parameters.loc["PROVISION_FOR_TAX"]
@@ -1005,8 +920,8 @@ def generate_balance_sheet(
         months_to_forecast=months_to_forecast,
     )
 
-    balance_sheet_df.loc["Loans"] = long_term_loans_schedules_df.loc["Closing Balance"]
-    balance_sheet_df.loc["Borrowings"] = short_term_loans_schedules_df.loc[
+    balance_sheet_builder["Loans"] = long_term_loans_schedules_df.loc["Closing Balance"]
+    balance_sheet_builder["Borrowings"] = short_term_loans_schedules_df.loc[
         "Closing Balance"
     ]
 
@@ -1057,26 +972,26 @@ def generate_balance_sheet(
         start_date=start_date,
     )
 
-    balance_sheet_df.loc["Trade Payables"] = trade_payables_schedule_df.loc[
+    balance_sheet_builder["Trade Payables"] = trade_payables_schedule_df.loc[
         "Closing Balance"
     ]
-    balance_sheet_df.loc["Other Payables"] = other_payables_schedule_df.loc[
+    balance_sheet_builder["Other Payables"] = other_payables_schedule_df.loc[
         "Closing Balance"
     ]
 
-    balance_sheet_df.loc["Trade Receivables"] = trade_receivables_schedule_df.loc[
+    balance_sheet_builder["Trade Receivables"] = trade_receivables_schedule_df.loc[
         "Closing Balance"
     ]
 
-    balance_sheet_df.loc["Other Receivables"] = other_receivables_schedule_df.loc[
+    balance_sheet_builder["Other Receivables"] = other_receivables_schedule_df.loc[
         "Closing Balance"
     ]
 
-    balance_sheet_df.loc[
+    balance_sheet_builder[
         "Intergroup Receivables"
     ] = intergroup_receivables_schedule_df.loc["Closing Balance"]
 
-    balance_sheet_df.loc["Deferred Taxation"] = tax_schedule_df.loc["Closing Balance"]
+    balance_sheet_builder["Deferred Taxation"] = tax_schedule_df.loc["Closing Balance"]
 
     inventories_schedule = balance_sheet.generate_inventories_schedule(
         opening_inventories=opening_balances["INVENTORIES"].iat[0],
@@ -1086,108 +1001,25 @@ def generate_balance_sheet(
         months_to_forecast=months_to_forecast,
     )
 
-    balance_sheet_df.loc["Inventories"] = inventories_schedule.loc["Closing Balance"]
-
-    # Equity and Intercompany loans
-    balance_sheet_df.loc[
-        "Issued Share Capital"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["SHARE_CAPITAL"].cumsum()
-        + opening_balances["ISSUED_SHARE_CAPITAL"].iat[0]
-    )
-
-    balance_sheet_df.loc["Intercompany Loans"] = helper.change_period_index_to_strftime(
-        other_parameters.loc["INTERCOMPANY_LOANS"].cumsum()
-        + opening_balances["INTERCOMPANY_LOANS"].iat[0]
-    )
-
-    balance_sheet_df.loc["Share Premium"] = helper.change_period_index_to_strftime(
-        other_parameters.loc["SHARE_PREMIUM"].cumsum()
-        + opening_balances["SHARE_PREMIUM"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Other Components Of Equity"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["OTHER_COMPONENTS_OF_EQUITY"].cumsum()
-        + opening_balances["OTHER_COMPONENTS_OF_EQUITY"].iat[0]
-    )
+    balance_sheet_builder["Inventories"] = inventories_schedule.loc["Closing Balance"]
 
-    balance_sheet_df.loc["Treasury Shares"] = helper.change_period_index_to_strftime(
-        other_parameters.loc["TREASURY_SHARES"].cumsum()
-        + opening_balances["TREASURY_SHARES"].iat[0]
+    # Equity, intercompany loans and other assets
+    balance_sheet.insert_balances_from_parameters(
+        balance_sheet=balance_sheet_builder,
+        other_parameters=other_parameters,
+        opening_balances=opening_balances,
     )
 
-    balance_sheet_df.loc["Retained Earnings"] = (
+    balance_sheet_builder["Retained Earnings"] = (
         income_statement_df.loc["PROFIT/(LOSS) FOR PERIOD"]
         - helper.change_period_index_to_strftime(other_parameters.loc["DIVIDEND_PAID"])
     ).cumsum()
 
-    balance_sheet_df.loc["Capital And Reserves"] = balance_sheet_df.loc[
-        "Issued Share Capital":"Retained Earnings"
-    ].sum()
-
-    # Other Assets
-    balance_sheet_df.loc["Intangible Assets"] = helper.change_period_index_to_strftime(
-        other_parameters.loc["INTANGIBLE_ASSETS"].cumsum()
-        + opening_balances["INTANGIBLE_ASSETS"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Investment In Subsidiaries"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["INVESTMENT_IN_SUBSIDIARIES"].cumsum()
-        + opening_balances["INVESTMENT_IN_SUBSIDIARIES"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Investment In Associates"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["INVESTMENT_IN_ASSOCIATES"].cumsum()
-        + opening_balances["INVESTMENT_IN_ASSOCIATES"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Investment Properties"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["INVESTMENT_PROPERTIES"].cumsum()
-        + opening_balances["INVESTMENT_PROPERTIES"].iat[0]
-    )
-
-    balance_sheet_df.loc["Equity Investments"] = helper.change_period_index_to_strftime(
-        other_parameters.loc["EQUITY_INVESTMENTS"].cumsum()
-        + opening_balances["EQUITY_INVESTMENTS"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Long Term Money Market Investments"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["LONG_TERM_MONEY_MARKET_INVESTMENTS"].cumsum()
-        + opening_balances["LONG_TERM_MONEY_MARKET_INVESTMENTS"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Short Term Money Market Investments"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["SHORT_TERM_MONEY_MARKET_INVESTMENTS"].cumsum()
-        + opening_balances["SHORT_TERM_MONEY_MARKET_INVESTMENTS"].iat[0]
-    )
-
-    balance_sheet_df.loc[
-        "Loans To Related Entities"
-    ] = helper.change_period_index_to_strftime(
-        other_parameters.loc["LOANS_TO_RELATED_ENTITIES"].cumsum()
-        + opening_balances["LOANS_TO_RELATED_ENTITIES"].iat[0]
-    )
-
-    # Calculating Totals
-    balance_sheet_df = balance_sheet.sum_financial_statements_totals(balance_sheet_df)
-    balance_sheet_df = balance_sheet.calculate_final_balances(
-        balance_sheet_df=balance_sheet_df
-    )
+    balance_sheet.calculate_final_balances(balance_sheet=balance_sheet_builder)
+    balance_sheet_df = balance_sheet_builder.to_frame()
 
-    balance_sheet_yearly_df = balance_sheet.calculate_balance_sheet_yearly(
-        balance_sheet_df=balance_sheet_df
+    balance_sheet_yearly_df = balance_sheet.BALANCE_SHEET.roll_up(
+        balance_sheet_df, reporting_period=constants.ReportingPeriod.yearly
     )
 
     ratios_df = ratios.calculate_ratios(
@@ -1292,6 +1124,7 @@ def generate_balance_sheet(
 
 
 @router.get("/projects/{project_id}/calculations/statement-of-cashflows")
+@helper.write_behind
 def generate_statement_of_cashflows(
     project_id: int,
     db: Session = Depends(get_db),
@@ -1302,145 +1135,124 @@ def generate_statement_of_cashflows(
     months_to_forecast = project.months_to_forecast
     tenant_name = current_user.tenant.company_name
 
-    other_parameters = helper.read_other_parameters_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        start_date=start_date,
-        months_to_forecast=months_to_forecast,
-    )
-
-    opening_balances = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.RawFiles.opening_balances,
-    )
-
-    details_of_assets = helper.read_raw_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.RawFiles.details_of_assets,
-    )
-
-    tax_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.tax_schedule_df,
-    )
-    other_receivables_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.other_receivables_schedule_df,
-    )
-
-    trade_payables_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.trade_payables_schedule_df,
-    )
-
-    trade_receivables_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.trade_receivables_schedule_df,
-    )
-
-    intergroup_receivables_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.intergroup_receivables_schedule_df,
-    )
-
-    other_payables_schedule_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.other_payables_schedule_df,
-    )
-
-    finance_costs_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.finance_costs_df,
-    )
-
-    capital_repayment_borrowings_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.capital_repayment_borrowings_df,
-    )
-
-    short_term_loans_schedules_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.short_term_loans_schedules_df,
-    )
-
-    long_term_borrowings_capital_repayments_df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+    (
+        other_parameters,
+        opening_balances,
+        details_of_assets,
+        tax_schedule_df,
+        other_receivables_schedule_df,
+        trade_payables_schedule_df,
+        trade_receivables_schedule_df,
+        intergroup_receivables_schedule_df,
+        other_payables_schedule_df,
+        finance_costs_df,
+        capital_repayment_borrowings_df,
+        short_term_loans_schedules_df,
+        long_term_borrowings_capital_repayments_df,
+        income_statement_df,
+        loan_book_df,
+    ) = helper.read_files(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+        file_keys=[
+            (constants.FileStage.raw, constants.RawFiles.other_parameters),
+            (constants.FileStage.raw, constants.RawFiles.opening_balances),
+            (constants.FileStage.raw, constants.RawFiles.details_of_assets),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.tax_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.other_receivables_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.trade_payables_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.trade_receivables_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.intergroup_receivables_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.other_payables_schedule_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.finance_costs_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.capital_repayment_borrowings_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.short_term_loans_schedules_df,
+            ),
+            (
+                constants.FileStage.intermediate,
+                constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+            ),
+            (
+                constants.FileStage.final,
+                constants.FinalFiles.income_statement_df,
+            ),
+            (
+                constants.FileStage.final,
+                constants.FinalFiles.loan_book_df,
+            ),
+        ],
     )
 
-    income_statement_df = helper.read_final_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.FinalFiles.income_statement_df,
+    other_parameters = helper.format_parameters_file(
+        df=other_parameters,
+        start_date=start_date,
+        months_to_forecast=months_to_forecast,
     )
 
-    loan_book_df = helper.read_final_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=constants.FinalFiles.loan_book_df,
-    )
+    opening_balances = helper.format_raw_file(df=opening_balances)
+    details_of_assets = helper.format_raw_file(df=details_of_assets)
 
-    statement_of_cashflow_df = (
+    statement_of_cashflow_builder = (
         statement_of_cashflows.generate_statement_of_cashflow_template(
             start_date, months_to_forecast
         )
     )
 
-    statement_of_cashflow_df.loc["Profit/(loss) Per I/S"] = income_statement_df.loc[
+    statement_of_cashflow_builder["Profit/(loss) Per I/S"] = income_statement_df.loc[
         "PROFIT/(LOSS) FOR PERIOD"
     ]
-    statement_of_cashflow_df.loc["Depreciation"] = income_statement_df.loc[
+    statement_of_cashflow_builder["Depreciation"] = income_statement_df.loc[
         "Depreciation"
     ]
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "Dividend Paid"
     ] = helper.change_period_index_to_strftime(other_parameters.loc["DIVIDEND_PAID"])
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "Treasury Movements"
     ] = helper.change_period_index_to_strftime(
         other_parameters.loc["TREASURY_MOVEMENTS"]
     )
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "Interest Expense Accrued"
     ] = helper.change_period_index_to_strftime(
         other_parameters.loc["INTEREST_EXPENSE_ACCRUED"]
     )
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "Other Non-Cash Items"
     ] = helper.change_period_index_to_strftime(
         other_parameters.loc["OTHER_NON_CASH_ITEMS"]
     )
-    statement_of_cashflow_df.loc["Interest Paid"] = -finance_costs_df.loc["total"]
-    statement_of_cashflow_df.loc["Tax Paid"] = tax_schedule_df.loc["Tax Paid"]
+    statement_of_cashflow_builder["Interest Paid"] = -finance_costs_df.loc["total"]
+    statement_of_cashflow_builder["Tax Paid"] = tax_schedule_df.loc["Tax Paid"]
 
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "Repayment Of Borrowings"
     ] = -long_term_borrowings_capital_repayments_df.sum()
 
@@ -1452,18 +1264,12 @@ def generate_statement_of_cashflows(
         months_to_forecast=months_to_forecast,
     )
 
-    statement_of_cashflow_df.loc["Purchase Of Fixed Assets"] = capital_expenses
-    statement_of_cashflow_df.loc["Increase/(Decrease) In Borrowings"] = (
+    statement_of_cashflow_builder["Purchase Of Fixed Assets"] = capital_expenses
+    statement_of_cashflow_builder["Increase/(Decrease) In Borrowings"] = (
         short_term_loans_schedules_df.loc["Closing Balance"]
         - short_term_loans_schedules_df.loc["Opening Balance"]
     )
 
-    statement_of_cashflow_df.loc[
-        "Cash From Operations Before WC"
-    ] = statement_of_cashflow_df.iloc[
-        0 : statement_of_cashflow_df.index.get_loc("Cash From Operations Before WC")
-    ].sum()
-
     change_in_receivables = (
         other_receivables_schedule_df.loc["Closing Balance"]
         - other_receivables_schedule_df.loc["Opening Balance"]
@@ -1486,54 +1292,33 @@ def generate_statement_of_cashflows(
 
     change_in_loan_book_interest = loan_book_df.loc["Interest Income"]
 
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "(Increase)/Decrease In Receivables"
     ] = -change_in_receivables
-    statement_of_cashflow_df.loc["Increase/(Decrease) In Payables"] = change_in_payables
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
+        "Increase/(Decrease) In Payables"
+    ] = change_in_payables
+    statement_of_cashflow_builder[
         "(Increase)/Decrease In Loan Book (Principle)"
     ] = -change_in_loan_book_principle
-    statement_of_cashflow_df.loc[
+    statement_of_cashflow_builder[
         "(Increase)/Decrease In Loan Book (Interest)"
     ] = -change_in_loan_book_interest
 
-    statement_of_cashflow_df.loc["Cash From Operations After WC"] = (
-        statement_of_cashflow_df.loc["Cash From Operations Before WC"]
-        + statement_of_cashflow_df.iloc[
-            statement_of_cashflow_df.index.get_loc("Working Capital Movements")
-            + 1 : statement_of_cashflow_df.index.get_loc(
-                "Cash From Operations After WC"
-            )
-        ].sum()
-    )
-
-    statement_of_cashflow_df.loc[
-        "Net Cash Flow From Operations"
-    ] = statement_of_cashflow_df.loc["Cash From Operations After WC":"Tax Paid"].sum()
-
-    statement_of_cashflow_df = balance_sheet.sum_financial_statements_totals(
-        statement_of_cashflow_df
-    )
-
-    statement_of_cashflow_df.loc["Net Increase/(Decrease) In Cash"] = (
-        statement_of_cashflow_df.loc["Net Cash Flow From Operations"]
-        + statement_of_cashflow_df.loc["Cash Flow From Investing Activities"]
-        + statement_of_cashflow_df.loc["Cash Flow From Financing Activities"]
-    )
-
     opening_balances = helper.columns_to_screaming_snake_case(opening_balances)
 
-    statement_of_cashflow_df = (
-        statement_of_cashflows.calculate_cash_at_end_and_beginning_of_period(
-            statement_of_cashflow_df=statement_of_cashflow_df,
-            opening_balances=opening_balances,
-        )
+    statement_of_cashflow_builder.roll_forward(
+        opening_balance=float(opening_balances["CASH_ON_HAND"].iat[0]),
+        opening_line="Cash At Beginning Of Period",
+        closing_line="Cash At End Of Period",
+        movement_lines=["Net Increase/(Decrease) In Cash"],
     )
+    statement_of_cashflow_df = statement_of_cashflow_builder.to_frame()
 
     statement_of_cashflow_yearly_df = (
-        statement_of_cashflows.calculate_statement_of_cashflow_yearly_df(
-            statement_of_cashflow_df=statement_of_cashflow_df,
-            opening_balances=opening_balances,
+        statement_of_cashflows.STATEMENT_OF_CASHFLOWS.roll_up(
+            statement_of_cashflow_df,
+            reporting_period=constants.ReportingPeriod.yearly,
         )
     )
 
@@ -1559,13 +1344,28 @@ def generate_statement_of_cashflows(
     return {"message": "done"}
 
 
-@router.get("/projects/{project_id}/results")
-def download_final_file(
-    project_id: str,
+def read_final_statement(
+    tenant_name: str,
+    project_id: int,
     file_name: constants.FinalFiles,
-    current_user: models.Users = Depends(get_current_active_user),
+    reporting_period: constants.ReportingPeriod,
+    year_end_month: int,
 ):
-    tenant_name = current_user.tenant.company_name
+    """Reads a final file, rolling a monthly statement up into the reporting period asked for"""
+    if not 1 <= year_end_month <= 12:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"The year end month must be from 1 to 12, not {year_end_month}",
+        )
+    if (
+        reporting_period != constants.ReportingPeriod.monthly
+        and file_name not in STATEMENT_LAYOUTS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"{file_name.value} cannot be reported {reporting_period.value}, "
+            f"choose one of {', '.join(file.value for file in STATEMENT_LAYOUTS)}",
+        )
 
     df = helper.read_final_file(
         tenant_name=tenant_name,
@@ -1573,97 +1373,136 @@ def download_final_file(
         boto3_session=constants.MY_SESSION,
         file_name=file_name,
     )
+    if reporting_period == constants.ReportingPeriod.monthly:
+        return df
 
-    stream = io.StringIO()
-    df.to_csv(stream, index=True)
-
-    response = Response(
-        content=stream.getvalue(),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename={file_name.value}",
-        },
+    return STATEMENT_LAYOUTS[file_name].roll_up(
+        df, reporting_period=reporting_period, year_end_month=year_end_month
     )
-    return response
 
 
-@router.get("/projects/{project_id}/results/download")
-def download_only_final_file(
+def get_download_name(
+    file_name: constants.FinalFiles, reporting_period: constants.ReportingPeriod
+) -> str:
+    if reporting_period == constants.ReportingPeriod.monthly:
+        return file_name.value
+    return f"{file_name.value}_{reporting_period.value}"
+
+
+@router.get("/projects/{project_id}/results")
+def download_final_file(
     project_id: str,
     file_name: constants.FinalFiles,
+    reporting_period: constants.ReportingPeriod = constants.ReportingPeriod.monthly,
+    year_end_month: int = 12,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
     current_user: models.Users = Depends(get_current_active_user),
 ):
     tenant_name = current_user.tenant.company_name
 
-    df = helper.read_final_file(
+    df = read_final_statement(
         tenant_name=tenant_name,
         project_id=project_id,
-        boto3_session=constants.MY_SESSION,
         file_name=file_name,
+        reporting_period=reporting_period,
+        year_end_month=year_end_month,
     )
 
-    return Response(
-        content=df.to_csv(index=True),
-        headers={
-            "Content-Disposition": f'attachment; filename="{file_name.value}.csv"',
-            "Content-Type": "application/octet-stream",
-        },
+    return exports.export_response(
+        chunks=exports.iter_frame(df),
+        download_name=get_download_name(
+            file_name=file_name, reporting_period=reporting_period
+        ),
+        file_format=file_format,
     )
 
 
-@router.get("/projects/{project_id}/results/intermediate")
-def download_intermediate_file(
-    project_id: int,
-    file_name: constants.IntermediateFiles,
+@router.get("/projects/{project_id}/results/download")
+def download_only_final_file(
+    project_id: str,
+    file_name: constants.FinalFiles,
+    reporting_period: constants.ReportingPeriod = constants.ReportingPeriod.monthly,
+    year_end_month: int = 12,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
     current_user: models.Users = Depends(get_current_active_user),
 ):
     tenant_name = current_user.tenant.company_name
 
-    df = helper.read_intermediate_file(
+    df = read_final_statement(
         tenant_name=tenant_name,
         project_id=project_id,
-        boto3_session=constants.MY_SESSION,
         file_name=file_name,
+        reporting_period=reporting_period,
+        year_end_month=year_end_month,
     )
 
-    if file_name in [
-        constants.IntermediateFiles.existing_loans_schedules_capital_repayments_df,
-        constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
-        constants.IntermediateFiles.existing_loans_schedules_outstanding_balances_df,
-    ]:
-        df = df.head(100)
+    return exports.export_response(
+        chunks=exports.iter_frame(df),
+        download_name=get_download_name(
+            file_name=file_name, reporting_period=reporting_period
+        ),
+        file_format=file_format,
+        media_type="application/octet-stream",
+    )
+
+
+def read_intermediate_file_in_chunks(
+    tenant_name: str, project_id: int, file_name: constants.IntermediateFiles
+) -> Iterator[pd.DataFrame]:
+    """Reads an intermediate file as consecutive frames of rows. Per-loan schedules are only made
+    dense a chunk of loans at a time."""
+    if file_name in constants.BANDED_SCHEDULE_FILES:
+        yield from helper.read_banded_schedule(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+            file_name=file_name,
+        ).iter_dense(constants.EXPORT_CHUNK_SIZE)
+    else:
+        yield from exports.iter_frame(
+            helper.read_intermediate_file(
+                tenant_name=tenant_name,
+                project_id=project_id,
+                boto3_session=constants.MY_SESSION,
+                file_name=file_name,
+            )
+        )
 
-    stream = io.StringIO()
 
-    df.to_csv(stream, index=True)
-    response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
-    response.headers[
-        "Content-Disposition"
-    ] = f"attachment; file_name={file_name.value}.csv"
-    return response
+@router.get("/projects/{project_id}/results/intermediate")
+def download_intermediate_file(
+    project_id: int,
+    file_name: constants.IntermediateFiles,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
+    current_user: models.Users = Depends(get_current_active_user),
+):
+    return exports.export_response(
+        chunks=read_intermediate_file_in_chunks(
+            tenant_name=current_user.tenant.company_name,
+            project_id=project_id,
+            file_name=file_name,
+        ),
+        download_name=file_name.value,
+        file_format=file_format,
+    )
 
 
 @router.get("/projects/{project_id}/results/intermediate/download")
 def download_intermediate_file_only(
     project_id: int,
     file_name: constants.IntermediateFiles,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
     current_user: models.Users = Depends(get_current_active_user),
 ):
-    tenant_name = current_user.tenant.company_name
-
-    df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=file_name,
-    )
-
-    return Response(
-        content=df.to_csv(index=True),
-        headers={
-            "Content-Disposition": f'attachment; filename="{file_name.value}.csv"',
-            "Content-Type": "application/octet-stream",
-        },
+    return exports.export_response(
+        chunks=read_intermediate_file_in_chunks(
+            tenant_name=current_user.tenant.company_name,
+            project_id=project_id,
+            file_name=file_name,
+        ),
+        download_name=file_name.value,
+        file_format=file_format,
+        media_type="application/octet-stream",
     )
 
 
@@ -1675,19 +1514,24 @@ def view_intermediate_file(
 ):
     tenant_name = current_user.tenant.company_name
 
-    df = helper.read_intermediate_file(
-        tenant_name=tenant_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=file_name,
-    )
-
-    if file_name in [
-        constants.IntermediateFiles.existing_loans_schedules_capital_repayments_df,
-        constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
-        constants.IntermediateFiles.existing_loans_schedules_outstanding_balances_df,
-    ]:
-        df = df.head(100)
+    if file_name in constants.BANDED_SCHEDULE_FILES:
+        df = (
+            helper.read_banded_schedule(
+                tenant_name=tenant_name,
+                project_id=project_id,
+                boto3_session=constants.MY_SESSION,
+                file_name=file_name,
+            )
+            .head(100)
+            .to_dense()
+        )
+    else:
+        df = helper.read_intermediate_file(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+            file_name=file_name,
+        )
 
     return Response(
         content=df.T.to_json(orient="table"),
@@ -1729,11 +1573,10 @@ def get_final_filenames(
 ):
     tenant_name = current_user.tenant.company_name
 
-    final_files: list = wr.s3.list_objects(
-        f"s3://{tenant_name}/project_{project_id}/{constants.FileStage.final.value}",
+    final_files = storage.get_project_store(
+        tenant_name=tenant_name,
+        project_id=project_id,
         boto3_session=constants.MY_SESSION,
-    )
-
-    final_files = list(map(lambda x: x.split("/")[-1].split(".")[0], final_files))
+    ).list_files(file_stage=constants.FileStage.final)
 
     return final_files
@@ -1,4 +1,3 @@
-import awswrangler as wr
 import pandas as pd
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
@@ -13,6 +12,7 @@ from application.modeling import (
     helper,
     interest_income,
     other_income,
+    storage,
 )
 from application.routes.projects import crud as project_crud
 from application.utils import models
@@ -24,6 +24,7 @@ router = APIRouter(
 
 
 @router.get("/projects/{project_id}/calculations/intermediate/new-disbursements")
+@helper.write_behind
 def calculate_new_disbursements(
     project_id: str,
     db: Session = Depends(get_db),
@@ -61,6 +62,7 @@ def calculate_new_disbursements(
 @router.get(
     "/projects/{project_id}/calculations/intermediate/loan-schedules-new-disbursements"
 )
+@helper.write_behind
 def calculate_loan_schedules_new_disbursements(
     project_id: str,
     db: Session = Depends(get_db),
@@ -145,75 +147,133 @@ def calculate_loan_schedules_new_disbursements(
 @router.get(
     "/projects/{project_id}/calculations/intermediate/loan-schedules-existing-loans"
 )
+@helper.write_behind
 def calculate_loan_schedules_existing_loans(
     project_id: str,
     current_user: models.Users = Depends(get_current_active_user),
+    per_loan_detail: bool = False,
 ):
+    """Streams the loan tape in batches and stores the monthly totals of the existing loans' schedules,
+    overall and per loan type. The per-loan schedules are only built and stored when per_loan_detail is set."""
     tenant_name = current_user.tenant.company_name
+
+    disbursement_dates = helper.read_existing_loan_disbursement_dates(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+    )
+
+    def loan_batches():
+        first_loan = 0
+        for existing_loans in helper.read_raw_file_in_chunks(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+            file_name=constants.RawFiles.existing_loans,
+            columns=["interest_rate", "loan_term", "loan_amount", "loan_type"],
+        ):
+            existing_loans = helper.columns_to_snake_case(existing_loans)
+            last_loan = first_loan + len(existing_loans)
+
+            yield {
+                "interest_rates": existing_loans["interest_rate"],
+                "effective_dates": pd.Series(
+                    disbursement_dates.to_numpy()[first_loan:last_loan],
+                    index=existing_loans.index,
+                ),
+                "frequencies": (existing_loans["interest_rate"] * 0 + 12),
+                "tenures": existing_loans["loan_term"],
+                "amounts": existing_loans["loan_amount"],
+                "groups": existing_loans.get("loan_type"),
+            }
+            first_loan = last_loan
+
+    existing_loans_totals = borrowings.calculate_reducing_balance_loans_totals(
+        loan_batches=loan_batches(), is_interest_rate_annual=False
+    )
+
+    existing_loans_schedules_totals_df = pd.DataFrame(
+        {name: totals.sum() for name, totals in existing_loans_totals.items()}
+    ).T
+
+    existing_loans_schedules_totals_by_product_df = pd.concat(
+        existing_loans_totals, names=["schedule", "product"]
+    ).reset_index()
+
+    helper.upload_file(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+        file=existing_loans_schedules_totals_df,
+        file_name=constants.IntermediateFiles.existing_loans_schedules_totals_df,
+        file_stage=constants.FileStage.intermediate,
+    )
+
+    helper.upload_file(
+        tenant_name=tenant_name,
+        project_id=project_id,
+        boto3_session=constants.MY_SESSION,
+        file=existing_loans_schedules_totals_by_product_df,
+        file_name=constants.IntermediateFiles.existing_loans_schedules_totals_by_product_df,
+        file_stage=constants.FileStage.intermediate,
+    )
+
+    if not per_loan_detail:
+        return {"message": "done"}
+
     existing_loans = helper.read_raw_file(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=constants.MY_SESSION,
         file_name=constants.RawFiles.existing_loans,
         set_index=False,
+        columns=["loan_number", "interest_rate", "loan_term", "loan_amount"],
     )
 
     existing_loans = helper.columns_to_snake_case(existing_loans)
     # existing_loans = existing_loans.loc[existing_loans["closing_balance"] > 0]
 
-    existing_loans_schedules = borrowings.calculate_reducing_balance_loans_schedules(
-        interest_rates=existing_loans["interest_rate"],
-        effective_dates=existing_loans["disbursement_date"],
-        frequencies=(existing_loans["interest_rate"] * 0 + 12),
-        loan_identifiers=existing_loans["loan_number"],
-        tenures=existing_loans["loan_term"],
-        amounts=existing_loans["loan_amount"],
-        is_interest_rate_annual=False,
+    existing_loans_schedules = (
+        borrowings.calculate_reducing_balance_loans_banded_schedules(
+            interest_rates=existing_loans["interest_rate"],
+            effective_dates=disbursement_dates,
+            frequencies=(existing_loans["interest_rate"] * 0 + 12),
+            loan_identifiers=existing_loans["loan_number"],
+            tenures=existing_loans["loan_term"],
+            amounts=existing_loans["loan_amount"],
+            is_interest_rate_annual=False,
+        )
     )
 
-    existing_loans_schedules_capital_repayments_df = existing_loans_schedules[
-        "capital_repayments"
-    ]
-
-    existing_loans_schedules_interest_incomes_df = existing_loans_schedules[
-        "interest_payments"
-    ]
-
-    existing_loans_schedules_outstanding_balances_df = existing_loans_schedules[
-        "outstanding_balance_at_start"
-    ]
-
-    helper.upload_file(
+    helper.upload_banded_schedule(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=constants.MY_SESSION,
-        file=existing_loans_schedules_capital_repayments_df,
+        schedule=existing_loans_schedules["capital_repayments"],
         file_name=constants.IntermediateFiles.existing_loans_schedules_capital_repayments_df,
-        file_stage=constants.FileStage.intermediate,
     )
 
-    helper.upload_file(
+    helper.upload_banded_schedule(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=constants.MY_SESSION,
-        file=existing_loans_schedules_outstanding_balances_df,
+        schedule=existing_loans_schedules["outstanding_balance_at_start"],
         file_name=constants.IntermediateFiles.existing_loans_schedules_outstanding_balances_df,
-        file_stage=constants.FileStage.intermediate,
     )
 
-    helper.upload_file(
+    helper.upload_banded_schedule(
         tenant_name=tenant_name,
         project_id=project_id,
         boto3_session=constants.MY_SESSION,
-        file=existing_loans_schedules_interest_incomes_df,
+        schedule=existing_loans_schedules["interest_payments"],
         file_name=constants.IntermediateFiles.existing_loans_schedules_interest_incomes_df,
-        file_stage=constants.FileStage.intermediate,
     )
 
     return {"message": "done"}
 
 
 @router.get("/projects/{project_id}/calculations/intermediate/other-income")
+@helper.write_behind
 def calculate_other_income(
     project_id: str,
     db: Session = Depends(get_db),
@@ -279,6 +339,7 @@ def calculate_other_income(
         boto3_session=constants.MY_SESSION,
         file_name=constants.RawFiles.existing_loans,
         set_index=False,
+        columns=["loan_term", "loan_amount", "admin_fee", "credit_insurance_fee"],
     )
 
     existing_loans = helper.columns_to_snake_case(existing_loans)
@@ -288,6 +349,11 @@ def calculate_other_income(
         existing_loans=existing_loans,
         start_date=start_date,
         months_to_forecast=months_to_forecast,
+        disbursement_dates=helper.read_existing_loan_disbursement_dates(
+            tenant_name=tenant_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+        ),
     )
 
     helper.upload_file(
@@ -325,6 +391,7 @@ def calculate_other_income(
 
 
 @router.get("/projects/{project_id}/calculations/intermediate/depreciation")
+@helper.write_behind
 def calculate_depreciation(
     project_id: str,
     db: Session = Depends(get_db),
@@ -378,6 +445,7 @@ def calculate_depreciation(
 @router.get(
     "/projects/{project_id}/calculations/intermediate/salaries-and-pensions-and-statutory-contributions"
 )
+@helper.write_behind
 def calculate_salaries_and_pensions_and_statutory_contributions(
     project_id: str,
     db: Session = Depends(get_db),
@@ -434,6 +502,7 @@ def calculate_salaries_and_pensions_and_statutory_contributions(
 
 
 @router.get("/projects/{project_id}/calculations/intermediate/provisions")
+@helper.write_behind
 def calculate_provisions(
     project_id: str,
     db: Session = Depends(get_db),
@@ -481,6 +550,7 @@ def calculate_provisions(
 @router.get(
     "/projects/{project_id}/calculations/intermediate/finance-costs-and-capital-repayment-on-borrowings"
 )
+@helper.write_behind
 def calculate_finance_costs_and_capital_repayment_on_borrowings(
     project_id: str,
     current_user: models.Users = Depends(get_current_active_user),
@@ -511,21 +581,16 @@ def calculate_finance_costs_and_capital_repayment_on_borrowings(
         details_of_short_term_borrowing
     )
 
-    long_term_borrowings_schedules = borrowings.calculate_borrowings_schedules(
-        details_of_long_term_borrowing
-    )
-    short_term_borrowings_schedules = borrowings.calculate_borrowings_schedules(
-        details_of_short_term_borrowing
+    borrowings_schedules = borrowings.calculate_borrowing_books_schedules(
+        {
+            "long_term": details_of_long_term_borrowing,
+            "short_term": details_of_short_term_borrowing,
+        }
     )
+    long_term_borrowings_schedules = borrowings_schedules["books"]["long_term"]
+    short_term_borrowings_schedules = borrowings_schedules["books"]["short_term"]
 
-    capital_repayment_borrowings_df = pd.concat(
-        [
-            long_term_borrowings_schedules["capital_repayments"],
-            short_term_borrowings_schedules["capital_repayments"],
-        ],
-    ).fillna(0)
-
-    capital_repayment_borrowings_df.loc["total"] = capital_repayment_borrowings_df.sum()
+    capital_repayment_borrowings_df = borrowings_schedules["all"]["capital_repayments"]
 
     long_term_borrowings_capital_repayments_df = long_term_borrowings_schedules[
         "capital_repayments"
@@ -543,14 +608,7 @@ def calculate_finance_costs_and_capital_repayment_on_borrowings(
         "total"
     ] = long_term_borrowings_capital_repayments_df.sum()
 
-    finance_costs_df = pd.concat(
-        [
-            long_term_borrowings_schedules["interest_payments"],
-            short_term_borrowings_schedules["interest_payments"],
-        ],
-    ).fillna(0)
-
-    finance_costs_df.loc["total"] = finance_costs_df.sum()
+    finance_costs_df = borrowings_schedules["all"]["interest_payments"]
 
     long_term_borrowings_schedules_outstanding_balances_df = (
         long_term_borrowings_schedules["outstanding_balance_at_start"]
@@ -623,13 +681,10 @@ def get_intermediate_filenames(
 ):
     tenant_name = current_user.tenant.company_name
 
-    intermediate_files: list = wr.s3.list_objects(
-        f"s3://{tenant_name}/project_{project_id}/{constants.FileStage.intermediate.value}",
+    intermediate_files = storage.get_project_store(
+        tenant_name=tenant_name,
+        project_id=project_id,
         boto3_session=constants.MY_SESSION,
-    )
-
-    intermediate_files = list(
-        map(lambda x: x.split("/")[-1].split(".")[0], intermediate_files)
-    )
+    ).list_files(file_stage=constants.FileStage.intermediate)
 
     return intermediate_files
@@ -0,0 +1,394 @@
+import inspect
+import time
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from application.auth.security import get_current_active_user
+from application.modeling import constants, pipeline, storage
+from application.routes import final_calculations, intermediate_calculations
+from application.routes.projects import crud as project_crud
+from application.utils import models
+from application.utils.database import SessionLocal, get_db
+
+router = APIRouter(
+    tags=["PIPELINE CALCULATIONS"], dependencies=[Depends(get_current_active_user)]
+)
+
+raw = constants.FileStage.raw
+intermediate = constants.FileStage.intermediate
+final = constants.FileStage.final
+
+CALCULATION_STAGES = [
+    pipeline.Stage(
+        name="new_disbursements",
+        function=intermediate_calculations.calculate_new_disbursements,
+        inputs=[(raw, constants.RawFiles.disbursement_parameters)],
+        outputs=[(intermediate, constants.IntermediateFiles.new_disbursements_df)],
+    ),
+    pipeline.Stage(
+        name="loan_schedules_new_disbursements",
+        function=intermediate_calculations.calculate_loan_schedules_new_disbursements,
+        inputs=[
+            (raw, constants.RawFiles.disbursement_parameters),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+        ],
+        outputs=[
+            (
+                intermediate,
+                constants.IntermediateFiles.monthly_repayment_new_disbursements_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+        ],
+    ),
+    pipeline.Stage(
+        name="loan_schedules_existing_loans",
+        function=intermediate_calculations.calculate_loan_schedules_existing_loans,
+        inputs=[(raw, constants.RawFiles.existing_loans)],
+        outputs=[
+            (
+                intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_by_product_df,
+            ),
+        ],
+    ),
+    pipeline.Stage(
+        name="other_income",
+        function=intermediate_calculations.calculate_other_income,
+        inputs=[
+            (raw, constants.RawFiles.disbursement_parameters),
+            (raw, constants.RawFiles.existing_loans),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+        ],
+        outputs=[
+            (
+                intermediate,
+                constants.IntermediateFiles.admin_fee_for_all_new_disbursements_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.credit_insurance_fee_for_all_new_disbursements_df,
+            ),
+            (intermediate, constants.IntermediateFiles.other_income_existing_loans_df),
+            (intermediate, constants.IntermediateFiles.other_income_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="depreciation",
+        function=intermediate_calculations.calculate_depreciation,
+        inputs=[(raw, constants.RawFiles.details_of_assets)],
+        outputs=[
+            (intermediate, constants.IntermediateFiles.depreciations_df),
+            (intermediate, constants.IntermediateFiles.net_book_values_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="salaries_and_pensions_and_statutory_contributions",
+        function=intermediate_calculations.calculate_salaries_and_pensions_and_statutory_contributions,
+        inputs=[
+            (raw, constants.RawFiles.other_parameters),
+            (raw, constants.RawFiles.disbursement_parameters),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+        ],
+        outputs=[
+            (
+                intermediate,
+                constants.IntermediateFiles.salaries_and_pension_and_statutory_contributions_df,
+            )
+        ],
+    ),
+    pipeline.Stage(
+        name="provisions",
+        function=intermediate_calculations.calculate_provisions,
+        inputs=[
+            (raw, constants.RawFiles.disbursement_parameters),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+        ],
+        outputs=[
+            (
+                intermediate,
+                constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+            )
+        ],
+    ),
+    pipeline.Stage(
+        name="finance_costs_and_capital_repayment_on_borrowings",
+        function=intermediate_calculations.calculate_finance_costs_and_capital_repayment_on_borrowings,
+        inputs=[
+            (raw, constants.RawFiles.details_of_long_term_borrowing),
+            (raw, constants.RawFiles.details_of_short_term_borrowing),
+        ],
+        outputs=[
+            (intermediate, constants.IntermediateFiles.finance_costs_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.short_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.short_term_borrowings_capital_repayments_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+            ),
+            (intermediate, constants.IntermediateFiles.capital_repayment_borrowings_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="income_statement",
+        function=final_calculations.generate_income_statement,
+        inputs=[
+            (raw, constants.RawFiles.expenses_certain),
+            (raw, constants.RawFiles.expenses_uncertain),
+            (raw, constants.RawFiles.other_parameters),
+            (raw, constants.RawFiles.disbursement_parameters),
+            (raw, constants.RawFiles.opening_balances),
+            (intermediate, constants.IntermediateFiles.depreciations_df),
+            (intermediate, constants.IntermediateFiles.finance_costs_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+            ),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+            (intermediate, constants.IntermediateFiles.other_income_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.salaries_and_pension_and_statutory_contributions_df,
+            ),
+        ],
+        outputs=[(intermediate, constants.IntermediateFiles.income_statement_df)],
+    ),
+    pipeline.Stage(
+        name="direct_cashflow",
+        function=final_calculations.generate_direct_cashflow,
+        inputs=[
+            (raw, constants.RawFiles.other_parameters),
+            (raw, constants.RawFiles.details_of_assets),
+            (raw, constants.RawFiles.details_of_long_term_borrowing),
+            (raw, constants.RawFiles.details_of_short_term_borrowing),
+            (raw, constants.RawFiles.opening_balances),
+            (
+                intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+            (intermediate, constants.IntermediateFiles.other_income_df),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+            ),
+            (intermediate, constants.IntermediateFiles.finance_costs_df),
+            (intermediate, constants.IntermediateFiles.income_statement_df),
+            (intermediate, constants.IntermediateFiles.capital_repayment_borrowings_df),
+        ],
+        outputs=[
+            (intermediate, constants.IntermediateFiles.tax_schedule_df),
+            (final, constants.FinalFiles.income_statement_yearly_df),
+            (final, constants.FinalFiles.direct_cashflow_yearly_df),
+            (final, constants.FinalFiles.income_statement_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_and_short_term_borrowing_df,
+            ),
+            (final, constants.FinalFiles.direct_cashflow_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="loan_book",
+        function=final_calculations.generate_loan_book,
+        inputs=[
+            (raw, constants.RawFiles.opening_balances),
+            (
+                intermediate,
+                constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+            ),
+            (intermediate, constants.IntermediateFiles.new_disbursements_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.interest_income_new_disbursement_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.existing_loans_schedules_totals_df,
+            ),
+        ],
+        outputs=[
+            (final, constants.FinalFiles.loan_book_df),
+            (final, constants.FinalFiles.loan_book_yearly_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="balance_sheet",
+        function=final_calculations.generate_balance_sheet,
+        inputs=[
+            (raw, constants.RawFiles.other_parameters),
+            (raw, constants.RawFiles.opening_balances),
+            (intermediate, constants.IntermediateFiles.net_book_values_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_and_short_term_borrowing_df,
+            ),
+            (intermediate, constants.IntermediateFiles.tax_schedule_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.short_term_borrowings_capital_repayments_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.short_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_term_borrowings_schedules_outstanding_balances_df,
+            ),
+            (
+                intermediate,
+                constants.IntermediateFiles.provision_for_credit_loss_for_all_new_disbursements_df,
+            ),
+            (final, constants.FinalFiles.loan_book_df),
+            (final, constants.FinalFiles.direct_cashflow_df),
+            (final, constants.FinalFiles.income_statement_df),
+        ],
+        outputs=[
+            (intermediate, constants.IntermediateFiles.other_payables_schedule_df),
+            (final, constants.FinalFiles.ratios_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.intergroup_receivables_schedule_df,
+            ),
+            (intermediate, constants.IntermediateFiles.other_receivables_schedule_df),
+            (intermediate, constants.IntermediateFiles.long_term_loans_schedules_df),
+            (intermediate, constants.IntermediateFiles.short_term_loans_schedules_df),
+            (intermediate, constants.IntermediateFiles.trade_payables_schedule_df),
+            (final, constants.FinalFiles.balance_sheet_df),
+            (final, constants.FinalFiles.balance_sheet_yearly_df),
+            (intermediate, constants.IntermediateFiles.trade_receivables_schedule_df),
+        ],
+    ),
+    pipeline.Stage(
+        name="statement_of_cashflows",
+        function=final_calculations.generate_statement_of_cashflows,
+        inputs=[
+            (raw, constants.RawFiles.other_parameters),
+            (raw, constants.RawFiles.opening_balances),
+            (raw, constants.RawFiles.details_of_assets),
+            (intermediate, constants.IntermediateFiles.tax_schedule_df),
+            (intermediate, constants.IntermediateFiles.other_receivables_schedule_df),
+            (intermediate, constants.IntermediateFiles.trade_payables_schedule_df),
+            (intermediate, constants.IntermediateFiles.trade_receivables_schedule_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.intergroup_receivables_schedule_df,
+            ),
+            (intermediate, constants.IntermediateFiles.other_payables_schedule_df),
+            (intermediate, constants.IntermediateFiles.finance_costs_df),
+            (intermediate, constants.IntermediateFiles.capital_repayment_borrowings_df),
+            (intermediate, constants.IntermediateFiles.short_term_loans_schedules_df),
+            (
+                intermediate,
+                constants.IntermediateFiles.long_term_borrowings_capital_repayments_df,
+            ),
+            (final, constants.FinalFiles.income_statement_df),
+            (final, constants.FinalFiles.loan_book_df),
+        ],
+        outputs=[
+            (final, constants.FinalFiles.statement_of_cashflow_df),
+            (final, constants.FinalFiles.statement_of_cashflow_yearly_df),
+        ],
+    ),
+]
+
+
+def run_calculation_stages(
+    project_id: str,
+    db: Session,
+    current_user: models.Users,
+    force: bool = False,
+):
+    """Runs the calculation stages, reusing the stored outputs of every stage whose fingerprint has not changed"""
+    project = project_crud.get_project_by_id(db=db, project_id=project_id)
+    start = time.perf_counter()
+
+    def call_stage(stage: pipeline.Stage):
+        if "db" in inspect.signature(stage.function).parameters:
+            # Sessions are not thread safe, so every stage gets its own
+            stage_db = SessionLocal()
+            try:
+                stage.function(
+                    project_id=project_id, db=stage_db, current_user=current_user
+                )
+            finally:
+                stage_db.close()
+        else:
+            stage.function(project_id=project_id, current_user=current_user)
+
+    stages, upload_seconds = pipeline.run_incremental_stages(
+        stages=CALCULATION_STAGES,
+        call_stage=call_stage,
+        backing_store=storage.get_project_store(
+            tenant_name=current_user.tenant.company_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+        ),
+        project_parameters={
+            "start_date": project.start_date,
+            "months_to_forecast": project.months_to_forecast,
+            "imtt": project.imtt,
+        },
+        force=force,
+    )
+
+    return {
+        "message": "done",
+        "stages": stages,
+        "reused_stages": [stage["stage"] for stage in stages if stage["reused"]],
+        "upload_seconds": upload_seconds,
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+@router.get("/projects/{project_id}/calculations/run")
+def run_calculations(
+    project_id: str,
+    force: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.Users = Depends(get_current_active_user),
+):
+    """Runs every intermediate and final calculation in one call.
+    Stages hand their outputs to each other in memory and everything is uploaded once at the end.
+    Stages whose inputs have not changed since the last run are skipped unless `force` is set."""
+    return run_calculation_stages(
+        project_id=project_id, db=db, current_user=current_user, force=force
+    )
@@ -1,7 +1,5 @@
-import io
 from typing import List
 
-import awswrangler as wr
 import pandas as pd
 from fastapi import (
     APIRouter,
@@ -12,12 +10,11 @@ from fastapi import (
     UploadFile,
     status,
 )
-from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from application.auth.security import get_current_active_user
 from application.aws_helper.helper import MY_SESSION
-from application.modeling import constants, helper
+from application.modeling import constants, exports, helper, ingestion, storage
 from application.routes.projects import crud
 from application.utils import models, schemas
 from application.utils.database import get_db
@@ -73,27 +70,22 @@ def upload_project_files(
 def download_raw_file(
     project_id: str,
     file_name: constants.RawFiles,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
     current_user: models.Users = Depends(get_current_active_user),
 ):
-    df = helper.read_raw_file(
-        tenant_name=current_user.tenant.company_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=file_name,
-        for_output=True,
+    return exports.export_response(
+        chunks=helper.read_raw_file_in_chunks(
+            tenant_name=current_user.tenant.company_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+            file_name=file_name,
+            chunk_size=constants.EXPORT_CHUNK_SIZE,
+            for_output=True,
+        ),
+        download_name=file_name.value,
+        file_format=file_format,
     )
 
-    if file_name == constants.RawFiles.existing_loans:
-        df = df.head(50)
-
-    stream = io.StringIO()
-    df.to_csv(stream)
-    response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
-    response.headers[
-        "Content-Disposition"
-    ] = f"attachment; file_name={file_name.value}.csv"
-    return response
-
 
 @router.get("/projects/{project_id}/raw/data/view")
 def view_raw_file(
@@ -107,11 +99,9 @@ def view_raw_file(
         boto3_session=constants.MY_SESSION,
         file_name=file_name,
         for_output=True,
+        limit=50 if file_name == constants.RawFiles.existing_loans else None,
     )
 
-    if file_name == constants.RawFiles.existing_loans:
-        df = df.head(50)
-
     return Response(
         content=df.to_json(orient="table"),
         headers={
@@ -125,25 +115,21 @@ def view_raw_file(
 def download_only_raw_file(
     project_id: str,
     file_name: constants.RawFiles,
+    file_format: constants.ExportFormat = constants.ExportFormat.csv,
     current_user: models.Users = Depends(get_current_active_user),
 ):
-    df = helper.read_raw_file(
-        tenant_name=current_user.tenant.company_name,
-        project_id=project_id,
-        boto3_session=constants.MY_SESSION,
-        file_name=file_name,
-        for_output=True,
-    )
-
-    if file_name == constants.RawFiles.existing_loans:
-        df = df.head(50)
-
-    return Response(
-        content=df.to_csv(),
-        headers={
-            "Content-Disposition": f'attachment; filename="{file_name.value}.csv"',
-            "Content-Type": "application/octet-stream",
-        },
+    return exports.export_response(
+        chunks=helper.read_raw_file_in_chunks(
+            tenant_name=current_user.tenant.company_name,
+            project_id=project_id,
+            boto3_session=constants.MY_SESSION,
+            file_name=file_name,
+            chunk_size=constants.EXPORT_CHUNK_SIZE,
+            for_output=True,
+        ),
+        download_name=file_name.value,
+        file_format=file_format,
+        media_type="application/octet-stream",
     )
 
 
@@ -153,12 +139,11 @@ def get_raw_filenames(
     current_user: models.Users = Depends(get_current_active_user),
 ):
     tenant_name = current_user.tenant.company_name
-    raw_files: list = wr.s3.list_objects(
-        f"s3://{tenant_name}/project_{project_id}/{constants.FileStage.raw.value}",
+    raw_files = storage.get_project_store(
+        tenant_name=tenant_name,
+        project_id=project_id,
         boto3_session=constants.MY_SESSION,
-    )
-
-    raw_files = list(map(lambda x: x.split("/")[-1].split(".")[0], raw_files))
+    ).list_files(file_stage=constants.FileStage.raw)
 
     return raw_files
 
@@ -232,6 +217,9 @@ def add_new_funding(
     project_id: int,
     current_user: models.Users = Depends(get_current_active_user),
 ):
+    """Saves the new funding to the project's borrowing details and returns once it is saved.
+    The statements are not recalculated here: call /projects/{project_id}/calculations/run
+    afterwards, which only reruns the borrowing schedules and the statements after them."""
     tenant_name = current_user.tenant.company_name
 
     if funding_term == constants.FundingTerm.long_term:
@@ -251,8 +239,9 @@ def add_new_funding(
             new_funding.dict(), index=[details_of_long_term_borrowing.index[-1] + 1]
         )
 
-        details_of_long_term_borrowing = pd.concat(
-            [details_of_long_term_borrowing, new_funding]
+        details_of_long_term_borrowing = ingestion.conform_to_schema(
+            pd.concat([details_of_long_term_borrowing, new_funding]),
+            file_name=constants.RawFiles.details_of_long_term_borrowing,
         )
 
         helper.upload_file(
@@ -281,8 +270,9 @@ def add_new_funding(
             new_funding.dict(), index=[details_of_short_term_borrowing.index[-1] + 1]
         )
 
-        details_of_short_term_borrowing = pd.concat(
-            [details_of_short_term_borrowing, new_funding]
+        details_of_short_term_borrowing = ingestion.conform_to_schema(
+            pd.concat([details_of_short_term_borrowing, new_funding]),
+            file_name=constants.RawFiles.details_of_short_term_borrowing,
         )
 
         helper.upload_file(
@@ -0,0 +1,191 @@
+"""Compares the per-facility borrowings schedules against the batched engine on synthetic borrowing books.
+
+The reference below is the code the engine replaced: one pd.date_range and one Series per straight line
+facility, the matrix engine for reducing balance ones, and a reindex that left out each schedule's last
+month. Results are compared on the months the reference covers, reading its empty months as zero.
+
+    python -m benchmarks.bench_borrowings --facilities 100 1000 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from application.modeling import borrowings, helper
+
+FREQUENCY_KEYS = {1: "12M", 2: "6M", 3: "4M", 4: "3M", 6: "2M", 12: "M"}
+
+
+def reference_straight_line_payments(
+    effective_dates, tenures, frequencies, amounts, institutions
+):
+    results = []
+    number_of_payments = tenures // 12 * frequencies
+
+    for i, _ in effective_dates.items():
+        if frequencies[i] == 0:
+            index = pd.date_range(
+                start=(effective_dates[i] + pd.DateOffset(months=tenures[i])),
+                periods=1,
+                freq="D",
+            ).strftime("%b-%Y")
+        else:
+            index = pd.date_range(
+                effective_dates[i] + pd.DateOffset(months=12 // frequencies[i]),
+                periods=number_of_payments[i],
+                freq=FREQUENCY_KEYS[frequencies[i]],
+            ).strftime("%b-%Y")
+        results.append(pd.Series(amounts[i], index=index, name=institutions[i]))
+
+    return pd.concat(results, axis=1).T.fillna(0)
+
+
+def reference_straight_line_schedules(straight_line: pd.DataFrame):
+    effective_dates = helper.convert_to_datetime(straight_line["effective_date"])
+    tenures = straight_line["tenure"]
+    frequencies = straight_line["frequency"]
+    amounts = straight_line["nominal_amount"]
+    annual_interest = amounts * straight_line["interest_rate"]
+    interest = pd.Series(
+        np.where(
+            frequencies == 0,
+            annual_interest * tenures / 12,
+            annual_interest / frequencies.replace(0, 1),
+        ),
+        index=straight_line.index,
+    )
+
+    outstanding_balance = pd.concat(
+        [
+            pd.Series(
+                amounts[i],
+                index=pd.period_range(
+                    start=effective_dates[i], periods=tenures[i], freq="M"
+                ),
+                name=straight_line["institution"][i],
+            )
+            for i in straight_line.index
+        ],
+        axis=1,
+    ).T.fillna(0)
+    outstanding_balance.columns = outstanding_balance.columns.strftime("%b-%Y")
+
+    return {
+        "interest_payments": reference_straight_line_payments(
+            effective_dates,
+            tenures,
+            frequencies,
+            interest,
+            straight_line["institution"],
+        ),
+        "capital_repayments": reference_straight_line_payments(
+            effective_dates,
+            tenures,
+            frequencies * 0,
+            amounts,
+            straight_line["institution"],
+        ),
+        "outstanding_balance_at_start": outstanding_balance,
+    }
+
+
+def reindex_output(df: pd.DataFrame):
+    columns = pd.DatetimeIndex(df.columns)
+    index = pd.date_range(columns.min(), columns.max(), freq="M").strftime("%b-%Y")
+    return df.T.reindex(index=index).T
+
+
+def reference_borrowings_schedules(book: pd.DataFrame):
+    straight_line = book.loc[book["method"] == "straight_line"]
+    reducing_balance = book.loc[book["method"] == "reducing_balance"]
+
+    straight_line_schedules = reference_straight_line_schedules(straight_line)
+    reducing_balance_schedules = borrowings.calculate_reducing_balance_loans_schedules(
+        interest_rates=reducing_balance["interest_rate"],
+        effective_dates=reducing_balance["effective_date"],
+        frequencies=reducing_balance["frequency"],
+        loan_identifiers=reducing_balance["institution"],
+        tenures=reducing_balance["tenure"],
+        amounts=reducing_balance["nominal_amount"],
+    )
+    return {
+        name: reindex_output(
+            pd.concat(
+                [straight_line_schedules[name], reducing_balance_schedules[name]]
+            ).fillna(0)
+        )
+        for name in borrowings.BORROWING_SCHEDULES
+    }
+
+
+def make_borrowing_book(number_of_facilities: int, seed: int) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    effective_dates = pd.Timestamp("2021-01-01") + pd.to_timedelta(
+        random.integers(0, 3 * 365, number_of_facilities), unit="D"
+    )
+    methods = random.choice(["straight_line", "reducing_balance"], number_of_facilities)
+    return pd.DataFrame(
+        {
+            "effective_date": effective_dates.strftime("%d/%m/%Y"),
+            "institution": [f"B{number:05d}" for number in range(number_of_facilities)],
+            "nominal_amount": random.uniform(10_000, 1_000_000, number_of_facilities),
+            "interest_rate": random.uniform(0.04, 0.2, number_of_facilities),
+            "tenure": random.choice([3, 6, 12, 24, 36, 60], number_of_facilities),
+            # Reducing balance facilities are repaid monthly, as in the borrowing templates
+            "frequency": np.where(
+                methods == "reducing_balance",
+                12,
+                random.choice([0, 1, 2, 4, 12], number_of_facilities),
+            ),
+            "method": methods,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--facilities", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    for number_of_facilities in args.facilities:
+        books = {
+            "long_term": make_borrowing_book(number_of_facilities, seed=0),
+            "short_term": make_borrowing_book(number_of_facilities, seed=1),
+        }
+        # The reducing balance terms print which interest rates they divide
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            reference = {
+                book: reference_borrowings_schedules(df) for book, df in books.items()
+            }
+            loop = time.perf_counter() - start
+
+            start = time.perf_counter()
+            batched = borrowings.calculate_borrowing_books_schedules(books)
+            engine = time.perf_counter() - start
+
+        for book, schedules in reference.items():
+            for name, expected in schedules.items():
+                result = batched["books"][book][name]
+                pd.testing.assert_frame_equal(
+                    result[expected.columns],
+                    expected.fillna(0),
+                    check_index_type=False,
+                    rtol=1e-12,
+                )
+
+        print(
+            f"facilities per book: {number_of_facilities:5d}  per facility: {loop:7.2f}s  "
+            f"batched: {engine:6.3f}s  speedup: {loop / engine:6.0f}x  matches"
+        )
+
+
+if __name__ == "__main__":
+    main()
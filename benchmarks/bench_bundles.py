@@ -0,0 +1,117 @@
+"""Compares writing and reading the outputs of a pipeline run as one file per object and as bundles.
+
+Both layouts are kept in a local project store that waits --latency seconds on every request, as
+an object store round trip would. A run writes --files small outputs to a stage and checks their
+etags, and a later request reads a few of them back with the etags it checks first.
+
+    python -m benchmarks.bench_bundles --files 30 --latency 0.03
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from application.modeling import constants, storage
+
+FILE_STAGE = constants.FileStage.intermediate
+
+
+class RequestCountingStore(storage.LocalProjectStore):
+    """A local store that counts its requests and waits `latency` seconds on each of them"""
+
+    REQUESTS = [
+        "etag",
+        "read",
+        "write_table",
+        "list_files",
+        "list_modified",
+        "read_bytes",
+        "write_file",
+        "delete_files",
+    ]
+
+    def __init__(self, tenant_name: str, project_id: int, root: str, latency: float):
+        super().__init__(tenant_name=tenant_name, project_id=project_id, root=root)
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        for name in self.REQUESTS:
+            setattr(self, name, self.counted(getattr(self, name)))
+
+    def counted(self, request):
+        def send(*args, **kwargs):
+            with self.lock:
+                self.requests += 1
+            time.sleep(self.latency)
+            return request(*args, **kwargs)
+
+        return send
+
+
+def make_outputs(number_of_files: int, seed: int = 0) -> dict:
+    random = np.random.default_rng(seed)
+    file_names = list(constants.IntermediateFiles)[:number_of_files]
+    return {
+        (FILE_STAGE, file_name): (
+            pa.Table.from_pandas(
+                pd.DataFrame(random.normal(size=(12, 60))).add_prefix("month_"),
+                preserve_index=False,
+            ),
+            None,
+        )
+        for file_name in file_names
+    }
+
+
+def run(project_store: storage.ProjectStore, outputs: dict, read: int) -> pd.DataFrame:
+    project_store.write_files(outputs=outputs)
+    for file_stage, file_name in outputs:
+        project_store.etag(file_stage=file_stage, file_name=file_name)
+
+    frames = []
+    for file_stage, file_name in list(outputs)[:read]:
+        project_store.etag(file_stage=file_stage, file_name=file_name)
+        frames.append(project_store.read(file_stage=file_stage, file_name=file_name))
+    return pd.concat(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--read", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.03)
+    args = parser.parse_args()
+
+    outputs = make_outputs(args.files)
+    with tempfile.TemporaryDirectory() as root:
+        single_files = RequestCountingStore(
+            "benchmark", 1, os.path.join(root, "files"), args.latency
+        )
+        backing_store = RequestCountingStore(
+            "benchmark", 1, os.path.join(root, "bundles"), args.latency
+        )
+
+        results = {}
+        for name, project_store, counter in [
+            ("one object per file", single_files, single_files),
+            ("bundles", storage.BundleProjectStore(backing_store), backing_store),
+        ]:
+            start = time.perf_counter()
+            results[name] = run(project_store, outputs, args.read)
+            elapsed = time.perf_counter() - start
+            print(f"{name:20s}  requests: {counter.requests:4d}  time: {elapsed:6.2f}s")
+
+    pd.testing.assert_frame_equal(results["bundles"], results["one object per file"])
+    print("matching")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Scaling benchmark for borrowings.calculate_reducing_balance_loans_schedules on synthetic loan tapes.
+
+Tapes up to --reference-max loans are also run through the per-loan Series implementation the
+matrix engine replaced, and the outputs are compared. The banded engine is checked against the
+matrix engine and its in-memory and Parquet sizes are reported next to the dense ones. The streaming
+totals (loan tape read in batches, monthly totals per loan type only) are checked against the banded
+column sums and their peak memory is reported for the tape size.
+
+    python -m benchmarks.bench_existing_loans --loans 10000 100000 500000
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from application.modeling import borrowings, constants, helper
+
+
+def reference_reducing_balance_loans_schedules(
+    interest_rates: pd.Series,
+    effective_dates: pd.Series,
+    frequencies: pd.Series,
+    loan_identifiers: pd.Series,
+    tenures: pd.Series,
+    amounts: pd.Series,
+    is_interest_rate_annual: bool = True,
+) -> dict[str, pd.DataFrame]:
+    outstanding_balances_results = []
+    interest_payments_results = []
+    capital_repayments_results = []
+
+    effective_dates = helper.convert_to_datetime(effective_dates)
+
+    freq_key = {1: "12M", 2: "6M", 3: "4M", 4: "3M", 6: "2M", 12: "M"}
+
+    years = tenures / 12
+    number_of_payments = years * frequencies
+
+    if is_interest_rate_annual:
+        effective_interest_rates = np.power(1 + interest_rates, 1 / frequencies) - 1
+    else:
+        effective_interest_rates = interest_rates
+
+    annuity_factor = (
+        1 - (1 + effective_interest_rates) ** (-number_of_payments)
+    ) / effective_interest_rates
+
+    repayments = amounts / annuity_factor
+
+    for i, _ in interest_rates.items():
+        effective_date = effective_dates[i]
+        frequency = frequencies[i]
+        periods = number_of_payments[i]
+        effective_interest_rate = effective_interest_rates[i]
+        repayment = repayments[i]
+        loan_identifier = loan_identifiers[i]
+
+        index = pd.date_range(
+            effective_date + pd.DateOffset(months=12 // frequency),
+            periods=periods,
+            freq=freq_key[frequency],
+        ).strftime("%b-%Y")
+
+        annuity_factors = (
+            1
+            - np.power(
+                1 + effective_interest_rate,
+                -np.arange(periods, 0, -1),
+            )
+        ) / effective_interest_rate
+
+        outstanding_balances = annuity_factors * repayment
+
+        outstanding_balances_results.append(
+            pd.Series(outstanding_balances, index=index, name=loan_identifier)
+        )
+
+        interest_payments = outstanding_balances * effective_interest_rate
+
+        interest_payments_results.append(
+            pd.Series(interest_payments, index=index, name=loan_identifier)
+        )
+
+        capital_repayments_results.append(
+            pd.Series(repayment - interest_payments, index=index, name=loan_identifier)
+        )
+
+    return {
+        "outstanding_balance_at_start": pd.concat(
+            outstanding_balances_results, axis=1
+        ).T.fillna(0),
+        "capital_repayments": pd.concat(capital_repayments_results, axis=1).T.fillna(0),
+        "interest_payments": pd.concat(interest_payments_results, axis=1).T.fillna(0),
+    }
+
+
+def make_loan_tape(number_of_loans: int, seed: int = 0) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    disbursement_dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(
+        random.integers(0, 4 * 365, number_of_loans), unit="D"
+    )
+    return pd.DataFrame(
+        {
+            "loan_number": [f"L{number:07d}" for number in range(number_of_loans)],
+            "disbursement_date": disbursement_dates.strftime("%d/%m/%Y"),
+            "loan_term": random.choice([6, 12, 18, 24, 36, 48, 60], number_of_loans),
+            "loan_amount": random.uniform(500, 50_000, number_of_loans).round(2),
+            "interest_rate": random.uniform(0.005, 0.04, number_of_loans),
+            "loan_type": random.choice(
+                ["SME", "B2B", "SSB", "CONSUMER"], number_of_loans
+            ),
+        }
+    )
+
+
+def schedule(function, existing_loans: pd.DataFrame):
+    return function(
+        interest_rates=existing_loans["interest_rate"],
+        effective_dates=existing_loans["disbursement_date"],
+        frequencies=(existing_loans["interest_rate"] * 0 + 12),
+        loan_identifiers=existing_loans["loan_number"],
+        tenures=existing_loans["loan_term"],
+        amounts=existing_loans["loan_amount"],
+        is_interest_rate_annual=False,
+    )
+
+
+def measure(function, existing_loans: pd.DataFrame):
+    start = time.perf_counter()
+    result = schedule(function, existing_loans)
+    return result, time.perf_counter() - start
+
+
+def measure_peak_memory(function, existing_loans: pd.DataFrame) -> int:
+    tracemalloc.start()
+    schedule(function, existing_loans)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def stream_totals(existing_loans: pd.DataFrame, batch_size: int):
+    def loan_batches():
+        for start in range(0, len(existing_loans), batch_size):
+            batch = existing_loans.iloc[start : start + batch_size]
+            yield {
+                "interest_rates": batch["interest_rate"],
+                "effective_dates": batch["disbursement_date"],
+                "frequencies": (batch["interest_rate"] * 0 + 12),
+                "tenures": batch["loan_term"],
+                "amounts": batch["loan_amount"],
+                "groups": batch["loan_type"],
+            }
+
+    return borrowings.calculate_reducing_balance_loans_totals(
+        loan_batches=loan_batches(), is_interest_rate_annual=False
+    )
+
+
+def parquet_size(table: pa.Table) -> int:
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    return buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--loans", type=int, nargs="+", default=[10_000, 100_000, 500_000]
+    )
+    parser.add_argument("--reference-max", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=constants.SCHEDULE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for number_of_loans in args.loans:
+        existing_loans = make_loan_tape(number_of_loans)
+
+        result, elapsed = measure(
+            borrowings.calculate_reducing_balance_loans_schedules, existing_loans
+        )
+        peak = measure_peak_memory(
+            borrowings.calculate_reducing_balance_loans_schedules, existing_loans
+        )
+        line = (
+            f"loans: {number_of_loans:7d}  months: {result['interest_payments'].shape[1]:4d}  "
+            f"matrix engine: {elapsed:6.2f}s peak {peak / 2**20:6.0f}MiB"
+        )
+
+        if number_of_loans <= args.reference_max:
+            reference, reference_elapsed = measure(
+                reference_reducing_balance_loans_schedules, existing_loans
+            )
+            for name, expected in reference.items():
+                pd.testing.assert_frame_equal(result[name], expected, check_exact=True)
+            line += (
+                f"  per-loan Series: {reference_elapsed:7.2f}s "
+                f"({reference_elapsed / elapsed:.0f}x, identical)"
+            )
+
+        banded, banded_elapsed = measure(
+            borrowings.calculate_reducing_balance_loans_banded_schedules,
+            existing_loans,
+        )
+        interest_payments = banded["interest_payments"]
+        if number_of_loans <= args.reference_max:
+            for name in reference:
+                pd.testing.assert_frame_equal(
+                    banded[name].to_dense(), result[name], check_exact=True
+                )
+        dense_bytes = result["interest_payments"].to_numpy().nbytes
+        dense_parquet = parquet_size(pa.Table.from_pandas(result["interest_payments"]))
+        del result
+        banded_parquet = parquet_size(interest_payments.to_table())
+        line += (
+            f"\n{'':15s}banded engine: {banded_elapsed:6.2f}s  per schedule: "
+            f"{interest_payments.nbytes / 2**20:6.1f}MiB vs {dense_bytes / 2**20:6.1f}MiB dense, "
+            f"parquet {banded_parquet / 2**20:6.1f}MiB vs {dense_parquet / 2**20:6.1f}MiB"
+        )
+
+        start = time.perf_counter()
+        totals = stream_totals(existing_loans, args.batch_size)
+        streaming_elapsed = time.perf_counter() - start
+        np.testing.assert_allclose(
+            totals["interest_payments"].sum()[interest_payments.columns].to_numpy(),
+            interest_payments.column_sums().to_numpy(),
+            rtol=1e-9,
+        )
+        del banded, interest_payments
+
+        tracemalloc.start()
+        stream_totals(existing_loans, args.batch_size)
+        streaming_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        line += (
+            f"\n{'':15s}streaming totals: {streaming_elapsed:6.2f}s peak {streaming_peak / 2**20:6.0f}MiB "
+            f"(batches of {args.batch_size}, {len(totals['interest_payments'])} loan types)"
+        )
+
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
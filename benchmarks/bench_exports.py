@@ -0,0 +1,110 @@
+"""Compares rendering a whole existing_loans download in memory with the streamed export.
+
+The reference reads the whole raw file and renders it into one CSV string, the way the download
+endpoints did before. The streamed export reads and encodes EXPORT_CHUNK_SIZE rows at a time as
+the response is sent. Peak memory is what tracemalloc sees while the body is produced, in a
+second, untimed download.
+
+    python -m benchmarks.bench_exports --loans 500000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from application.modeling import constants, exports, helper, storage
+from benchmarks.bench_projected_reads import make_existing_loans
+
+
+def whole_download(project_store: storage.ProjectStore) -> int:
+    df = helper.format_raw_file(
+        project_store.read(
+            file_stage=constants.FileStage.raw,
+            file_name=constants.RawFiles.existing_loans,
+        ),
+        for_output=True,
+    )
+    return len(df.to_csv().encode())
+
+
+def streamed_download(
+    project_store: storage.ProjectStore, file_format: constants.ExportFormat
+) -> int:
+    response = exports.export_response(
+        chunks=(
+            helper.format_raw_file(chunk, for_output=True)
+            for chunk in project_store.read_chunks(
+                file_stage=constants.FileStage.raw,
+                file_name=constants.RawFiles.existing_loans,
+                chunk_size=constants.EXPORT_CHUNK_SIZE,
+            )
+        ),
+        download_name=constants.RawFiles.existing_loans.value,
+        file_format=file_format,
+    )
+
+    async def send() -> int:
+        size = 0
+        async for data in response.body_iterator:
+            size += len(data)
+        return size
+
+    return asyncio.run(send())
+
+
+def measure(download):
+    """Times one download, then traces the memory of another, since tracing slows it down"""
+    start = time.perf_counter()
+    size = download()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    download()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        project_store = storage.LocalProjectStore("benchmark", 1, root)
+        os.makedirs(project_store.prefix(constants.FileStage.raw))
+        pq.write_table(
+            pa.Table.from_pandas(make_existing_loans(args.loans), preserve_index=False),
+            os.path.join(
+                project_store.prefix(constants.FileStage.raw), "existing_loans.parquet"
+            ),
+            row_group_size=constants.INGESTION_CHUNK_SIZE,
+        )
+
+        downloads = {
+            "whole csv": lambda: whole_download(project_store),
+            **{
+                f"streamed {file_format.value}": lambda file_format=file_format: streamed_download(
+                    project_store, file_format
+                )
+                for file_format in constants.ExportFormat
+            },
+        }
+        for name, download in downloads.items():
+            size, elapsed, peak = measure(download)
+            print(
+                f"{name:16s}  {size / 2**20:7.1f}MiB sent  {elapsed:6.2f}s  "
+                f"peak memory: {peak / 2**20:7.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
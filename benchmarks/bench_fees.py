@@ -0,0 +1,70 @@
+"""Compares the (products, vintages, months) fee grid against the convolution kernel on long horizons.
+
+The reference is the grid the kernel replaced, which spreads every vintage over its product's
+average loan term. Both are given the same terms, so their results must agree to rounding.
+
+    python -m benchmarks.bench_fees --months 60 240 600 --products 4
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+
+from application.modeling import other_income
+
+
+def reference_spread_fees(
+    fees: np.ndarray, average_loan_terms: np.ndarray, months_to_forecast: int
+) -> np.ndarray:
+    months_since_disbursement = (
+        np.arange(months_to_forecast)[np.newaxis, :]
+        - np.arange(fees.shape[1])[:, np.newaxis]
+    )
+    earning = (months_since_disbursement >= 0) & (
+        months_since_disbursement < average_loan_terms[:, np.newaxis, np.newaxis]
+    )
+    return np.where(earning, fees[:, :, np.newaxis], 0).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, nargs="+", default=[60, 240, 600])
+    parser.add_argument("--products", type=int, default=4)
+    args = parser.parse_args()
+
+    random = np.random.default_rng(0)
+    for months in args.months:
+        fees = random.uniform(0, 10_000, (args.products, months))
+        terms = random.choice([6, 12, 24, 36, 60], args.products)
+
+        start = time.perf_counter()
+        expected = reference_spread_fees(fees, terms, months)
+        grid = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = np.stack(
+            [
+                other_income.spread_fees(
+                    monthly_fees=fees[product],
+                    starts=np.arange(months),
+                    terms=np.full(months, terms[product]),
+                    months_to_forecast=months,
+                )
+                for product in range(args.products)
+            ]
+        )
+        kernel = time.perf_counter() - start
+
+        np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-6)
+        print(
+            f"months: {months:5d}  products: {args.products:3d}  grid: {grid:7.3f}s  "
+            f"convolution: {kernel:6.3f}s  speedup: {grid / kernel:6.1f}x  matches"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Compares storing an uploaded existing_loans CSV read whole with the chunked, typed ingestion.
+
+The reference is the upload ingestion replaced: the whole CSV read into one object/float64
+DataFrame and written as a single Parquet row group. Both write to a local directory and are
+read back to check they hold the same loans. Peak memory is what tracemalloc sees while storing,
+in a second, untimed upload.
+
+    python -m benchmarks.bench_ingestion --loans 100000 500000 --chunk-size 100000
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from application.modeling import constants, helper, ingestion, storage
+
+
+def make_csv(number_of_loans: int, seed: int = 0) -> bytes:
+    random = np.random.default_rng(seed)
+    dates = pd.Timestamp("2018-01-01") + pd.to_timedelta(
+        random.integers(0, 5 * 365, number_of_loans), unit="D"
+    )
+    loan_amount = random.uniform(100, 1e5, number_of_loans).round(2)
+    df = pd.DataFrame(
+        {
+            "Loan Number ": [
+                f"100,120,{loan:03d},001" for loan in range(number_of_loans)
+            ],
+            "Disbursement Date": dates.strftime("%d/%m/%Y"),
+            "Loan Term": random.integers(3, 61, number_of_loans),
+            "Loan Amount": loan_amount,
+            "Closing Balance": (
+                loan_amount * random.uniform(0, 1, number_of_loans)
+            ).round(2),
+            "Interest Rate": random.uniform(0.05, 0.4, number_of_loans).round(4),
+            "Admin Fee": random.uniform(0, 0.05, number_of_loans).round(4),
+            "Credit Insurance Fee": random.uniform(0, 0.02, number_of_loans).round(4),
+            "Loan Type": random.choice(["SME", "Consumer", "Payroll"], number_of_loans),
+        }
+    )
+    return df.to_csv(index=False).encode()
+
+
+def reference_upload(csv: bytes, project_store: storage.ProjectStore):
+    df = pd.read_csv(io.BytesIO(csv))
+    df.columns = df.columns.str.strip()
+    project_store.write(
+        df=df,
+        file_stage=constants.FileStage.raw,
+        file_name=constants.RawFiles.existing_loans,
+        index=False,
+    )
+
+
+def chunked_upload(csv: bytes, project_store: storage.ProjectStore, chunk_size: int):
+    ingestion.ingest_csv(
+        file=io.BytesIO(csv),
+        file_name=constants.RawFiles.existing_loans,
+        project_store=project_store,
+        chunk_size=chunk_size,
+    )
+
+
+def measure(upload):
+    """Times one upload, then traces the memory of another, since tracing slows it down"""
+    start = time.perf_counter()
+    upload()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    upload()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def read_back(project_store: storage.ProjectStore) -> pd.DataFrame:
+    df = project_store.read(
+        file_stage=constants.FileStage.raw, file_name=constants.RawFiles.existing_loans
+    )
+    df["Disbursement Date"] = helper.convert_to_datetime(df["Disbursement Date"])
+    return df.astype({"Loan Term": int, "Loan Type": str})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument(
+        "--chunk-size", type=int, default=constants.INGESTION_CHUNK_SIZE
+    )
+    args = parser.parse_args()
+
+    for number_of_loans in args.loans:
+        csv = make_csv(number_of_loans)
+        with tempfile.TemporaryDirectory() as root:
+            whole_store = storage.LocalProjectStore(
+                "benchmark", 1, os.path.join(root, "whole")
+            )
+            chunked_store = storage.LocalProjectStore(
+                "benchmark", 1, os.path.join(root, "chunked")
+            )
+
+            whole, whole_peak = measure(lambda: reference_upload(csv, whole_store))
+            chunked, chunked_peak = measure(
+                lambda: chunked_upload(csv, chunked_store, args.chunk_size)
+            )
+
+            pd.testing.assert_frame_equal(
+                read_back(chunked_store), read_back(whole_store), check_dtype=False
+            )
+
+        print(
+            f"loans: {number_of_loans:8d}  whole: {whole:6.2f}s {whole_peak / 2**20:7.1f}MiB  "
+            f"chunked: {chunked:6.2f}s {chunked_peak / 2**20:7.1f}MiB  matching"
+        )
+
+
+if __name__ == "__main__":
+    main()
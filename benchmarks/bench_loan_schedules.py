@@ -0,0 +1,157 @@
+"""Compares the month-by-month new-disbursement schedules against the closed-form annuity engine.
+
+The reference below is the loop the engine replaced: one recursion per segment followed by
+the row-by-row diagonal shift of each of the three schedules.
+
+    python -m benchmarks.bench_loan_schedules --horizons 120 240 360
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from application.modeling import helper, interest_income
+
+SEGMENTS = ["sme", "b2b", "consumer_ssb", "consumer_pvt"]
+
+
+def reference_shift(df: pd.DataFrame):
+    df = df.copy()
+    for i in range(len(df)):
+        df.iloc[i] = df.iloc[i].shift(i)
+    return df.fillna(0)
+
+
+def reference_loan_schedule(
+    disbursements: pd.Series,
+    monthly_interest_rate: pd.Series,
+    repayment_amount: pd.Series,
+    months_to_forecast: int,
+) -> dict:
+    number_of_disbursements = len(disbursements)
+
+    outstanding_at_start = np.zeros((number_of_disbursements, months_to_forecast))
+    interest = np.zeros((number_of_disbursements, months_to_forecast))
+    capital_repayments = np.zeros((number_of_disbursements, months_to_forecast))
+    outstanding_at_start[:, 0] = disbursements.values
+
+    for i in range(months_to_forecast):
+        interest[:, i] = outstanding_at_start[:, i] * monthly_interest_rate
+        capital_repayments[:, i] = np.where(
+            outstanding_at_start[:, i] < repayment_amount.values - interest[:, i],
+            outstanding_at_start[:, i],
+            repayment_amount.values - interest[:, i],
+        )
+        if i + 1 == months_to_forecast:
+            break
+        outstanding_at_start[:, i + 1] = np.maximum(
+            outstanding_at_start[:, i] - capital_repayments[:, i], 0
+        )
+    date_of_disbursement = disbursements.index
+    columns = interest_income.generate_columns(
+        date_of_disbursement[1], months_to_forecast
+    )
+    return {
+        "interest": reference_shift(
+            pd.DataFrame(interest, index=date_of_disbursement, columns=columns)
+        ),
+        "capital_repayments": reference_shift(
+            pd.DataFrame(
+                capital_repayments, index=date_of_disbursement, columns=columns
+            )
+        ),
+        "outstanding_at_start": reference_shift(
+            pd.DataFrame(
+                outstanding_at_start, index=date_of_disbursement, columns=columns
+            )
+        ),
+    }
+
+
+def make_inputs(months: int, seed: int = 0):
+    random = np.random.default_rng(seed)
+    index = helper.generate_columns("2023-01", months)
+
+    new_disbursements_df = pd.DataFrame(
+        {
+            f"{segment}_disbursements": random.uniform(1e4, 1e6, months)
+            for segment in SEGMENTS
+        },
+        index=index,
+    )
+    disbursement_parameters = pd.DataFrame(
+        [random.uniform(0.005, 0.05, months) for _ in SEGMENTS]
+        + [np.full(months, term) for term in random.integers(6, 61, len(SEGMENTS))],
+        index=[f"{segment.upper()}_INTEREST_RATE" for segment in SEGMENTS]
+        + [f"{segment.upper()}_AVERAGE_LOAN_TERM" for segment in SEGMENTS],
+        columns=index,
+    )
+    monthly_repayment_new_disbursements_df = (
+        interest_income.calculate_monthly_repayments_new_disbursements(
+            new_disbursements_df=new_disbursements_df,
+            disbursement_parameters=disbursement_parameters,
+        )
+    )
+    return (
+        new_disbursements_df,
+        disbursement_parameters,
+        monthly_repayment_new_disbursements_df,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--horizons", type=int, nargs="+", default=[120, 240, 360])
+    args = parser.parse_args()
+
+    for months in args.horizons:
+        (
+            new_disbursements_df,
+            disbursement_parameters,
+            monthly_repayment_new_disbursements_df,
+        ) = make_inputs(months)
+
+        start = time.perf_counter()
+        reference = {
+            f"{segment}_loan_schedules": reference_loan_schedule(
+                disbursements=new_disbursements_df[f"{segment}_disbursements"],
+                monthly_interest_rate=disbursement_parameters.loc[
+                    f"{segment.upper()}_INTEREST_RATE"
+                ],
+                repayment_amount=monthly_repayment_new_disbursements_df[
+                    f"{segment}_monthly_repayment"
+                ],
+                months_to_forecast=months,
+            )
+            for segment in SEGMENTS
+        }
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        schedules = interest_income.generate_loan_schedules_for_all_new_disbursements(
+            new_disbursements_df=new_disbursements_df,
+            disbursement_parameters=disbursement_parameters,
+            monthly_repayment_new_disbursements_df=monthly_repayment_new_disbursements_df,
+            months_to_forecast=months,
+        )
+        closed_form = time.perf_counter() - start
+
+        max_difference = max(
+            (schedules[segment][name] - reference[segment][name]).abs().max().max()
+            for segment in reference
+            for name in reference[segment]
+        )
+
+        print(
+            f"months: {months:4d}  loop: {loop:7.3f}s  closed form: {closed_form:6.3f}s  "
+            f"speedup: {loop / closed_form:6.1f}x  max abs difference: {max_difference:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compares reading a whole existing_loans file and selecting from it with projected reads.
+
+The tape is stored as a multi-row-group Parquet file in a local project store. The reference
+reads all of it and then takes the columns, the rows or the first rows a caller needs, the
+way the stages did before; the projected read asks the store for only those.
+
+    python -m benchmarks.bench_projected_reads --loans 1000000 --repeats 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from application.modeling import constants, storage
+
+CASES = {
+    "other income columns": dict(
+        columns=["Loan Term", "Loan Amount", "Admin Fee", "Credit Insurance Fee"]
+    ),
+    "first 50 loans": dict(limit=50),
+    "one loan type": dict(filters=[("Loan Type", "=", "Payroll")]),
+}
+
+
+def make_existing_loans(number_of_loans: int, seed: int = 0) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    loan_amount = random.uniform(100, 1e5, number_of_loans)
+    return pd.DataFrame(
+        {
+            "Loan Number": [
+                f"100,120,{loan:03d},001" for loan in range(number_of_loans)
+            ],
+            "Disbursement Date": pd.Timestamp("2018-01-01")
+            + pd.to_timedelta(random.integers(0, 5 * 365, number_of_loans), unit="D"),
+            "Loan Term": random.integers(3, 61, number_of_loans).astype(np.int32),
+            "Loan Amount": loan_amount,
+            "Closing Balance": loan_amount * random.uniform(0, 1, number_of_loans),
+            "Interest Rate": random.uniform(0.05, 0.4, number_of_loans),
+            "Admin Fee": random.uniform(0, 0.05, number_of_loans),
+            "Credit Insurance Fee": random.uniform(0, 0.02, number_of_loans),
+            # Sorted, as a tape exported by product is, so row group statistics can rule groups out
+            "Loan Type": pd.Categorical(
+                np.sort(random.choice(["Consumer", "Payroll", "SME"], number_of_loans))
+            ),
+        }
+    )
+
+
+def measure(function, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    existing_loans = make_existing_loans(args.loans)
+
+    with tempfile.TemporaryDirectory() as root:
+        project_store = storage.LocalProjectStore("benchmark", 1, root)
+        os.makedirs(project_store.prefix(constants.FileStage.raw))
+        pq.write_table(
+            pa.Table.from_pandas(existing_loans, preserve_index=False),
+            os.path.join(
+                project_store.prefix(constants.FileStage.raw), "existing_loans.parquet"
+            ),
+            row_group_size=constants.INGESTION_CHUNK_SIZE,
+        )
+
+        for name, projection in CASES.items():
+            expected, whole = measure(
+                lambda: storage.project_frame(
+                    project_store.read(
+                        file_stage=constants.FileStage.raw,
+                        file_name=constants.RawFiles.existing_loans,
+                    ),
+                    **projection,
+                ),
+                args.repeats,
+            )
+            result, projected = measure(
+                lambda: project_store.read(
+                    file_stage=constants.FileStage.raw,
+                    file_name=constants.RawFiles.existing_loans,
+                    **projection,
+                ),
+                args.repeats,
+            )
+
+            pd.testing.assert_frame_equal(result, expected)
+            print(
+                f"{name:22s}  whole read: {whole * 1000:7.1f}ms  "
+                f"projected: {projected * 1000:7.1f}ms  speedup: {whole / projected:5.1f}x  matching"
+            )
+
+
+if __name__ == "__main__":
+    main()
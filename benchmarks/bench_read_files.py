@@ -0,0 +1,97 @@
+"""Compares sequential reads against helper.read_files on a local S3 stand-in.
+
+The stand-in serves parquet files from a temporary directory and sleeps for a fixed
+latency per request to mimic an S3 GET round trip. Banded schedule files are left out: they
+are stored as banded tables rather than DataFrames and are not served by the stand-in.
+
+    python -m benchmarks.bench_read_files --files 13 --latency 0.08
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import awswrangler as wr
+import numpy as np
+import pandas as pd
+
+from application.modeling import cache, constants, helper
+
+
+def make_local_s3(root: str, latency: float):
+    def read_parquet(path: str, boto3_session=None, **kwargs):
+        time.sleep(latency)
+        return pd.read_parquet(os.path.join(root, path[len("s3://") :]))
+
+    def describe_objects(path: str, boto3_session=None, **kwargs):
+        stat = os.stat(os.path.join(root, path[len("s3://") :]))
+        return {path: {"ETag": f"{stat.st_mtime_ns}-{stat.st_size}"}}
+
+    return read_parquet, describe_objects
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=13)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--months", type=int, default=60)
+    args = parser.parse_args()
+
+    file_names = [
+        file_name
+        for file_name in constants.IntermediateFiles
+        if file_name not in constants.BANDED_SCHEDULE_FILES
+    ][: args.files]
+
+    with tempfile.TemporaryDirectory() as root:
+        for file_name in file_names:
+            path = os.path.join(
+                root,
+                "tenant",
+                "project_1",
+                "intermediate",
+                f"{file_name.value}.parquet",
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.DataFrame(
+                np.random.rand(20, args.months),
+                columns=helper.generate_columns("2023-01", args.months),
+            ).to_parquet(path)
+
+        wr.s3.read_parquet, wr.s3.describe_objects = make_local_s3(root, args.latency)
+
+        cache.DATAFRAME_CACHE.clear()
+        start = time.perf_counter()
+        for file_name in file_names:
+            helper.read_intermediate_file(
+                tenant_name="tenant",
+                project_id=1,
+                boto3_session=None,
+                file_name=file_name,
+            )
+        sequential = time.perf_counter() - start
+
+        cache.DATAFRAME_CACHE.clear()
+        start = time.perf_counter()
+        helper.read_files(
+            tenant_name="tenant",
+            project_id=1,
+            boto3_session=None,
+            file_keys=[
+                (constants.FileStage.intermediate, file_name)
+                for file_name in file_names
+            ],
+        )
+        concurrent = time.perf_counter() - start
+
+    print(f"files: {len(file_names)}, latency per request: {args.latency:.3f}s")
+    print(f"sequential: {sequential:.3f}s")
+    print(f"read_files: {concurrent:.3f}s")
+    print(f"speedup:    {sequential / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Compares building the income statement in an object dtype DataFrame template with the statement builder.
+
+The reference below is the assembly the builder replaced: an empty template filled in with
+label-based .loc assignments and one .loc re-sum per subtotal. Both are fed the same synthetic
+expenses and income lines and must give the same statement.
+
+    python -m benchmarks.bench_statements --months 60 120 240 --repeats 20
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from application.modeling import helper, income_statement
+
+START_DATE = "2023-01"
+
+SECTIONS = {
+    "Total Staff Costs": ("Salaries", "CILL"),
+    "Total Travel & Entertainment": ("Travel Costs", "Entertainment"),
+    "Total Marketing And Public Relations": ("Marketing Costs", "Donations"),
+    "Total Office Costs": ("Rental Costs", "Fines And Penalties"),
+    "Total Professional Fees": ("Auditors Remuneration", "Consultancy Fees"),
+    "Total Communication Costs": ("Telephones", "Courier"),
+    "Total Motor Vehicle Costs": ("Fuel", "Motor Vehicle Maintenance Costs"),
+    "Total Other Costs": ("Depreciation", "Business Acquisition"),
+    "Total Investment Income": ("Rental Income", "Admin Fees"),
+    "Total Finance Costs": ("Finance Costs", "Third Party"),
+}
+EXPENSE_TOTALS = list(SECTIONS)[:8]
+
+
+def reference_income_statement(inputs: dict, months_to_forecast: int) -> pd.DataFrame:
+    df = pd.DataFrame(
+        columns=helper.generate_columns(START_DATE, months_to_forecast),
+        index=income_statement.INCOME_STATEMENT.lines.copy(),
+    )
+
+    df.loc["Interest Income"] = inputs["interest_income"]
+    df.loc["Other Income"] = inputs["other_income"]
+    df.loc["Total Revenue"] = df.loc["Interest Income"] + df.loc["Other Income"]
+    df.loc[inputs["expenses"].index] = inputs["expenses"]
+    df.loc["Salaries"] = inputs["salaries"]
+    df.loc["Depreciation"] = inputs["depreciation"]
+    df.loc["Provisions"] = inputs["provisions"]
+    df.loc["Business Acquisition"] = inputs["business_acquisition"]
+
+    for total, (first, last) in SECTIONS.items():
+        df.loc[total] = df.loc[first:last].fillna(0).sum()
+
+    df.loc["TOTAL EXPENSES"] = sum(df.loc[total] for total in EXPENSE_TOTALS)
+    df.loc["EBIDTA"] = df.loc["Total Revenue"] - df.loc["TOTAL EXPENSES"]
+
+    df.loc["Finance Costs"] = inputs["finance_costs"]
+    df.loc["Total Finance Costs"] = (
+        df.loc["Finance Costs":"Third Party"].fillna(0).sum()
+    )
+    df.loc["PROFIT / (LOSS) BEFORE TAX"] = (
+        df.loc["EBIDTA"]
+        + df.loc["Total Investment Income"]
+        - df.loc["Total Finance Costs"]
+    )
+    df.loc["Taxation"] = np.maximum(
+        df.loc["PROFIT / (LOSS) BEFORE TAX"] * inputs["tax_rate"], 0
+    )
+    return df
+
+
+def builder_income_statement(inputs: dict, months_to_forecast: int) -> pd.DataFrame:
+    statement = income_statement.generate_income_statement_template(
+        START_DATE, months_to_forecast
+    )
+    income_statement.insert_revenue(
+        statement, inputs["interest_income"], inputs["other_income"]
+    )
+    income_statement.insert_expenses(
+        statement, inputs["expenses"], inputs["expenses"].iloc[:0]
+    )
+    statement["Salaries"] = inputs["salaries"]
+    statement["Depreciation"] = inputs["depreciation"]
+    statement["Provisions"] = inputs["provisions"]
+    statement["Business Acquisition"] = inputs["business_acquisition"]
+    statement["Finance Costs"] = inputs["finance_costs"]
+    income_statement.calculate_tax(statement, inputs["tax_rate"].copy())
+    return statement.to_frame()
+
+
+def make_inputs(months_to_forecast: int, seed: int = 0) -> dict:
+    random = np.random.default_rng(seed)
+    columns = helper.generate_columns(START_DATE, months_to_forecast)
+
+    def line():
+        return pd.Series(random.uniform(0, 1e5, months_to_forecast), index=columns)
+
+    lines = income_statement.INCOME_STATEMENT.lines
+    expense_lines = [
+        line_name
+        for first, last in SECTIONS.values()
+        for line_name in lines[lines.get_loc(first) : lines.get_loc(last) + 1]
+        if line_name
+        not in [
+            "Salaries",
+            "Depreciation",
+            "Provisions",
+            "Business Acquisition",
+            "Finance Costs",
+        ]
+    ]
+    return {
+        "interest_income": line() * 10,
+        "other_income": line(),
+        "expenses": pd.DataFrame(
+            random.uniform(0, 1e4, (len(expense_lines), months_to_forecast)),
+            index=expense_lines,
+            columns=columns,
+        ),
+        "salaries": line(),
+        "depreciation": line(),
+        "provisions": line(),
+        "business_acquisition": line(),
+        "finance_costs": line(),
+        "tax_rate": pd.Series(0.25, index=columns),
+    }
+
+
+def measure(function, inputs: dict, months_to_forecast: int, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(inputs, months_to_forecast)
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, nargs="+", default=[60, 120, 240])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    for months_to_forecast in args.months:
+        inputs = make_inputs(months_to_forecast)
+
+        expected, template = measure(
+            reference_income_statement, inputs, months_to_forecast, args.repeats
+        )
+        result, builder = measure(
+            builder_income_statement, inputs, months_to_forecast, args.repeats
+        )
+
+        compared = income_statement.INCOME_STATEMENT.lines.drop(
+            ["2% Taxation", "PROFIT/(LOSS) FOR PERIOD"]
+        )
+        pd.testing.assert_frame_equal(
+            result.loc[compared],
+            expected.loc[compared].astype(float),
+            check_names=False,
+            rtol=1e-12,
+        )
+
+        print(
+            f"months: {months_to_forecast:4d}  template: {template * 1000:7.1f}ms  "
+            f"builder: {builder * 1000:6.2f}ms  speedup: {template / builder:5.0f}x  matching"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compares a stage writing its outputs one blocking upload at a time with the write-behind store.
+
+The stage writes seven schedules of --months columns, about as many as the borrowings stage does,
+and reads every other one back straight away, as later steps read the schedules before them.
+Uploads go to a local project store that waits --latency seconds per write, as a PUT to S3 would.
+
+    python -m benchmarks.bench_write_behind --latency 0.15
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from application.modeling import constants, storage
+
+FILE_NAMES = [
+    constants.IntermediateFiles.interest_income_new_disbursement_df,
+    constants.IntermediateFiles.capital_repayment_new_disbursements_df,
+    constants.IntermediateFiles.monthly_repayment_new_disbursements_df,
+    constants.IntermediateFiles.new_disbursements_df,
+    constants.IntermediateFiles.other_income_df,
+    constants.IntermediateFiles.depreciations_df,
+    constants.IntermediateFiles.provisions_df,
+]
+
+
+class SlowStore(storage.LocalProjectStore):
+    def __init__(self, tenant_name: str, project_id: int, root: str, latency: float):
+        super().__init__(tenant_name=tenant_name, project_id=project_id, root=root)
+        self.latency = latency
+
+    def write_table(self, table, file_stage, file_name):
+        time.sleep(self.latency)
+        super().write_table(table=table, file_stage=file_stage, file_name=file_name)
+
+
+def run_stage(project_store: storage.ProjectStore, months: int) -> pd.DataFrame:
+    random = np.random.default_rng(0)
+    index = pd.date_range("2023-01-31", periods=months, freq="M").astype(str)
+    total = pd.DataFrame(0.0, index=["total"], columns=index)
+    for position, file_name in enumerate(FILE_NAMES):
+        df = pd.DataFrame(random.normal(size=(20, months)), columns=index)
+        project_store.write(
+            df=df, file_stage=constants.FileStage.intermediate, file_name=file_name
+        )
+        if position % 2:
+            total += project_store.read(
+                file_stage=constants.FileStage.intermediate, file_name=file_name
+            ).sum()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        blocking_store = SlowStore(
+            "benchmark", 1, os.path.join(root, "blocking"), args.latency
+        )
+        start = time.perf_counter()
+        expected = run_stage(blocking_store, args.months)
+        blocking = time.perf_counter() - start
+
+        backing_store = SlowStore(
+            "benchmark", 1, os.path.join(root, "write_behind"), args.latency
+        )
+        start = time.perf_counter()
+        write_behind_store = storage.WriteBehindProjectStore(backing_store)
+        result = run_stage(write_behind_store, args.months)
+        calculated = time.perf_counter() - start
+        _, errors = write_behind_store.flush()
+        assert not errors, errors
+        write_behind = time.perf_counter() - start
+
+        for file_name in FILE_NAMES:
+            pd.testing.assert_frame_equal(
+                backing_store.read(constants.FileStage.intermediate, file_name),
+                blocking_store.read(constants.FileStage.intermediate, file_name),
+            )
+
+    pd.testing.assert_frame_equal(result, expected)
+    print(
+        f"blocking uploads: {blocking:5.2f}s  write-behind: {calculated:5.2f}s calculating, "
+        f"{write_behind:5.2f}s with uploads  speedup: {blocking / write_behind:4.1f}x  matching"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,12 @@ from sqlalchemy.orm import Session
 
 from application.auth import security
 from application.auth.security import _decode_token, get_current_active_user
-from application.modeling import helper
-from application.routes import final_calculations, intermediate_calculations
+from application.modeling import cache, helper
+from application.routes import (
+    final_calculations,
+    intermediate_calculations,
+    pipeline_calculations,
+)
 from application.routes.projects import projects_router
 from application.routes.tenants import tenants_router
 from application.routes.users import users_router
@@ -43,6 +47,11 @@ def health():
     return {"status": "ok", "another": [1, 2, 3]}
 
 
+@app.get("/cache-stats")
+def cache_stats(current_user: models.Users = Depends(get_current_active_user)):
+    return cache.DATAFRAME_CACHE.stats()
+
+
 @app.middleware("http")
 async def audit_middleware(request: Request, call_next):
     response = await call_next(request)
@@ -199,3 +208,4 @@ app.include_router(users_router.router)
 app.include_router(projects_router.router)
 app.include_router(intermediate_calculations.router)
 app.include_router(final_calculations.router)
+app.include_router(pipeline_calculations.router)
@@ -0,0 +1,166 @@
+import os
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+import pandas as pd
+import pytest
+
+from application.modeling import cache, constants, pipeline, storage
+
+TENANT_NAME = "tenant"
+PROJECT_ID = "1"
+PROJECT_PARAMETERS = {"start_date": "2023-01", "months_to_forecast": 3, "imtt": 0}
+
+raw = constants.FileStage.raw
+intermediate = constants.FileStage.intermediate
+
+DISBURSEMENT_PARAMETERS = (raw, constants.RawFiles.disbursement_parameters)
+OTHER_PARAMETERS = (raw, constants.RawFiles.other_parameters)
+NEW_DISBURSEMENTS = (intermediate, constants.IntermediateFiles.new_disbursements_df)
+MONTHLY_REPAYMENTS = (
+    intermediate,
+    constants.IntermediateFiles.monthly_repayment_new_disbursements_df,
+)
+DEPRECIATIONS = (intermediate, constants.IntermediateFiles.depreciations_df)
+
+
+def get_project_store() -> storage.ProjectStore:
+    return storage.get_project_store(
+        tenant_name=TENANT_NAME, project_id=PROJECT_ID, boto3_session=None
+    )
+
+
+def read(file_key: pipeline.FileKey) -> pd.DataFrame:
+    return get_project_store().read(file_stage=file_key[0], file_name=file_key[1])
+
+
+def write(file_key: pipeline.FileKey, df: pd.DataFrame):
+    get_project_store().write(df=df, file_stage=file_key[0], file_name=file_key[1])
+
+
+class Calculation:
+    """A stage function writing `calculate` of its input and counting its calls"""
+
+    def __init__(self, input_key, output_key, calculate):
+        self.input_key = input_key
+        self.output_key = output_key
+        self.calculate = calculate
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        write(self.output_key, self.calculate(read(self.input_key)))
+
+
+@pytest.fixture
+def calculations(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "STORAGE_BACKEND", constants.StorageBackend.local)
+    monkeypatch.setattr(constants, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(constants, "BUNDLED_TENANTS", [])
+    cache.DATAFRAME_CACHE.clear()
+
+    write(DISBURSEMENT_PARAMETERS, pd.DataFrame({"amount": [1.0, 2.0]}))
+    write(OTHER_PARAMETERS, pd.DataFrame({"amount": [3.0]}))
+
+    calculations = {
+        "new_disbursements": Calculation(
+            DISBURSEMENT_PARAMETERS, NEW_DISBURSEMENTS, lambda df: df * 2
+        ),
+        "loan_schedules": Calculation(
+            NEW_DISBURSEMENTS, MONTHLY_REPAYMENTS, lambda df: df + 1
+        ),
+        "depreciations": Calculation(
+            OTHER_PARAMETERS, DEPRECIATIONS, lambda df: df * 10
+        ),
+    }
+    yield calculations
+    cache.DATAFRAME_CACHE.clear()
+
+
+@pytest.fixture
+def stages(calculations) -> list:
+    return [
+        pipeline.Stage(
+            name=name,
+            function=calculation,
+            inputs=[calculation.input_key],
+            outputs=[calculation.output_key],
+        )
+        for name, calculation in calculations.items()
+    ]
+
+
+def run(
+    stages: list, force: bool = False, project_parameters: dict = PROJECT_PARAMETERS
+) -> list:
+    reports, _ = pipeline.run_incremental_stages(
+        stages=stages,
+        call_stage=lambda stage: stage.function(),
+        backing_store=get_project_store(),
+        project_parameters=project_parameters,
+        force=force,
+    )
+    return sorted(report["stage"] for report in reports if report["reused"])
+
+
+def get_calls(calculations: dict) -> dict:
+    return {name: calculation.calls for name, calculation in calculations.items()}
+
+
+def test_unchanged_run_reuses_every_stage(calculations, stages):
+    assert run(stages) == []
+    assert run(stages) == ["depreciations", "loan_schedules", "new_disbursements"]
+    assert get_calls(calculations) == {
+        "new_disbursements": 1,
+        "loan_schedules": 1,
+        "depreciations": 1,
+    }
+
+    assert run(stages, force=True) == []
+    assert get_calls(calculations) == {
+        "new_disbursements": 2,
+        "loan_schedules": 2,
+        "depreciations": 2,
+    }
+
+
+def test_changed_input_reruns_the_stage_and_the_stages_after_it(calculations, stages):
+    run(stages)
+    write(DISBURSEMENT_PARAMETERS, pd.DataFrame({"amount": [1.0, 2.0, 4.0]}))
+
+    assert run(stages) == ["depreciations"]
+    assert get_calls(calculations) == {
+        "new_disbursements": 2,
+        "loan_schedules": 2,
+        "depreciations": 1,
+    }
+    pd.testing.assert_frame_equal(
+        read(MONTHLY_REPAYMENTS), pd.DataFrame({"amount": [3.0, 5.0, 9.0]})
+    )
+
+
+def test_changed_project_parameters_rerun_every_stage(calculations, stages):
+    run(stages)
+    assert (
+        run(stages, project_parameters={**PROJECT_PARAMETERS, "months_to_forecast": 4})
+        == []
+    )
+
+
+def test_version_bump_reruns_the_stage_and_the_stages_after_it(calculations, stages):
+    run(stages)
+
+    # A deploy changes the maths of new_disbursements and bumps its version
+    stages[0].function.calculate = lambda df: df * 3
+    stages[0].version += 1
+
+    assert run(stages) == ["depreciations"]
+    assert get_calls(calculations) == {
+        "new_disbursements": 2,
+        "loan_schedules": 2,
+        "depreciations": 1,
+    }
+    pd.testing.assert_frame_equal(
+        read(MONTHLY_REPAYMENTS), pd.DataFrame({"amount": [4.0, 7.0]})
+    )
@@ -0,0 +1,156 @@
+import os
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from application.modeling import direct_cashflow, helper, statement_of_cashflows
+
+SEEDS = range(25)
+
+
+def reference_opening_and_closing_balances(df: pd.DataFrame):
+    for index, period in enumerate(df.columns):
+        closing_balance_iloc = df.index.get_loc("Closing Balance")
+        opening_balance_iloc = df.index.get_loc("Opening Balance")
+        df.iloc[closing_balance_iloc, index] = df.iloc[
+            opening_balance_iloc:closing_balance_iloc, index
+        ].sum()
+
+        if period == df.columns[-1]:
+            break
+        df.iloc[opening_balance_iloc, index + 1] = df.iloc[closing_balance_iloc, index]
+    return df
+
+
+def reference_cash_at_end_and_beginning_of_period(
+    df: pd.DataFrame, opening_row: str, closing_row: str
+):
+    closing_loc = df.index.get_loc(closing_row)
+    opening_loc = df.index.get_loc(opening_row)
+
+    for index, period in enumerate(df.columns):
+        df.iloc[closing_loc, index] = df.iloc[
+            opening_loc - 1 : closing_loc, index
+        ].sum()
+
+        if period == df.columns[-1]:
+            break
+
+        df.iloc[opening_loc, index + 1] = df.iloc[closing_loc, index]
+    return df
+
+
+def make_schedule(seed: int, dtype=float) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    number_of_lines = int(random.integers(0, 6))
+    number_of_periods = int(random.integers(1, 61))
+
+    values = random.normal(0, 1e6, (number_of_lines, number_of_periods))
+    values[random.random(values.shape) < 0.1] = np.nan
+
+    df = pd.DataFrame(
+        index=["Opening Balance"]
+        + [f"Movement {line}" for line in range(number_of_lines)]
+        + ["Closing Balance"],
+        columns=helper.generate_columns("2023-01", number_of_periods),
+        dtype=dtype,
+    )
+    df.iloc[1 : number_of_lines + 1] = values
+    df.iloc[0, 0] = random.normal(0, 1e7)
+    return df
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_roll_forward_matches_column_by_column_sums(seed):
+    df = make_schedule(seed)
+
+    expected = reference_opening_and_closing_balances(df.copy())
+    result = helper.calculate_opening_and_closing_balances(df.copy())
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_roll_forward_matches_column_by_column_sums_on_templates(seed):
+    # Schedule templates are built without data, which leaves them object dtype
+    df = make_schedule(seed, dtype=object)
+
+    expected = reference_opening_and_closing_balances(df.copy())
+    result = helper.calculate_opening_and_closing_balances(df.copy())
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_closing_balance_is_opening_balance_plus_net_movements(seed):
+    df = make_schedule(seed)
+    result = helper.calculate_opening_and_closing_balances(df.copy())
+
+    movements = df.iloc[1:-1].fillna(0).sum()
+    np.testing.assert_allclose(
+        result.loc["Closing Balance"].to_numpy(dtype=float),
+        df.iat[0, 0] + movements.cumsum().to_numpy(dtype=float),
+        rtol=1e-9,
+        atol=1e-6,
+    )
+    np.testing.assert_array_equal(
+        result.loc["Opening Balance"].iloc[1:].to_numpy(dtype=float),
+        result.loc["Closing Balance"].iloc[:-1].to_numpy(dtype=float),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_direct_cashflow_balances(seed):
+    random = np.random.default_rng(seed)
+    template = direct_cashflow.generate_direct_cashflow_template(
+        "2023-01", int(random.integers(1, 61))
+    ).to_frame()
+    template.loc["Net Increase/Decrease In Cash"] = random.normal(
+        0, 1e6, template.shape[1]
+    )
+    opening_balance = random.normal(0, 1e7)
+
+    expected = template.copy()
+    expected.loc["Opening Balance", expected.columns[0]] = opening_balance
+    expected = reference_cash_at_end_and_beginning_of_period(
+        expected, opening_row="Opening Balance", closing_row="Closing Balance"
+    )
+    result = (
+        direct_cashflow.calculate_opening_and_closing_balances_for_direct_cashflows(
+            direct_cashflow=template.copy(),
+            cash_on_hand_opening_balance=opening_balance,
+        )
+    )
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_statement_of_cashflows_balances(seed):
+    random = np.random.default_rng(seed)
+    template = statement_of_cashflows.generate_statement_of_cashflow_template(
+        "2023-01", int(random.integers(1, 61))
+    ).to_frame()
+    template.loc["Net Increase/(Decrease) In Cash"] = random.normal(
+        0, 1e6, template.shape[1]
+    )
+    opening_balances = pd.DataFrame({"CASH_ON_HAND": [random.normal(0, 1e7)]})
+
+    expected = template.copy()
+    expected.loc["Cash At Beginning Of Period", expected.columns[0]] = float(
+        opening_balances["CASH_ON_HAND"].iat[0]
+    )
+    expected = reference_cash_at_end_and_beginning_of_period(
+        expected,
+        opening_row="Cash At Beginning Of Period",
+        closing_row="Cash At End Of Period",
+    )
+    result = statement_of_cashflows.calculate_cash_at_end_and_beginning_of_period(
+        statement_of_cashflow_df=template.copy(), opening_balances=opening_balances
+    )
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
@@ -0,0 +1,321 @@
+import os
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException, status
+
+from application.modeling import cache, constants, helper, storage
+
+TENANT_NAME = "tenant"
+PROJECT_ID = 1
+FILE_STAGE = constants.FileStage.intermediate
+FILE_NAME = constants.IntermediateFiles.new_disbursements_df
+FAILING_FILE_NAME = constants.IntermediateFiles.monthly_repayment_new_disbursements_df
+CURRENT_USER = SimpleNamespace(tenant=SimpleNamespace(company_name=TENANT_NAME))
+
+
+class FailingProjectStore(storage.LocalProjectStore):
+    """A local store that cannot write FAILING_FILE_NAME"""
+
+    def write_table(self, table: pa.Table, file_stage: constants.FileStage, file_name):
+        if file_name == FAILING_FILE_NAME:
+            raise OSError(f"{file_name.value} could not be written")
+        super().write_table(table=table, file_stage=file_stage, file_name=file_name)
+
+
+class GatedProjectStore(storage.LocalProjectStore):
+    """A local store whose writes wait until the gate is opened, like a slow upload"""
+
+    def __init__(self, tenant_name: str, project_id: int, root: str):
+        super().__init__(tenant_name=tenant_name, project_id=project_id, root=root)
+        self.gate = threading.Event()
+
+    def write_table(self, table: pa.Table, file_stage: constants.FileStage, file_name):
+        assert self.gate.wait(timeout=10)
+        super().write_table(table=table, file_stage=file_stage, file_name=file_name)
+
+
+def make_frame(value: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        np.full((2, 3), value),
+        index=["Opening Balance", "Closing Balance"],
+        columns=helper.generate_columns("2023-01", 3),
+    )
+
+
+def make_local_store(root) -> storage.LocalProjectStore:
+    return storage.LocalProjectStore(
+        tenant_name=TENANT_NAME, project_id=PROJECT_ID, root=str(root)
+    )
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "STORAGE_BACKEND", constants.StorageBackend.local)
+    monkeypatch.setattr(constants, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(constants, "BUNDLED_TENANTS", [])
+    cache.DATAFRAME_CACHE.clear()
+    yield tmp_path
+    cache.DATAFRAME_CACHE.clear()
+
+
+def test_write_behind_reads_back_pending_writes(tmp_path):
+    make_local_store(tmp_path).write(
+        df=make_frame(1), file_stage=FILE_STAGE, file_name=FILE_NAME
+    )
+    backing_store = GatedProjectStore(
+        tenant_name=TENANT_NAME, project_id=PROJECT_ID, root=str(tmp_path)
+    )
+    write_behind_store = storage.WriteBehindProjectStore(backing_store=backing_store)
+
+    write_behind_store.write(
+        df=make_frame(2), file_stage=FILE_STAGE, file_name=FILE_NAME
+    )
+
+    # The upload is held at the gate, so only the write-behind store has the new frame
+    pd.testing.assert_frame_equal(
+        write_behind_store.read(file_stage=FILE_STAGE, file_name=FILE_NAME),
+        make_frame(2),
+    )
+    pd.testing.assert_frame_equal(
+        make_local_store(tmp_path).read(file_stage=FILE_STAGE, file_name=FILE_NAME),
+        make_frame(1),
+    )
+    assert not write_behind_store.is_cacheable(FILE_STAGE, FILE_NAME)
+
+    backing_store.gate.set()
+    assert write_behind_store.flush() == (
+        [backing_store.path(FILE_STAGE, FILE_NAME)],
+        {},
+    )
+
+    assert write_behind_store.get_pending(FILE_STAGE, FILE_NAME) is None
+    pd.testing.assert_frame_equal(
+        make_local_store(tmp_path).read(file_stage=FILE_STAGE, file_name=FILE_NAME),
+        make_frame(2),
+    )
+
+
+def test_write_behind_keeps_the_last_write_of_a_file(tmp_path):
+    backing_store = GatedProjectStore(
+        tenant_name=TENANT_NAME, project_id=PROJECT_ID, root=str(tmp_path)
+    )
+    write_behind_store = storage.WriteBehindProjectStore(backing_store=backing_store)
+
+    for value in range(1, 4):
+        write_behind_store.write(
+            df=make_frame(value), file_stage=FILE_STAGE, file_name=FILE_NAME
+        )
+    pd.testing.assert_frame_equal(
+        write_behind_store.read(file_stage=FILE_STAGE, file_name=FILE_NAME),
+        make_frame(3),
+    )
+
+    backing_store.gate.set()
+    write_behind_store.flush()
+
+    assert write_behind_store.get_pending(FILE_STAGE, FILE_NAME) is None
+    pd.testing.assert_frame_equal(
+        make_local_store(tmp_path).read(file_stage=FILE_STAGE, file_name=FILE_NAME),
+        make_frame(3),
+    )
+
+
+def test_write_behind_endpoint_invalidates_the_cache_after_flush(local_backend):
+    helper.upload_file(
+        project_id=PROJECT_ID,
+        tenant_name=TENANT_NAME,
+        boto3_session=None,
+        file=make_frame(1),
+        file_name=FILE_NAME,
+        file_stage=FILE_STAGE,
+    )
+    path = make_local_store(local_backend).path(FILE_STAGE, FILE_NAME)
+
+    def read():
+        return helper.read_intermediate_file(
+            tenant_name=TENANT_NAME,
+            project_id=PROJECT_ID,
+            boto3_session=None,
+            file_name=FILE_NAME,
+        )
+
+    pd.testing.assert_frame_equal(read(), make_frame(1))
+    assert path in cache.DATAFRAME_CACHE.entries
+
+    @helper.write_behind
+    def endpoint(project_id: int, current_user):
+        assert isinstance(
+            storage.get_project_store(
+                tenant_name=TENANT_NAME, project_id=project_id, boto3_session=None
+            ),
+            storage.WriteBehindProjectStore,
+        )
+        helper.upload_file(
+            project_id=project_id,
+            tenant_name=TENANT_NAME,
+            boto3_session=None,
+            file=make_frame(2),
+            file_name=FILE_NAME,
+            file_stage=FILE_STAGE,
+        )
+        return read()
+
+    result = endpoint(
+        project_id=PROJECT_ID,
+        current_user=CURRENT_USER,
+    )
+
+    pd.testing.assert_frame_equal(result, make_frame(2))
+    assert storage.WRITE_BEHIND_STORE.get() is None
+    assert path not in cache.DATAFRAME_CACHE.entries
+    pd.testing.assert_frame_equal(read(), make_frame(2))
+
+
+@pytest.fixture
+def failing_backend(local_backend, monkeypatch):
+    monkeypatch.setattr(
+        storage,
+        "get_file_store",
+        lambda tenant_name, project_id, boto3_session: FailingProjectStore(
+            tenant_name=tenant_name, project_id=project_id, root=str(local_backend)
+        ),
+    )
+    return local_backend
+
+
+def upload(file_name, value: float):
+    helper.upload_file(
+        project_id=PROJECT_ID,
+        tenant_name=TENANT_NAME,
+        boto3_session=None,
+        file=make_frame(value),
+        file_name=file_name,
+        file_stage=FILE_STAGE,
+    )
+
+
+def test_write_behind_endpoint_reports_failed_uploads(failing_backend):
+    path = make_local_store(failing_backend).path(FILE_STAGE, FILE_NAME)
+
+    @helper.write_behind
+    def endpoint(project_id: int, current_user):
+        upload(FILE_NAME, 2)
+        upload(FAILING_FILE_NAME, 2)
+        # A read racing the upload leaves a copy in the cache
+        cache.DATAFRAME_CACHE.put(path=path, etag="stale", df=make_frame(1))
+        return {"message": "done"}
+
+    with pytest.raises(HTTPException) as raised:
+        endpoint(project_id=PROJECT_ID, current_user=CURRENT_USER)
+
+    assert raised.value.status_code == status.HTTP_403_FORBIDDEN
+    assert raised.value.detail == {
+        f"{FILE_STAGE.value}/{FAILING_FILE_NAME.value}": (
+            f"{FAILING_FILE_NAME.value} could not be written"
+        )
+    }
+    # The upload that succeeded is stored, and no stale copy of it is left in the cache
+    assert path not in cache.DATAFRAME_CACHE.entries
+    pd.testing.assert_frame_equal(
+        make_local_store(failing_backend).read(
+            file_stage=FILE_STAGE, file_name=FILE_NAME
+        ),
+        make_frame(2),
+    )
+
+
+def test_write_behind_endpoint_raises_its_own_error_over_failed_uploads(
+    failing_backend,
+):
+    @helper.write_behind
+    def endpoint(project_id: int, current_user):
+        upload(FILE_NAME, 2)
+        upload(FAILING_FILE_NAME, 2)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="input not found"
+        )
+
+    with pytest.raises(HTTPException) as raised:
+        endpoint(project_id=PROJECT_ID, current_user=CURRENT_USER)
+
+    assert raised.value.status_code == status.HTTP_404_NOT_FOUND
+    assert raised.value.detail == "input not found"
+    assert storage.WRITE_BEHIND_STORE.get() is None
+    pd.testing.assert_frame_equal(
+        make_local_store(failing_backend).read(
+            file_stage=FILE_STAGE, file_name=FILE_NAME
+        ),
+        make_frame(2),
+    )
+
+
+def write_bundle(bundle_store: storage.BundleProjectStore, df: pd.DataFrame):
+    bundle_store.write_files(
+        {(FILE_STAGE, FILE_NAME): (pa.Table.from_pandas(df, preserve_index=True), True)}
+    )
+
+
+def set_modified(path: str, modified_ns: int):
+    os.utime(path, ns=(modified_ns, modified_ns))
+
+
+def test_bundle_takes_the_place_of_older_single_files(tmp_path):
+    backing_store = make_local_store(tmp_path)
+    backing_store.write(df=make_frame(1), file_stage=FILE_STAGE, file_name=FILE_NAME)
+
+    write_bundle(storage.BundleProjectStore(backing_store=backing_store), make_frame(2))
+
+    # The single files a bundle takes the place of are deleted
+    assert not os.path.exists(backing_store.path(FILE_STAGE, FILE_NAME))
+    pd.testing.assert_frame_equal(
+        storage.BundleProjectStore(backing_store=backing_store).read(
+            file_stage=FILE_STAGE, file_name=FILE_NAME
+        ),
+        make_frame(2),
+    )
+
+    # A single file older than the bundle, say from an older deployment, stays hidden
+    backing_store.write(df=make_frame(3), file_stage=FILE_STAGE, file_name=FILE_NAME)
+    bundle_modified = os.stat(backing_store.bundle_path(FILE_STAGE)).st_mtime_ns
+    set_modified(backing_store.path(FILE_STAGE, FILE_NAME), bundle_modified - 10**9)
+
+    bundle_store = storage.BundleProjectStore(backing_store=backing_store)
+    pd.testing.assert_frame_equal(
+        bundle_store.read(file_stage=FILE_STAGE, file_name=FILE_NAME), make_frame(2)
+    )
+    assert bundle_store.list_files(FILE_STAGE) == [FILE_NAME.value]
+
+
+def test_single_file_written_after_the_bundle_takes_its_place(tmp_path):
+    backing_store = make_local_store(tmp_path)
+    bundle_store = storage.BundleProjectStore(backing_store=backing_store)
+    write_bundle(bundle_store, make_frame(1))
+    pd.testing.assert_frame_equal(
+        bundle_store.read(file_stage=FILE_STAGE, file_name=FILE_NAME), make_frame(1)
+    )
+
+    bundle_store.write(df=make_frame(2), file_stage=FILE_STAGE, file_name=FILE_NAME)
+    single_modified = os.stat(backing_store.path(FILE_STAGE, FILE_NAME)).st_mtime_ns
+    set_modified(backing_store.bundle_path(FILE_STAGE), single_modified - 10**9)
+
+    # The store that wrote the file dropped its listing, and a new store lists the stage
+    # afresh
+    for store in (
+        bundle_store,
+        storage.BundleProjectStore(backing_store=backing_store),
+    ):
+        pd.testing.assert_frame_equal(
+            store.read(file_stage=FILE_STAGE, file_name=FILE_NAME), make_frame(2)
+        )
+        assert store.etag(FILE_STAGE, FILE_NAME) == backing_store.etag(
+            FILE_STAGE, FILE_NAME
+        )